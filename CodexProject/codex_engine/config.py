@@ -7,11 +7,13 @@ DATA_DIR = BASE_DIR / "data"
 THEMES_DIR = DATA_DIR / "themes"
 DB_PATH = DATA_DIR / "codex.db"
 MAPS_DIR = DATA_DIR / "maps"
+EXPORTS_DIR = DATA_DIR / "exports"
 
 # Ensure directories exist
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 THEMES_DIR.mkdir(parents=True, exist_ok=True)
 MAPS_DIR.mkdir(parents=True, exist_ok=True)
+EXPORTS_DIR.mkdir(parents=True, exist_ok=True)
 
 DEFAULT_THEME = "fantasy"
 SCREEN_WIDTH = 1400
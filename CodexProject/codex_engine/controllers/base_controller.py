@@ -36,6 +36,16 @@ class BaseController(ABC):
         """Headless render from the active view marker's perspective."""
         pass
 
+    renders_player_scene = False # True if player_scene_state() is implemented
+
+    def player_scene_state(self, load=False):
+        """
+        Scene state (node id, view, lights) for a player window that renders the view
+        itself. load=True adds the whole live level under 'level'; otherwise cells edited
+        since the last call come under 'cells'.
+        """
+        return None
+
     @abstractmethod
     def get_metadata_updates(self):
         """Returns a dictionary of metadata to save to the DB."""
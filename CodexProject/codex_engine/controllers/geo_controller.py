@@ -1,6 +1,8 @@
 import pygame
 import math
 import json
+import time
+import numpy as np
 
 from codex_engine.controllers.base_controller import BaseController
 from codex_engine.ui.renderers.image_strategy import ImageMapStrategy
@@ -13,10 +15,14 @@ from codex_engine.generators.world_gen import WorldGenerator
 from codex_engine.generators.local_gen import LocalGenerator 
 from codex_engine.generators.village_manager import VillageContentManager
 from codex_engine.core.ai_manager import AIManager
-from codex_engine.config import SCREEN_WIDTH, SCREEN_HEIGHT, SIDEBAR_WIDTH
+from codex_engine.utils.visibility import compute_fov, visibility_mask_surface
+from codex_engine.utils.tiled_export import ExportJob, EXPORT_DPI
+from codex_engine.config import SCREEN_WIDTH, SCREEN_HEIGHT, SIDEBAR_WIDTH, EXPORTS_DIR
 
 COLOR_RIVER = (80, 120, 255)
 COLOR_ROAD = (160, 82, 45)
+GEO_FOV_MAX_RADIUS = 160 # Player-view FOV radius in blocks; larger views shadowcast on pooled heightmap blocks
+GEO_EXPORT_SCALE = 4 # Default output pixels per heightmap sample for print exports
 
 
 # --- INSTRUMENTATION CONFIG ---
@@ -71,6 +77,7 @@ class GeoController(BaseController):
         self.dragging_map = False
         self.context_menu = None
         self.font_ui = pygame.font.Font(None, 24)
+        self._fov_blocks = None # (block, heightmap, pooled heights) for the player-view FOV
         
         self.info_panel = InfoPanel(self.content_manager, self.db, self.node, self.font_ui, pygame.font.Font(None, 20))
         self._init_ui()
@@ -140,6 +147,8 @@ class GeoController(BaseController):
         self.btn_regen = Button(20, 380, full_w, 30, "Regenerate Map", self.font_ui, (100, 100, 100), (150, 150, 150), (255,255,255), self.regenerate_seed)
         self.btn_gen_details = Button(20, 420, full_w, 30, "AI Gen Content", self.font_ui, (100, 100, 200), (150, 150, 250), (255,255,255), self._generate_ai_details)
         self.btn_settings = Button(20, 460, SIDEBAR_WIDTH - 40, 30, "Map Settings", self.font_ui, (100, 100, 100), (120, 120, 120), (255, 255, 255), self.open_map_settings)
+        self.btn_export = Button(20, 500, full_w, 30, "Export Print Map", self.font_ui, (100, 130, 100), (130, 170, 130), (255, 255, 255), self.export_print_map)
+        self.export_job = None # ExportJob while a print export runs in the background
 
     def open_map_settings(self):
         chain = [('node', self.node['id']), ('campaign', self.node['campaign_id'])]
@@ -148,6 +157,7 @@ class GeoController(BaseController):
     def _set_tab(self, tab_name): self.active_tab = tab_name
 
     def update(self):
+        if self.export_job: self._poll_export()
         self.widgets = []
         if self.node.get('parent_node_id'): self.widgets.append(self.btn_back)
         self.widgets.extend([self.btn_tab_tools, self.btn_tab_info, self.btn_tab_config])
@@ -158,7 +168,7 @@ class GeoController(BaseController):
         self.btn_tab_config.base_color = ac if self.active_tab == "CONFIG" else ic
 
         if self.active_tab == "CONFIG":
-            self.widgets.extend([self.slider_water, self.slider_azimuth, self.slider_altitude, self.slider_intensity, self.slider_contour, self.btn_grid_minus, self.btn_grid_plus, self.btn_regen, self.btn_gen_details, self.btn_settings])
+            self.widgets.extend([self.slider_water, self.slider_azimuth, self.slider_altitude, self.slider_intensity, self.slider_contour, self.btn_grid_minus, self.btn_grid_plus, self.btn_regen, self.btn_gen_details, self.btn_settings, self.btn_export])
         elif self.active_tab == "TOOLS":
             if self.active_vector: self.widgets.extend([self.btn_save_vec, self.btn_cancel_vec]); 
             if self.active_vector and self.active_vector.get('id'): self.widgets.append(self.btn_delete_vec)
@@ -343,6 +353,35 @@ class GeoController(BaseController):
     def inc_grid(self): self.grid_size = min(256, self.grid_size + 8)
     def dec_grid(self): self.grid_size = max(16, self.grid_size - 8)
 
+    def export_print_map(self, dpi=None, scale=None):
+        """
+        Writes the shaded heightmap to EXPORTS_DIR at scale output pixels per sample, tagged
+        with dpi. Both default to the node's export_dpi / export_scale properties, else
+        EXPORT_DPI / GEO_EXPORT_SCALE. Runs in the background on a snapshot of the map;
+        update() shows progress.
+        """
+        log(LOG_INFO, "ENTER: export_print_map")
+        if self.export_job or not hasattr(self.render_strategy, 'render_area'): return
+        props = self.node['properties']
+        dpi = dpi or props.get('export_dpi', EXPORT_DPI)
+        scale = scale or props.get('export_scale', GEO_EXPORT_SCALE)
+        strategy = self.render_strategy.snapshot()
+        sea_level, contours = self.slider_water.value, self.slider_contour.value
+        width, height = round(strategy.width * scale), round(strategy.height * scale)
+        path = EXPORTS_DIR / f"{self.node['type']}_{self.node['id']}_{time.strftime('%Y%m%d_%H%M%S')}.png"
+        print(f"Exporting {width}x{height}px print map at {dpi} DPI to {path}...")
+        self.export_job = ExportJob(path, width, height, lambda rect: strategy.render_area(rect, scale, sea_level, contours), dpi=dpi)
+
+    def _poll_export(self):
+        job = self.export_job
+        if not job.done:
+            self.btn_export.text = f"Exporting... {int(job.progress * 100)}%"
+            return
+        if job.error: print(f"Export failed: {job.error}")
+        else: print(f"Saved {job.path}")
+        self.btn_export.text = "Export Print Map"
+        self.export_job = None
+
     def regenerate_seed(self):
         if self.node['type'] == 'world_map':
             gen = WorldGenerator(self.theme, self.db); gen.generate_world_node(self.node['campaign_id'])
@@ -692,62 +731,34 @@ class GeoController(BaseController):
 
         max_dist = (math.sqrt(w**2 + h**2) / 2.0) / zoom
 
-        polygon_points = []
-        num_rays = 1800
-        step_angle = (2 * math.pi) / num_rays
-        step_size = 0.2 
-        
-        for i in range(num_rays):
-            angle = i * step_angle
-            sin_a = math.sin(angle)
-            cos_a = math.cos(angle)
-            
-            curr_x, curr_y = mx, my
-            dist = 0
-            
-            hit_x, hit_y = curr_x + (cos_a * max_dist), curr_y + (sin_a * max_dist)
-            prev_z = eye_height
-
-            while dist < max_dist:
-                dist += step_size
-                curr_x += cos_a * step_size
-                curr_y += sin_a * step_size
-                
-                grid_x, grid_y = int(curr_x), int(curr_y)
-                
-                if 0 <= grid_x < h_map_w and 0 <= grid_y < h_map_h:
-                    target_z = heightmap[grid_y, grid_x]
-                    
-                    if target_z <= eye_height:
-                        prev_z = eye_height
-                    else:
-                        if target_z >= prev_z:
-                            prev_z = target_z
-                        else:
-                            hit_x, hit_y = curr_x, curr_y
-                            break
-                else:
-                    hit_x, hit_y = curr_x, curr_y
-                    break
-            
-            screen_x = center_x + (hit_x - mx) * zoom
-            screen_y = center_y + (hit_y - my) * zoom
-            polygon_points.append((screen_x, screen_y))
+        # 5. Shadowcast on pooled blocks so wide views stay cheap; terrain above eye level blocks sight
+        block = max(1, math.ceil(max_dist / GEO_FOV_MAX_RADIUS))
+        opaque = self._fov_block_heights(block) > eye_height
+        origin = (mx / block, my / block)
+        visible, offset = compute_fov(opaque, origin, max_dist / block)
+        mask_surf = visibility_mask_surface(visible, offset, origin, zoom * block, (w, h))
 
         shadow_layer = pygame.Surface((w, h), pygame.SRCALPHA)
         shadow_layer.fill((0, 0, 0, 255)) 
-        
-        if len(polygon_points) > 2:
-            mask_surf = pygame.Surface((w, h), pygame.SRCALPHA) 
-            mask_surf.fill((0,0,0,0)) 
-            
-            pygame.draw.polygon(mask_surf, (255, 255, 255, 255), polygon_points)
-            
-            shadow_layer.blit(mask_surf, (0,0), special_flags=pygame.BLEND_RGBA_SUB)
+        shadow_layer.blit(mask_surf, (0,0), special_flags=pygame.BLEND_RGBA_SUB)
 
         temp_surface.blit(shadow_layer, (0, 0))
         return temp_surface
 
+    def _fov_block_heights(self, block):
+        """Heightmap max-pooled into block x block cells (cached, the heightmap is static)."""
+        heightmap = self.render_strategy.heightmap
+        cached = self._fov_blocks
+        if cached and cached[0] == block and cached[1] is heightmap: return cached[2]
+
+        h, w = heightmap.shape
+        bh, bw = -(-h // block), -(-w // block)
+        padded = np.full((bh * block, bw * block), -np.inf, dtype=heightmap.dtype)
+        padded[:h, :w] = heightmap
+        pooled = padded.reshape(bh, block, bw, block).max(axis=(1, 3))
+        self._fov_blocks = (block, heightmap, pooled)
+        return pooled
+
     def get_metadata_updates(self):
         return {'sea_level': self.slider_water.value, 'light_azimuth': self.slider_azimuth.value, 'light_altitude': self.slider_altitude.value, 'contour_interval': self.slider_contour.value, 'grid_size': self.grid_size}
 
@@ -2,6 +2,8 @@ import pygame
 import json
 import math
 import random
+import time
+from collections import OrderedDict
 from codex_engine.controllers.base_controller import BaseController
 from codex_engine.ui.renderers.tactical.tactical_renderer import TacticalRenderer
 from codex_engine.generators.dungeon_content_manager import DungeonContentManager
@@ -10,9 +12,17 @@ from codex_engine.ui.widgets import Button, StructureBrowser, ContextMenu
 from codex_engine.ui.generic_settings import GenericSettingsEditor
 from codex_engine.content.managers import TacticalContent
 from codex_engine.core.ai_manager import AIManager
-from codex_engine.config import SCREEN_WIDTH, SCREEN_HEIGHT, SIDEBAR_WIDTH
+from codex_engine.ui.renderers.tactical.player_view import draw_scaled_map, render_player_view, active_view, active_lights, PLAYER_VIEW_SIZE
+from codex_engine.utils.visibility import encode_explored, decode_explored
+from codex_engine.utils.lighting import LightingEngine
+from codex_engine.utils.tiled_export import ExportJob, aligned_tile_px, EXPORT_DPI
+from codex_engine.config import SCREEN_WIDTH, SCREEN_HEIGHT, SIDEBAR_WIDTH, EXPORTS_DIR
+
+PRINT_INCHES_PER_CELL = 1.0 # Battle-map scale for print exports: one grid square per inch
 
 class TacticalController(BaseController):
+    renders_player_scene = True
+
     def __init__(self, map_viewer, db_manager, node_data, theme_manager, ai_manager):
         super().__init__(db_manager, node_data, theme_manager)
         self.map_viewer = map_viewer
@@ -34,6 +44,14 @@ class TacticalController(BaseController):
         self.grid_height = geo.get('height', len(self.grid_data) if self.grid_data else 10)
         self.cell_size = 32
 
+        # Opacity grid + cached per-light visibility; keep in sync with grid_data edits
+        self.lighting = LightingEngine(self.grid_data)
+
+        # Fog of war: 1 = seen at least once, grown by every player-view FOV
+        self.explored = decode_explored(geo.get('explored'), len(self.grid_data[0]) if self.grid_data else 0, len(self.grid_data))
+        # Cells edited since the player window last heard about them, (x, y) -> value
+        self.pending_cells = {}
+
         self.active_brush = 1
         self.painting = False
         self.active_tab = "LOC"
@@ -58,12 +76,26 @@ class TacticalController(BaseController):
         self.renderer = TacticalRenderer(self.node, self.cell_size, style)
 
         self.static_map_surf = None
+        self.scaled_map_cache = OrderedDict() # zoom -> whole map scaled to that zoom
         self._render_static_map()
         self._init_ui()
 
     def _render_static_map(self):
         if self.renderer:
             self.static_map_surf = self.renderer.render()
+            self.scaled_map_cache.clear()
+
+    def _refresh_static_cells(self, *cells):
+        """Re-renders only the renderer tiles around the edited cells and patches the scaled-map cache."""
+        if not self.renderer: return
+        if self.static_map_surf is None: return self._render_static_map()
+        for x, y in cells: self.renderer.mark_cell_dirty(x, y)
+        for rect in self.renderer.update():
+            for zoom, scaled in self.scaled_map_cache.items():
+                x0, y0 = int(rect.left * zoom), int(rect.top * zoom)
+                x1, y1 = int(math.ceil(rect.right * zoom)), int(math.ceil(rect.bottom * zoom))
+                if x1 > x0 and y1 > y0:
+                    scaled.blit(pygame.transform.scale(self.static_map_surf.subsurface(rect), (x1 - x0, y1 - y0)), (x0, y0))
 
     def _toggle_triggers(self): self.show_triggers = not self.show_triggers
 
@@ -75,7 +107,9 @@ class TacticalController(BaseController):
             x, y = coords
             # In this grid system, non 1 or 2 values block light (Void, etc)
             self.grid_data[y][x] = 1 if state == 'open' else 0 
-            self._render_static_map()
+            self.pending_cells[(x, y)] = self.grid_data[y][x]
+            self.lighting.update_cell(x, y, self.grid_data[y][x])
+            self._refresh_static_cells((x, y))
 
     def _world_to_screen(self, wx, wy, cam_x, cam_y, zoom):
         center_x, center_y = SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2
@@ -104,6 +138,8 @@ class TacticalController(BaseController):
         self.btn_regen      = Button(20, 180, full_w, 30, "Regenerate Layout", self.font_ui, (150,100,100), (200,150,150), (255,255,255), self._regenerate_map)
         self.btn_gen_details = Button(20, 220, full_w, 30, "AI Gen Content", self.font_ui, (100,100,200), (150,150,250), (255,255,255), self._generate_ai_details)
         self.btn_settings = Button(20, 260, full_w, 30, "Map Settings", self.font_ui, (100, 100, 100), (120, 120, 120), (255, 255, 255), self.open_map_settings)
+        self.export_job = None # ExportJob while a print export runs in the background
+        self.btn_export = Button(20, 300, full_w, 30, "Export Print Map", self.font_ui, (100, 130, 100), (130, 170, 130), (255, 255, 255), self._export_print_map)
         self.btn_show_triggers = Button(20, 220, full_w, 30, "Toggle Triggers", self.font_ui, (100, 150, 100), (120, 180, 120), (255,255,255), self._toggle_triggers)
         self.show_triggers = False
 
@@ -179,6 +215,7 @@ class TacticalController(BaseController):
         return None
 
     def update(self):
+        if self.export_job: self._poll_export()
         self.widgets = [self.btn_back, self.btn_tab_tools, self.btn_tab_info, self.btn_tab_loc, self.btn_tab_config]
         ac, ic = (100, 100, 120), (60, 60, 70)
         self.btn_tab_tools.base_color = ac if self.active_tab == "TOOLS" else ic
@@ -186,7 +223,7 @@ class TacticalController(BaseController):
         self.btn_tab_loc.base_color = ac if self.active_tab == "LOC" else ic
         self.btn_tab_config.base_color = ac if self.active_tab == "CONFIG" else ic
         if self.active_tab == "TOOLS": self.widgets.extend([*self.brush_buttons, self.btn_show_triggers])
-        elif self.active_tab == "CONFIG": self.widgets.extend([self.btn_reset_view, self.btn_regen, self.btn_gen_details, self.btn_settings])
+        elif self.active_tab == "CONFIG": self.widgets.extend([self.btn_reset_view, self.btn_regen, self.btn_gen_details, self.btn_settings, self.btn_export])
 
     def updateold(self):
         self.widgets = [self.btn_back, self.btn_tab_tools, self.btn_tab_info, self.btn_tab_loc, self.btn_tab_config]
@@ -367,7 +404,9 @@ class TacticalController(BaseController):
                     self.markers = self.db.get_children(self.node['id'], type_filter='poi')
                     # Also set the grid cell back to non-blocking so the renderer draws it right
                     self.grid_data[r][c] = 0
-                self._render_static_map()
+                self.pending_cells[(c, r)] = self.grid_data[r][c]
+                self.lighting.update_cell(c, r, self.grid_data[r][c])
+                self._refresh_static_cells((c, r))
 
     def _open_context_menu(self, event):
         if self.hovered_marker:
@@ -459,20 +498,38 @@ class TacticalController(BaseController):
         from codex_engine.ui.editors import NativeMarkerEditor
         NativeMarkerEditor(marker_data, 'tactical_map', self._save_marker)
 
+    def _export_print_map(self, dpi=None):
+        """
+        Writes the level to EXPORTS_DIR at dpi (default: the node's export_dpi property, else
+        EXPORT_DPI), one grid square per PRINT_INCHES_PER_CELL. Rendered tile by tile so huge
+        levels fit in memory; runs in the background on a snapshot of the grid, and update()
+        shows progress.
+        """
+        if self.export_job: return
+        dpi = dpi or self.node['properties'].get('export_dpi', EXPORT_DPI)
+        cell_px = max(8, round(dpi * PRINT_INCHES_PER_CELL))
+        renderer = TacticalRenderer(self._live_level(), cell_px, self.renderer.style if self.renderer else 'hand_drawn')
+        width, height = self.grid_width * cell_px, self.grid_height * cell_px
+        path = EXPORTS_DIR / f"tactical_{self.node['id']}_{time.strftime('%Y%m%d_%H%M%S')}.png"
+        print(f"Exporting {width}x{height}px print map at {dpi} DPI to {path}...")
+        self.export_job = ExportJob(path, width, height, renderer.render_area, tile_px=aligned_tile_px(cell_px), dpi=dpi)
+
+    def _poll_export(self):
+        job = self.export_job
+        if not job.done:
+            self.btn_export.text = f"Exporting... {int(job.progress * 100)}%"
+            return
+        if job.error: print(f"Export failed: {job.error}")
+        else: print(f"Saved {job.path}")
+        self.btn_export.text = "Export Print Map"
+        self.export_job = None
+
     def _reset_view(self): return {"action": "reset_view"}
     def _regenerate_map(self): return {"action": "regenerate_tactical"}
 
     def draw_map(self, screen, cam_x, cam_y, zoom, screen_w, screen_h):
         if not self.static_map_surf: return
-        center_x, center_y = screen_w // 2, screen_h // 2
-        scaled_w = int(self.static_map_surf.get_width() * zoom)
-        scaled_h = int(self.static_map_surf.get_height() * zoom)
-        sc = self.cell_size
-        draw_x = center_x - (cam_x * sc * zoom)
-        draw_y = center_y - (cam_y * sc * zoom)
-        if scaled_w > 0 and scaled_h > 0:
-            scaled_surf = pygame.transform.scale(self.static_map_surf, (scaled_w, scaled_h))
-            screen.blit(scaled_surf, (draw_x, draw_y))
+        draw_scaled_map(screen, self.static_map_surf, self.scaled_map_cache, self.cell_size, cam_x, cam_y, zoom, screen_w, screen_h)
 
     def draw_overlays(self, screen, cam_x, cam_y, zoom):
         if self.active_tab == "LOC": self.structure_browser.draw(screen)
@@ -565,99 +622,35 @@ class TacticalController(BaseController):
             screen.blit(s, (bg_rect.x+10, bg_rect.y+y_off))
             y_off += s.get_height()
 
-    def create_radial_gradient(self, radius):
-        r_val = max(1, int(radius))
-        surf = pygame.Surface((r_val * 2, r_val * 2), pygame.SRCALPHA)
-        steps = 50
-        for i in range(steps):
-            t = i / float(steps - 1)
-            current_r = int(r_val * (1 - t))
-            alpha = int(255 * (t**2))
-            if current_r > 0:
-                pygame.draw.circle(surf, (255, 255, 255, alpha), (r_val, r_val), current_r)
-        return surf 
- 
     def render_player_view_surface(self):
-        view_marker = next((m for m in self.markers if m.get('properties', {}).get('is_view_marker') and m['properties'].get('is_active')), None)
-        
-        if not view_marker or not self.renderer:
+        view = active_view(self.markers)
+        if not view or not self.renderer:
             return None
-
-        p = view_marker.get('properties', {})
-        mx, my = p.get('world_x', 0), p.get('world_y', 0)
-        radius = p.get('radius', 15)
-        zoom = p.get('zoom', 1.5)
-        facing = p.get('facing_degrees', 0)
-        beam = p.get('beam_degrees', 360)
-        
-        w, h = 1920, 1080
-        center_x, center_y = w // 2, h // 2
-        
-        temp_surface = pygame.Surface((w, h))
-        self.draw_map(temp_surface, mx, my, zoom, w, h)
-
-        sc = self.cell_size * zoom
-        px_radius = radius * sc
-        
-        light_gradient = self.create_radial_gradient(px_radius)
-
-        polygon_points = []
-        num_rays =  7200
-        step_angle = (2 * math.pi) / num_rays
-        
-        start_angle_rad = math.radians(facing - beam / 2)
-        end_angle_rad = math.radians(facing + beam / 2)
-
-        for i in range(num_rays):
-            angle = i * step_angle
-            
-            if beam < 360:
-                norm_angle = (angle - start_angle_rad + 2*math.pi) % (2*math.pi)
-                norm_beam = (end_angle_rad - start_angle_rad + 2*math.pi) % (2*math.pi)
-                if norm_angle > norm_beam:
-                    continue
-
-            sin_a = math.sin(angle)
-            cos_a = math.cos(angle)
-            
-            dist, max_dist, step_size = 0, radius, 0.1 
-            curr_x, curr_y = mx, my
-            
-            while dist < max_dist:
-                dist += step_size
-                curr_x += cos_a * step_size
-                curr_y += sin_a * step_size
-                
-                grid_x, grid_y = int(curr_x), int(curr_y)
-                
-                if 0 <= grid_x < self.grid_width and 0 <= grid_y < self.grid_height:
-                    if self.grid_data[grid_y][grid_x] not in [1, 2]: 
-                        overhang = 0.03 
-                        curr_x += cos_a * overhang
-                        curr_y += sin_a * overhang
-                        break
-                else: break
-            
-            screen_x = center_x + (curr_x - mx) * sc
-            screen_y = center_y + (curr_y - my) * sc
-            polygon_points.append((screen_x, screen_y))
-
-        darkness = pygame.Surface((w, h), pygame.SRCALPHA)
-        darkness.fill((0, 0, 0, 255))
-        
-        light_shape = pygame.Surface((w, h), pygame.SRCALPHA)
-        light_shape.fill((0, 0, 0, 0))
-        if len(polygon_points) > 2:
-            pygame.draw.polygon(light_shape, (255, 255, 255, 255), polygon_points)
-            
-        grad_rect = light_gradient.get_rect(center=(center_x, center_y))
-        light_shape.blit(light_gradient, grad_rect, special_flags=pygame.BLEND_RGBA_MULT)
-        
-        darkness.blit(light_shape, (0, 0), special_flags=pygame.BLEND_RGBA_SUB)
-        
-        temp_surface.blit(darkness, (0, 0))
-
-        return temp_surface
+        surface = pygame.Surface(PLAYER_VIEW_SIZE)
+        return render_player_view(surface, self.draw_map, self.lighting, self.explored, active_lights(self.markers), view, self.cell_size)
+
+    def player_scene_state(self, load=False):
+        state = {
+            "node": self.node['id'],
+            "view": active_view(self.markers),
+            "lights": active_lights(self.markers),
+        }
+        if load:
+            state["level"] = self._live_level() # Already holds every edit so far
+            self.pending_cells = {}
+        elif self.pending_cells:
+            state["cells"], self.pending_cells = self.pending_cells, {}
+        return state
+
+    def _live_level(self):
+        """This level's node with the current grid and fog of war, saved or not."""
+        props = self.node['properties']
+        geometry = {**props['geometry'], 'grid': [row[:] for row in self.grid_data], 'explored': encode_explored(self.explored)}
+        return {**self.node, 'properties': {**props, 'geometry': geometry}}
+
+    def merge_explored(self, encoded):
+        """Adds fog-of-war cells revealed by a player window that renders the view itself."""
+        self.explored |= decode_explored(encoded, self.explored.shape[1], self.explored.shape[0])
 
     def get_metadata_updates(self): return {}
     
@@ -677,7 +670,8 @@ class TacticalController(BaseController):
             "width": self.grid_width, 
             "height": self.grid_height, 
             "footprints": existing_geom.get('footprints', []),
-            "rooms": existing_geom.get('rooms', [])
+            "rooms": existing_geom.get('rooms', []),
+            "explored": encode_explored(self.explored)
         }
         
         # 4. Put the updated geometry back into our properties copy
@@ -1,5 +1,16 @@
 from .db_manager import DBManager
-import json
+from codex_engine.utils import json_codec
+import sqlite3
+import zlib
+
+CHANGES_PAGE = 500 # Change-feed rows returned per request; clients ask again from the returned revision
+LARGE_PROPERTY_CHARS = 4096 # Properties whose JSON is longer than this (e.g. geometry grids) can be left out and fetched on demand
+
+NODE_ICONS = {
+    'poi': '📍', 'npc': '👤', 'local_map': '🗺️', 
+    'dungeon_level': '💀', 'server_config': '🖥️',
+    'ai_provider': '🧠', 'display_config': '📺'
+}
 
 class SQLTreeAdapter:
     def __init__(self, db_manager: DBManager):
@@ -13,7 +24,7 @@ class SQLTreeAdapter:
         root = self.db.find_node('app_root')
         if not root: return []
         
-        top_nodes = self.db.get_children(root['id'])
+        top_nodes = self.db.get_child_summaries(root['id'])
         return [{
             "uid": self._format_uid(n['id']), 
             "type": n['type'], 
@@ -21,10 +32,18 @@ class SQLTreeAdapter:
             "icon": "⚙️" if n['type'] == 'settings' else "📚"
         } for n in top_nodes]
 
-    def get_node(self, uid: str):
+    def get_node(self, uid: str, fields=None, exclude_large=False, limit=None, cursor=None):
+        """
+        Node with its properties flattened for the web editor.
+        fields: property keys to include (default all). exclude_large: leave out properties
+        longer than LARGE_PROPERTY_CHARS; they stay in ui_schema as lazy fields, loaded via
+        get_property(). limit/cursor page through the children (next_cursor continues).
+        """
         node_id = self._parse_uid(uid)
-        node = self.db.get_node(node_id)
+        # Sizes are measured in SQLite, so excluded properties are never decoded
+        node = self.db.get_node_fields(node_id, fields, LARGE_PROPERTY_CHARS if exclude_large else None)
         if not node: return None
+        large = node['large']
 
         # 1. Flatten Data: debug IDs + Name + everything in Properties
         flat_data = {
@@ -44,6 +63,17 @@ class SQLTreeAdapter:
         ]
         
         for key, value in props.items():
+            if key in large:
+                del flat_data[key]
+                ui_schema.append({
+                    "key": key,
+                    "label": key.replace('_', ' ').title(),
+                    "type": "textarea",
+                    "lazy": True,
+                    "size": large[key]
+                })
+                continue
+
             # Basic type detection for the web form
             field_type = "text"
             if isinstance(value, (int, float)):
@@ -53,7 +83,7 @@ class SQLTreeAdapter:
             elif isinstance(value, (dict, list)):
                 # If it's complex data (like geometry or metadata), show it as a read-only JSON string
                 field_type = "textarea" 
-                flat_data[key] = json.dumps(value, indent=2)
+                flat_data[key] = json_codec.dumps(value, pretty=True)
 
             ui_schema.append({
                 "key": key,
@@ -61,21 +91,22 @@ class SQLTreeAdapter:
                 "type": field_type
             })
 
-        # 3. Determine Navigation Children
-        children_nodes = self.db.get_children(node_id)
+        # 3. Determine Navigation Children (summaries only; properties are never loaded)
+        after_id = self._parse_uid(cursor) if cursor else None
+        fetch = limit + 1 if limit is not None else None # One extra row tells whether another page exists
+        children_nodes = self.db.get_child_summaries(node_id, limit=fetch, after_id=after_id)
+        next_cursor = None
+        if limit is not None and len(children_nodes) > limit:
+            children_nodes = children_nodes[:limit]
+            next_cursor = self._format_uid(children_nodes[-1]['id'])
+
         children_summaries = []
-        icons = {
-            'poi': '📍', 'npc': '👤', 'local_map': '🗺️', 
-            'dungeon_level': '💀', 'server_config': '🖥️',
-            'ai_provider': '🧠', 'display_config': '📺'
-        }
-        
         for c in children_nodes:
             children_summaries.append({
                 "uid": self._format_uid(c['id']),
                 "type": c['type'],
                 "name": c['name'],
-                "icon": icons.get(c['type'], '📄')
+                "icon": NODE_ICONS.get(c['type'], '📄')
             })
 
         return {
@@ -85,20 +116,105 @@ class SQLTreeAdapter:
             "name": node['name'],
             "data": flat_data,
             "ui_schema": ui_schema,
-            "children": children_summaries
+            "children": children_summaries,
+            "next_cursor": next_cursor
         }
 
+    def get_property(self, uid: str, key: str):
+        """(found, value) for one raw property, for fields left out by exclude_large."""
+        return self.db.get_node_property(self._parse_uid(uid), key)
+
     def update_node(self, uid: str, form_data: dict):
         node_id = self._parse_uid(uid)
         name = form_data.pop('name', None)
-        
+        return self.db.update_node(node_id, name=name, properties=self._parse_form_values(form_data))
+
+    def _parse_form_values(self, form_data: dict):
         # Clean up any JSON strings that should be objects before saving
         # (Allows editing complex properties if the user keeps the JSON valid)
         for k, v in form_data.items():
             if isinstance(v, str) and (v.startswith('{') or v.startswith('[')):
                 try:
-                    form_data[k] = json.loads(v)
+                    form_data[k] = json_codec.loads(v)
                 except:
                     pass # Keep as string if not valid JSON
+        return form_data
+
+    def apply_batch(self, operations: list):
+        """
+        Applies a list of operations in one transaction, so they share a single change-feed
+        revision and either all land or none do. Each operation is a dict:
+            {"op": "update", "uid": ..., "data": {...}}   data as for update_node ('name' renames)
+            {"op": "create", "parent_uid": ..., "type": ..., "data": {"name": ..., ...}}
+            {"op": "delete", "uid": ...}
+        A uid or parent_uid of "$n" refers to the node created by operation n of the same batch.
+        Returns {"revision", "uids"} with the node each operation touched.
+        Raises ValueError naming the first bad operation; nothing is written in that case.
+        """
+        uids = []
+        created = {} # Operation index -> node id, for "$n" references
+
+        def resolve(i, ref):
+            if isinstance(ref, str) and ref.startswith('$'):
+                try: n = int(ref[1:])
+                except ValueError: raise ValueError(f"Operation {i}: malformed reference {ref!r} (expected $<operation index>)")
+                if n not in created: raise ValueError(f"Operation {i}: {ref} does not refer to an earlier create")
+                return created[n]
+            try: return self._parse_uid(ref)
+            except (TypeError, ValueError): raise ValueError(f"Operation {i}: invalid uid {ref!r}")
+
+        with self.db.transaction():
+            for i, op in enumerate(operations):
+                kind, data = op.get('op'), dict(op.get('data') or {})
+                try:
+                    if kind == 'create':
+                        name = data.pop('name', None)
+                        if not op.get('type') or not name: raise ValueError(f"Operation {i}: create needs a type and data.name")
+                        parent_id = resolve(i, op['parent_uid']) if op.get('parent_uid') is not None else None
+                        node_id = self.db.create_node(op['type'], name, parent_id, self._parse_form_values(data))
+                        created[i] = node_id
+                    elif kind == 'update':
+                        node_id = resolve(i, op.get('uid'))
+                        name = data.pop('name', None)
+                        if self.db.update_node(node_id, name=name, properties=self._parse_form_values(data)) is None:
+                            raise ValueError(f"Operation {i}: node {op.get('uid')} could not be updated")
+                    elif kind == 'delete':
+                        node_id = resolve(i, op.get('uid'))
+                        if not self.db.delete_node(node_id): raise ValueError(f"Operation {i}: node {op.get('uid')} does not exist")
+                    else:
+                        raise ValueError(f"Operation {i}: unknown op {kind!r}")
+                except sqlite3.IntegrityError as e:
+                    # e.g. a parent_uid that does not exist (foreign key)
+                    raise ValueError(f"Operation {i}: {e}")
+                uids.append(self._format_uid(node_id))
+            revision = self.db.current_revision() # Read inside the transaction: the revision these writes share
+        return {"revision": revision, "uids": uids}
+
+    def get_view_etag(self, uid: str, variant: str = ""):
+        """
+        Strong ETag for get_node()'s response: changes when the node, any child or the set
+        of children changes. variant (the query string) keeps different projections apart.
+        """
+        revision = self.db.get_view_revision(self._parse_uid(uid))
+        if revision is None: return None
+        return '"%d-%d-%d-%08x"' % (*revision, zlib.crc32(variant.encode()))
 
-        self.db.update_node(node_id, name=name, properties=form_data)
\ No newline at end of file
+    def get_changes(self, since: int, limit: int = CHANGES_PAGE):
+        """
+        Changes after revision since, plus the revision to ask from next time. since < 0
+        just returns the current revision. resync is set when the changes after since are
+        no longer all kept (or since is from another DB): reload, then continue from revision.
+        """
+        if since < 0: return {"revision": self.db.current_revision(), "changes": [], "resync": False}
+        current = self.db.current_revision()
+        if since > current or since < self.db.oldest_revision() - 1:
+            return {"revision": current, "changes": [], "resync": True}
+        rows = self.db.get_changes(since, limit)
+        changes = [{
+            "rev": r['rev'],
+            "uid": self._format_uid(r['node_id']),
+            "parent_uid": self._format_uid(r['parent_id']) if r['parent_id'] else None,
+            "kind": r['kind']
+        } for r in rows]
+        revision = rows[-1]['rev'] if rows else current
+        return {"revision": revision, "changes": changes, "resync": False}
@@ -1,30 +1,111 @@
 import sqlite3
-import json
+import threading
+from contextlib import contextmanager
 from typing import Optional, Dict, List, Any
+from codex_engine.utils import json_codec
 
 # VERBOSITY LEVELS: 0 = NONE, 1 = INFO (Entry/Exit), 2 = DEBUG (SQL/Data)
 LOG_NONE  = 0
 LOG_INFO  = 1 
 LOG_DEBUG = 2 
 
+# CHANGE FEED RETENTION: clients further behind than this must resync (see get_changes)
+CHANGE_LOG_KEEP_REVISIONS = 10000
+CHANGE_LOG_PRUNE_EVERY = 500 # Revisions between prunes of the change log
+
 class DBManager:
-    def __init__(self, db_path, verbosity=2):
+    def __init__(self, db_path, verbosity=2, reuse_connections=False):
         self.db_path = db_path
         self.verbosity = verbosity
+        # Long-lived servers keep one open connection per worker thread instead of connecting per call
+        self.reuse_connections = reuse_connections
+        self._local = threading.local() # Per-thread open transaction (and reused connection)
+        self._pool = []
+        self._pool_lock = threading.Lock()
         self._initialize_tables()
 
+    @property
+    def _tx_conn(self):
+        return getattr(self._local, 'tx_conn', None)
+
+    @_tx_conn.setter
+    def _tx_conn(self, conn):
+        self._local.tx_conn = conn
+
     def _log(self, level, message):
         if self.verbosity >= level:
             prefix = "[DB INFO]" if level == LOG_INFO else "[DB DEBUG]"
             print(f"{prefix} {message}")
 
-    def get_connection(self):
-        conn = sqlite3.connect(self.db_path)
+    def get_connection(self, check_same_thread=True):
+        conn = sqlite3.connect(self.db_path, check_same_thread=check_same_thread)
         conn.execute("PRAGMA journal_mode=WAL;")
         conn.execute("PRAGMA foreign_keys = ON;")
         conn.row_factory = sqlite3.Row
         return conn
 
+    def _thread_connection(self):
+        """This thread's reused connection (reuse_connections mode), opened on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self.get_connection(check_same_thread=False) # Only its own thread uses it, but close() may run elsewhere
+            self._local.conn = conn
+            with self._pool_lock: self._pool.append(conn)
+        return conn
+
+    def close(self):
+        """Closes the reused connections; only needed with reuse_connections."""
+        with self._pool_lock:
+            for conn in self._pool: conn.close()
+            self._pool.clear()
+            self._local = threading.local()
+
+    @contextmanager
+    def _connection(self):
+        """Yields the open transaction's connection, or a short-lived autocommitting one."""
+        if self._tx_conn is not None:
+            yield self._tx_conn
+            return
+        if self.reuse_connections:
+            with self._thread_connection() as conn:
+                yield conn
+            return
+        conn = self.get_connection()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Groups every write made inside the block into a single commit.
+        Reads inside the block see the uncommitted writes; nested calls join the outer transaction.
+        Takes the write lock up front (BEGIN IMMEDIATE), so a read-modify-write inside the block
+        cannot interleave with another writer's.
+        """
+        if self._tx_conn is not None:
+            yield self._tx_conn
+            return
+        self._log(LOG_INFO, "ENTER: transaction")
+        conn = self._thread_connection() if self.reuse_connections else self.get_connection()
+        self._tx_conn = conn
+        self._local.tx_rev = None # Every change in the transaction shares one revision
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.commit()
+            self._log(LOG_INFO, "EXIT: transaction (Committed)")
+        except Exception:
+            conn.rollback()
+            self._log(LOG_INFO, "EXIT: transaction (Rolled back)")
+            raise
+        finally:
+            self._tx_conn = None
+            self._local.tx_rev = None
+            if not self.reuse_connections: conn.close()
+
     def _initialize_tables(self):
         self._log(LOG_INFO, "ENTER: _initialize_tables")
         query = """
@@ -38,22 +119,61 @@ class DBManager:
             FOREIGN KEY(parent_id) REFERENCES registry(id) ON DELETE CASCADE
         ) STRICT;
         """
-        with self.get_connection() as conn:
+        # Change feed: one row per node write; rev grows monotonically (a transaction's writes share one)
+        change_log = """
+        CREATE TABLE IF NOT EXISTS change_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            rev INTEGER NOT NULL,
+            node_id INTEGER NOT NULL,
+            parent_id INTEGER,
+            kind TEXT NOT NULL
+        ) STRICT;
+        """
+        with self._connection() as conn:
             conn.execute(query)
             conn.execute("CREATE INDEX IF NOT EXISTS idx_parent ON registry(parent_id);")
             conn.execute("CREATE INDEX IF NOT EXISTS idx_type ON registry(type);")
-            conn.commit()
+            # Revision of each node's last write (databases from before the change feed start at 0)
+            columns = [r['name'] for r in conn.execute("PRAGMA table_info(registry)")]
+            if 'revision' not in columns:
+                conn.execute("ALTER TABLE registry ADD COLUMN revision INTEGER NOT NULL DEFAULT 0;")
+            # Where each property's value sits in the properties text (see get_node_fields); NULL until the node is next written
+            if 'property_spans' not in columns:
+                conn.execute("ALTER TABLE registry ADD COLUMN property_spans TEXT;")
+            conn.execute(change_log)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_change_rev ON change_log(rev);")
         self._log(LOG_INFO, "EXIT: _initialize_tables")
 
+    def _record_change(self, conn, node_id, parent_id, kind, rev=None):
+        """
+        Logs a write on conn (inside the same commit) and stamps the node with its revision.
+        Pass rev to log several rows under one revision outside a transaction.
+        """
+        if rev is None and self._tx_conn is conn: rev = getattr(self._local, 'tx_rev', None)
+        if rev is None:
+            # Computed inside the INSERT, which holds the write lock, so concurrent writers cannot share a revision
+            cursor = conn.execute(
+                "INSERT INTO change_log (rev, node_id, parent_id, kind) VALUES ((SELECT COALESCE(MAX(rev), 0) + 1 FROM change_log), ?, ?, ?)",
+                (node_id, parent_id, kind))
+            rev = conn.execute("SELECT rev FROM change_log WHERE id = ?", (cursor.lastrowid,)).fetchone()['rev']
+            if self._tx_conn is conn: self._local.tx_rev = rev
+            if rev % CHANGE_LOG_PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM change_log WHERE rev <= ?", (rev - CHANGE_LOG_KEEP_REVISIONS,))
+        else:
+            conn.execute("INSERT INTO change_log (rev, node_id, parent_id, kind) VALUES (?, ?, ?, ?)", (rev, node_id, parent_id, kind))
+        if kind != 'delete':
+            conn.execute("UPDATE registry SET revision = ? WHERE id = ?", (rev, node_id))
+        return rev
+
     def create_node(self, type, name, parent_id=None, properties=None) -> int:
         self._log(LOG_INFO, f"ENTER: create_node (Type: {type})")
         self._log(LOG_DEBUG, f"ENTER: create_node (Type: {properties})")
-        prop_json = json.dumps(properties if properties else {})
-        sql = "INSERT INTO registry (parent_id, type, name, properties) VALUES (?, ?, ?, ?)"
-        with self.get_connection() as conn:
-            cursor = conn.execute(sql, (parent_id, type, name, prop_json))
-            conn.commit()
+        prop_json, spans = json_codec.dumps_members(properties if properties else {})
+        sql = "INSERT INTO registry (parent_id, type, name, properties, property_spans) VALUES (?, ?, ?, ?, ?)"
+        with self._connection() as conn:
+            cursor = conn.execute(sql, (parent_id, type, name, prop_json, json_codec.dumps(spans)))
             nid = cursor.lastrowid
+            self._record_change(conn, nid, parent_id, 'create')
             self._log(LOG_INFO, f"EXIT: create_node (New ID: {nid})")
             return nid
         
@@ -61,13 +181,62 @@ class DBManager:
         # SILENCED: Log only on DEBUG level to prevent draw-loop spam
         #if self.verbosity >= LOG_DEBUG: print(f"[DB DEBUG] get_node (ID: {node_id})")
         sql = "SELECT * FROM registry WHERE id = ?"
-        with self.get_connection() as conn:
+        with self._connection() as conn:
             row = conn.execute(sql, (node_id,)).fetchone()
             if not row: return None
             data = dict(row)
-            data['properties'] = json.loads(data['properties'])
+            data.pop('property_spans', None)
+            data['properties'] = json_codec.loads(data['properties'])
             return data
-    
+
+    def get_node_fields(self, node_id: int, keys=None, max_chars: int = None) -> Optional[Dict]:
+        """
+        Like get_node(), but only decodes what is returned: just keys (default all), and
+        values whose JSON is longer than max_chars are left out. Those keep their place
+        in 'properties' as None and their JSON length goes in 'large' (key -> chars).
+        Uses property_spans to slice values out of the text; older rows are decoded whole.
+        """
+        sql = "SELECT id, parent_id, type, name, properties, property_spans FROM registry WHERE id = ?"
+        with self._connection() as conn:
+            row = conn.execute(sql, (node_id,)).fetchone()
+        if not row: return None
+        data = {k: row[k] for k in ('id', 'parent_id', 'type', 'name')}
+        text = row['properties']
+        if row['property_spans'] is None:
+            spans = None
+            decoded = json_codec.loads(text)
+            sizes = {k: len(json_codec.dumps(v)) for k, v in decoded.items()}
+        else:
+            spans = json_codec.loads(row['property_spans'])
+            sizes = {k: end - start for k, (start, end) in spans.items()}
+
+        props, large, members = {}, {}, []
+        for key, size in sizes.items():
+            if keys is not None and key not in keys: continue
+            if max_chars is not None and size > max_chars:
+                props[key], large[key] = None, size
+            elif spans is None:
+                props[key] = decoded[key]
+            else:
+                props[key] = None # Placeholder keeps the stored order; filled below
+                start, end = spans[key]
+                members.append(json_codec.dumps(key) + ":" + text[start:end])
+        if members: props.update(json_codec.loads("{" + ",".join(members) + "}"))
+        data['properties'], data['large'] = props, large
+        return data
+
+    def get_node_property(self, node_id: int, key: str):
+        """(found, value) for one property, decoding nothing else where property_spans allows."""
+        with self._connection() as conn:
+            row = conn.execute("SELECT properties, property_spans FROM registry WHERE id = ?", (node_id,)).fetchone()
+        if not row: return False, None
+        if row['property_spans'] is None:
+            props = json_codec.loads(row['properties'])
+            return (True, props[key]) if key in props else (False, None)
+        span = json_codec.loads(row['property_spans']).get(key)
+        if span is None: return False, None
+        return True, json_codec.loads(row['properties'][span[0]:span[1]])
+
     def get_node_by_coords(self, campaign_id, parent_id, x, y):
         """Finds a node by checking grid coordinates in its properties."""
         self._log(LOG_INFO, f"ENTER: get_node_by_coords (Target: {x}, {y})")
@@ -88,7 +257,7 @@ class DBManager:
     def find_node(self, type: str) -> Optional[Dict]:
         self._log(LOG_INFO, f"ENTER: find_node (Type: {type})")
         sql = "SELECT id FROM registry WHERE type = ? LIMIT 1"
-        with self.get_connection() as conn:
+        with self._connection() as conn:
             row = conn.execute(sql, (type,)).fetchone()
             if row:
                 res = self.get_node(row['id'])
@@ -99,6 +268,14 @@ class DBManager:
 
     def update_node(self, node_id: int, name: str = None, properties: Dict = None):
         self._log(LOG_INFO, f"ENTER: update_node (ID: {node_id})")
+        try:
+            # Read and write under one write lock, or concurrent updates would drop each other's keys
+            with self.transaction():
+                return self._update_node(node_id, name, properties)
+        except:
+            return None # Return NULL on SQL failure
+
+    def _update_node(self, node_id, name, properties):
         current = self.get_node(node_id)
         
         if not current: 
@@ -120,24 +297,34 @@ class DBManager:
                 else:
                     current['properties'][k] = v
 
-        sql = "UPDATE registry SET name = ?, properties = ? WHERE id = ?"
-        params = (new_name, json.dumps(current['properties']), node_id)
+        sql = "UPDATE registry SET name = ?, properties = ?, property_spans = ? WHERE id = ?"
+        prop_json, spans = json_codec.dumps_members(current['properties'])
+        params = (new_name, prop_json, json_codec.dumps(spans), node_id)
         
-        try:
-            with self.get_connection() as conn:
-                conn.execute(sql, params)
-                conn.commit()
-            self._log(LOG_INFO, "EXIT: update_node")
-            return node_id # Return the ID on success
-        except:
-            return None # Return NULL on SQL failure
+        with self._connection() as conn:
+            conn.execute(sql, params)
+            self._record_change(conn, node_id, current['parent_id'], 'update')
+        self._log(LOG_INFO, "EXIT: update_node")
+        return node_id # Return the ID on success
 
     def delete_node(self, node_id: int):
         self._log(LOG_INFO, f"ENTER: delete_node (ID: {node_id})")
-        with self.get_connection() as conn:
+        # ON DELETE CASCADE removes the descendants too; each gets a change row so feed clients drop them
+        subtree = """
+            WITH RECURSIVE subtree(id, parent_id) AS (
+                SELECT id, parent_id FROM registry WHERE id = ?
+                UNION ALL
+                SELECT r.id, r.parent_id FROM registry r JOIN subtree s ON r.parent_id = s.id
+            )
+            SELECT id, parent_id FROM subtree
+        """
+        with self._connection() as conn:
+            rows = conn.execute(subtree, (node_id,)).fetchall()
             conn.execute("DELETE FROM registry WHERE id = ?", (node_id,))
-            conn.commit()
+            rev = None
+            for row in rows: rev = self._record_change(conn, row['id'], row['parent_id'], 'delete', rev)
         self._log(LOG_INFO, "EXIT: delete_node")
+        return bool(rows) # False if there was no such node
 
     def get_children(self, parent_id: Optional[int], type_filter: str = None) -> List[Dict]:
         #if self.verbosity >= LOG_DEBUG: print(f"[DB DEBUG] get_children (Parent: {parent_id})")
@@ -146,10 +333,57 @@ class DBManager:
         if type_filter:
             sql += " AND type = ?"
             params.append(type_filter)
-        with self.get_connection() as conn:
+        with self._connection() as conn:
             rows = conn.execute(sql, tuple(params)).fetchall()
             return [self.get_node(r['id']) for r in rows]
         
+    def get_child_summaries(self, parent_id: Optional[int], limit: int = None, after_id: int = None) -> List[Dict]:
+        """id/type/name of the children in id order, without loading their properties; after_id + limit page through them."""
+        sql = "SELECT id, type, name FROM registry WHERE " + ("parent_id IS NULL" if parent_id is None else "parent_id = ?")
+        params = [parent_id] if parent_id is not None else []
+        if after_id is not None:
+            sql += " AND id > ?"
+            params.append(after_id)
+        sql += " ORDER BY id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._connection() as conn:
+            return [dict(r) for r in conn.execute(sql, tuple(params)).fetchall()]
+
+    # --- Change feed ---
+
+    def current_revision(self) -> int:
+        with self._connection() as conn:
+            return conn.execute("SELECT COALESCE(MAX(rev), 0) AS rev FROM change_log").fetchone()['rev']
+
+    def oldest_revision(self) -> int:
+        """Oldest revision still in the change log (older ones are pruned); 0 if it is empty."""
+        with self._connection() as conn:
+            return conn.execute("SELECT COALESCE(MIN(rev), 0) AS rev FROM change_log").fetchone()['rev']
+
+    def get_changes(self, since: int, limit: int = 500) -> List[Dict]:
+        """Changes after revision `since`, oldest first; whole revisions only, so a batch never straddles two pages."""
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT rev, node_id, parent_id, kind FROM change_log WHERE rev > ? ORDER BY id LIMIT ?",
+                (since, limit)).fetchall()
+            changes = [dict(r) for r in rows]
+            if len(changes) == limit:
+                last = changes[-1]['rev']
+                rest = conn.execute("SELECT rev, node_id, parent_id, kind FROM change_log WHERE rev = ? ORDER BY id LIMIT -1 OFFSET ?",
+                                    (last, sum(1 for c in changes if c['rev'] == last))).fetchall()
+                changes.extend(dict(r) for r in rest)
+            return changes
+
+    def get_view_revision(self, node_id: int):
+        """(node revision, newest child revision, child count) - changes whenever the node or its child list does; None if missing."""
+        with self._connection() as conn:
+            node = conn.execute("SELECT revision FROM registry WHERE id = ?", (node_id,)).fetchone()
+            if not node: return None
+            kids = conn.execute("SELECT COALESCE(MAX(revision), 0) AS rev, COUNT(*) AS n FROM registry WHERE parent_id = ?", (node_id,)).fetchone()
+            return node['revision'], kids['rev'], kids['n']
+
     def get_parent(self, node_id: int) -> Optional[Dict]:
         """Returns the parent node of the given node."""
         self._log(LOG_INFO, f"ENTER: get_parent (Child ID: {node_id})")
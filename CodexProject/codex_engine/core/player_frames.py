@@ -0,0 +1,404 @@
+import math
+import multiprocessing
+import struct
+import time
+from multiprocessing import shared_memory
+import numpy as np
+import pygame
+
+# Shared frame buffers are sized once for the largest frame the GM may send (RGB, 3 bytes/px).
+# Larger surfaces are scaled down to fit before sending.
+FRAME_MAX_SIZE = (3840, 2160)
+FRAME_HEADER = struct.Struct('<qII') # seq, width, height
+FRAME_BUFFERS = 2
+PLAYER_VIEW_MAX_FPS = 30 # Matches the player window's refresh loop
+FRAME_DIRTY_TILE = 64 # Frames are diffed in tiles of this many pixels; changed tiles become update rects
+FRAME_FULL_UPDATE_FRACTION = 0.5 # Above this share of changed tiles a full redraw is cheaper than rects
+STREAM_MAX_SIZE = (1280, 720) # Browser viewers get the player window scaled down to fit this
+STREAM_FPS = 15 # Most images per second published to / encoded for browser viewers
+STREAM_VIEWERS = struct.Struct('<I') # Follows the frame header in the stream buffer; written by the server
+
+# --- Dirty rectangles ---
+
+def dirty_rects(old, new, tile=FRAME_DIRTY_TILE):
+    """
+    Rects (frame pixels) covering every tile where two (h, w, 3) frames differ, merged
+    along rows and then down columns of equal span. None means "redraw everything".
+    """
+    h, w = old.shape[:2]
+    # Compared as byte rows: a tile is tile * 3 bytes wide (much faster than .any() over the channel axis)
+    changed = old.reshape(h, -1) != new.reshape(h, -1)
+    rows = np.logical_or.reduceat(changed, np.arange(0, h, tile), axis=0)
+    tiles = np.logical_or.reduceat(rows, np.arange(0, w * 3, tile * 3), axis=1)
+    if tiles.mean() > FRAME_FULL_UPDATE_FRACTION: return None
+
+    rects = []
+    open_runs = {} # (x0, x1) in tiles -> rect growing downwards from the previous tile row
+    for ty, row in enumerate(tiles.tolist()):
+        runs, tx = {}, 0
+        while tx < len(row):
+            if not row[tx]:
+                tx += 1
+                continue
+            start = tx
+            while tx < len(row) and row[tx]: tx += 1
+            rect = open_runs.get((start, tx))
+            if rect is None:
+                rect = pygame.Rect(start * tile, ty * tile, min(w, tx * tile) - start * tile, 0)
+                rects.append(rect)
+            rect.height = min(h, (ty + 1) * tile) - rect.top
+            runs[(start, tx)] = rect
+        open_runs = runs
+    return rects
+
+def blit_frame(screen, frame, rects=None):
+    """
+    Draws frame stretched over screen; with rects (frame pixels) only those regions are
+    redrawn. Returns the screen rects touched, for pygame.display.update().
+    """
+    sw, sh = screen.get_size()
+    fw, fh = frame.get_size()
+    if rects is None:
+        screen.blit(frame if (fw, fh) == (sw, sh) else pygame.transform.smoothscale(frame, (sw, sh)), (0, 0))
+        return [screen.get_rect()]
+    if (fw, fh) == (sw, sh):
+        for rect in rects: screen.blit(frame, rect, rect)
+        return list(rects)
+
+    # Shrinking is box filtering, so a region scaled on its own matches the full-frame scale
+    # when it starts on a whole period of the ratio (e.g. every 3 source px for 1920 -> 1280).
+    # Enlarging interpolates over the whole width and never lines up: scale the full frame once.
+    period_x, period_y = fw // math.gcd(fw, sw), fh // math.gcd(fh, sh)
+    per_region = sw <= fw and sh <= fh and period_x <= FRAME_DIRTY_TILE and period_y <= FRAME_DIRTY_TILE
+    if not per_region:
+        scaled_frame = pygame.transform.smoothscale(frame, (sw, sh))
+    fx, fy = sw / fw, sh / fh
+    touched = []
+    for rect in rects:
+        x0, y0 = math.floor(rect.left * fx), math.floor(rect.top * fy)
+        target = pygame.Rect(x0, y0, math.ceil(rect.right * fx) - x0, math.ceil(rect.bottom * fy) - y0)
+        if not per_region:
+            screen.blit(scaled_frame, target, target)
+        else:
+            # Period-aligned source with one period of margin for the filter's neighbours
+            sx0 = max(0, (rect.left // period_x - 1) * period_x)
+            sy0 = max(0, (rect.top // period_y - 1) * period_y)
+            sx1 = min(fw, (-(-rect.right // period_x) + 1) * period_x)
+            sy1 = min(fh, (-(-rect.bottom // period_y) + 1) * period_y)
+            scaled = pygame.transform.smoothscale(frame.subsurface((sx0, sy0, sx1 - sx0, sy1 - sy0)), (round((sx1 - sx0) * fx), round((sy1 - sy0) * fy)))
+            screen.blit(scaled, target, target.move(-round(sx0 * fx), -round(sy0 * fy)))
+        touched.append(target)
+    return touched
+
+# --- Scene deltas ---
+# In scene mode the GM sends a small dict instead of pixels. Dict-valued keys (e.g. the
+# view) are diffed entry by entry, everything else is replaced whole; "load" starts a
+# fresh state from the live level it carries. SCENE_EVENT_KEYS are sent as given and
+# never diffed or kept: the source already hands over only what is new.
+SCENE_EVENT_KEYS = ("level", "cells")
+
+def scene_delta(old, new):
+    delta = {}
+    for key, value in new.items():
+        before = old.get(key)
+        if isinstance(value, dict) and isinstance(before, dict):
+            changed = {k: v for k, v in value.items() if k not in before or before[k] != v}
+            if changed: delta[key] = changed
+        elif key not in old or before != value:
+            delta[key] = value
+    return delta
+
+def merge_scene(base, delta):
+    """Folds delta into base (in place) so several queued deltas apply as one."""
+    if delta.get('load'): base.clear()
+    for key, value in delta.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict): base[key].update(value)
+        else: base[key] = dict(value) if isinstance(value, dict) else value
+    return base
+
+class FrameChannel:
+    """
+    GM side of the player-window transport.
+
+    Frames are written straight into one of two shared-memory buffers (alternating by
+    sequence number) and only the sequence number goes through the control queue, so
+    the queue never carries pixels and cannot back up with stale multi-megabyte frames.
+    Each buffer starts with a (seq, width, height) header and has its own lock, held
+    while the buffer is written or copied out.
+
+    Every frame message also carries the rects that changed since the previous frame,
+    found by diffing against the other buffer, so the player window can patch and
+    present just those regions.
+
+    Alternatively send_scene() ships scene deltas for the player window to render
+    itself; the player window answers on the replies queue (e.g. newly explored cells).
+    """
+    def __init__(self, max_size=FRAME_MAX_SIZE):
+        self.max_size = max_size
+        capacity = FRAME_HEADER.size + max_size[0] * max_size[1] * 3
+        self.buffers = [shared_memory.SharedMemory(create=True, size=capacity) for _ in range(FRAME_BUFFERS)]
+        self.locks = [multiprocessing.Lock() for _ in range(FRAME_BUFFERS)]
+        self.control = multiprocessing.Queue()
+        self.replies = multiprocessing.Queue()
+        self.seq = 0
+        self.scene_source = None # Object whose scene the player window holds; a new source forces a reload
+        self.scene = {}
+
+    def handle(self):
+        """Picklable arguments for FrameReceiver in the player process."""
+        return ([b.name for b in self.buffers], self.locks, self.control, self.replies, self.max_size)
+
+    def send_surface(self, surface):
+        max_w, max_h = self.max_size
+        w, h = surface.get_size()
+        if w > max_w or h > max_h:
+            ratio = min(max_w / w, max_h / h)
+            surface = pygame.transform.smoothscale(surface, (int(w * ratio), int(h * ratio)))
+            w, h = surface.get_size()
+
+        self.scene_source = None
+        self.seq += 1
+        index = self.seq % FRAME_BUFFERS
+        buf = self.buffers[index].buf
+        with self.locks[index]:
+            FRAME_HEADER.pack_into(buf, 0, self.seq, w, h)
+            # A surface over the shared pixels: the blit converts straight into shared memory
+            target = pygame.image.frombuffer(buf[FRAME_HEADER.size:FRAME_HEADER.size + w * h * 3], (w, h), 'RGB')
+            target.blit(surface, (0, 0))
+            del target
+        self.control.put(("FRAME", self.seq, self._changed_rects(index, w, h)))
+        return self.seq
+
+    def _changed_rects(self, index, w, h):
+        """Dirty rects against the previous frame (still in the other buffer); None if it is not comparable."""
+        prev = self.buffers[(index - 1) % FRAME_BUFFERS].buf
+        prev_seq, prev_w, prev_h = FRAME_HEADER.unpack_from(prev, 0)
+        if prev_seq != self.seq - 1 or (prev_w, prev_h) != (w, h): return None
+        # Only this process writes frames, so the buffers can be read without taking the locks
+        n = w * h * 3
+        old = np.frombuffer(prev, dtype=np.uint8, count=n, offset=FRAME_HEADER.size).reshape(h, w, 3)
+        new = np.frombuffer(self.buffers[index].buf, dtype=np.uint8, count=n, offset=FRAME_HEADER.size).reshape(h, w, 3)
+        rects = dirty_rects(old, new)
+        del old, new # Views into shared memory must be gone before close()
+        return rects
+
+    def send(self, command):
+        """Control commands understood by the player window: "REVERT", "QUIT"."""
+        self.scene_source = None
+        self.control.put(command)
+
+    def send_scene(self, source):
+        """
+        Sends what changed in source.player_scene_state() since the last call; a new source
+        is asked for its whole level (load=True). Returns the delta sent, or None.
+        """
+        load = source is not self.scene_source
+        state = source.player_scene_state(load)
+        events = {k: state.pop(k) for k in SCENE_EVENT_KEYS if k in state}
+        if load:
+            self.scene_source, self.scene = source, {}
+            delta = dict(state, load=True)
+        else:
+            delta = scene_delta(self.scene, state)
+        merge_scene(self.scene, delta)
+        delta.update(events)
+        if not delta: return None
+        self.control.put(("SCENE", delta))
+        return delta
+
+    def poll_replies(self):
+        """Messages from the player window, oldest first, without blocking."""
+        replies = []
+        while not self.replies.empty():
+            try: replies.append(self.replies.get_nowait())
+            except Exception: break
+        return replies
+
+    def close(self):
+        for b in self.buffers:
+            b.close()
+            b.unlink()
+
+class FrameReceiver:
+    """Player-process side of a FrameChannel."""
+    def __init__(self, handle):
+        names, self.locks, self.control, self.replies, self.max_size = handle
+        self.buffers = [shared_memory.SharedMemory(name=name) for name in names]
+        self.scene = {} # Scene deltas received but not yet taken, merged
+        self.frame = None # Frame on screen, patched in place by partial updates; None after anything else was shown
+        self.dirty = None # Rects of self.frame changed by the last poll(); None = whole frame
+        self.frames_shown = 0
+        self.frames_skipped = 0 # Announced frames never copied because a newer frame or command followed
+
+    def poll(self):
+        """
+        Drains the control queue and returns only what should be shown now: "QUIT",
+        "REVERT", "SCENE" (take_scene() holds the merged deltas), the newest frame as
+        a Surface (self.dirty then lists the rects that changed), or None if nothing
+        arrived. Frames superseded by a later frame or command are never copied;
+        scene deltas are never dropped, only merged.
+        """
+        latest = None
+        dirty = [] # Union of the changed rects of every frame since the one on screen
+        while not self.control.empty():
+            try: message = self.control.get_nowait()
+            except Exception: break
+            if message == "QUIT": return "QUIT"
+            if latest == "FRAME": self.frames_skipped += 1
+            if isinstance(message, tuple) and message[0] == "SCENE":
+                merge_scene(self.scene, message[1])
+                message = "SCENE"
+            if isinstance(message, tuple):
+                _, seq, rects = message
+                dirty = None if dirty is None or rects is None else dirty + rects
+                message = "FRAME"
+            else:
+                self.frame = None # The screen no longer shows the last frame
+                dirty = []
+            latest = message
+        if latest != "FRAME": return latest
+        self.frames_shown += 1
+        return self._read(seq, dirty)
+
+    def take_scene(self):
+        scene, self.scene = self.scene, {}
+        return scene
+
+    def reply(self, message):
+        self.replies.put(message)
+
+    def _read(self, seq, dirty):
+        index = seq % FRAME_BUFFERS
+        buf = self.buffers[index].buf
+        with self.locks[index]:
+            # The buffer may already hold a newer frame; its own header is authoritative
+            buf_seq, w, h = FRAME_HEADER.unpack_from(buf, 0)
+            frame = pygame.image.frombuffer(buf[FRAME_HEADER.size:FRAME_HEADER.size + w * h * 3], (w, h), 'RGB')
+            if dirty is None or buf_seq != seq or self.frame is None or self.frame.get_size() != (w, h):
+                self.frame, self.dirty = frame.copy(), None
+            else:
+                for rect in dirty: self.frame.blit(frame, rect, rect)
+                self.dirty = dirty
+            del frame
+        return self.frame
+
+    def close(self):
+        for b in self.buffers: b.close()
+
+class PlayerViewScheduler:
+    """
+    Coalesces player-view render requests (e.g. one per mouse-motion event while a view
+    cone is dragged). request() only marks the view stale; tick(), called once per GM
+    frame, renders at most once and no more often than max_fps, so every request that
+    arrives in between is folded into the next render instead of queuing its own frame.
+    """
+    def __init__(self, render, max_fps=PLAYER_VIEW_MAX_FPS, clock=time.perf_counter):
+        self.render = render
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.clock = clock
+        self.pending = 0
+        self.last_render = None
+        self.requests = 0
+        self.rendered = 0
+        self.dropped = 0      # Requests superseded by a later one before they were rendered
+        self.render_time = 0.0
+
+    def request(self):
+        self.requests += 1
+        self.pending += 1
+
+    def tick(self):
+        """Renders if a request is pending and the frame budget allows; returns True if it rendered."""
+        if not self.pending: return False
+        now = self.clock()
+        if self.last_render is not None and now - self.last_render < self.min_interval: return False
+        return self._render(now)
+
+    def flush(self):
+        """Renders a pending request immediately, ignoring the frame budget."""
+        return self._render(self.clock()) if self.pending else False
+
+    def _render(self, now):
+        self.dropped += self.pending - 1
+        self.pending = 0
+        self.last_render = now
+        self.render()
+        self.rendered += 1
+        self.render_time += self.clock() - now
+        return True
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "rendered": self.rendered,
+            "dropped": self.dropped,
+            "avg_render_ms": round(1000 * self.render_time / self.rendered, 2) if self.rendered else 0.0,
+        }
+
+class PlayerStream:
+    """
+    Latest image of the player window, shared with the web server process so browsers
+    can watch the player view. One shared buffer holds (seq, width, height), the
+    server's viewer count, then RGB pixels. The player window publishes at most
+    STREAM_FPS times a second and only while the server reports viewers; the server
+    copies out the newest image whenever it is ready for one.
+    """
+    def __init__(self, handle=None, max_size=STREAM_MAX_SIZE):
+        if handle is None:
+            self.max_size = max_size
+            capacity = FRAME_HEADER.size + STREAM_VIEWERS.size + max_size[0] * max_size[1] * 3
+            self.shm = shared_memory.SharedMemory(create=True, size=capacity)
+            self.shm.buf[:FRAME_HEADER.size + STREAM_VIEWERS.size] = bytes(FRAME_HEADER.size + STREAM_VIEWERS.size)
+            self.lock = multiprocessing.Lock()
+            self.owner = True
+        else:
+            name, self.lock, self.max_size = handle
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.pixels_at = FRAME_HEADER.size + STREAM_VIEWERS.size
+        self.seq = 0
+        self.last_publish = 0.0
+
+    def handle(self):
+        return (self.shm.name, self.lock, self.max_size)
+
+    def viewers(self):
+        return STREAM_VIEWERS.unpack_from(self.shm.buf, FRAME_HEADER.size)[0]
+
+    def set_viewers(self, count):
+        STREAM_VIEWERS.pack_into(self.shm.buf, FRAME_HEADER.size, count)
+
+    def publish(self, surface):
+        """Player side: shares surface if anyone is watching and the rate allows; returns True if it did."""
+        now = time.perf_counter()
+        if not self.viewers() or now - self.last_publish < 1.0 / STREAM_FPS: return False
+        self.last_publish = now
+        max_w, max_h = self.max_size
+        w, h = surface.get_size()
+        if w > max_w or h > max_h:
+            ratio = min(max_w / w, max_h / h)
+            surface = pygame.transform.smoothscale(surface, (max(1, int(w * ratio)), max(1, int(h * ratio))))
+            w, h = surface.get_size()
+        self.seq += 1
+        buf = self.shm.buf
+        with self.lock:
+            FRAME_HEADER.pack_into(buf, 0, self.seq, w, h)
+            target = pygame.image.frombuffer(buf[self.pixels_at:self.pixels_at + w * h * 3], (w, h), 'RGB')
+            target.blit(surface, (0, 0))
+            del target
+        return True
+
+    def read(self, after_seq=0):
+        """Server side: (seq, Surface copy) of the newest image if it is newer than after_seq, else None."""
+        buf = self.shm.buf
+        with self.lock:
+            seq, w, h = FRAME_HEADER.unpack_from(buf, 0)
+            if seq <= after_seq: return None
+            image = pygame.image.frombuffer(buf[self.pixels_at:self.pixels_at + w * h * 3], (w, h), 'RGB')
+            surface = image.copy()
+            del image
+        return seq, surface
+
+    def close(self):
+        self.shm.close()
+        if self.owner: self.shm.unlink()
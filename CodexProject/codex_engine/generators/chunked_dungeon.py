@@ -0,0 +1,222 @@
+import json
+import os
+import random
+from collections import OrderedDict
+import numpy as np
+from codex_engine.utils.pathfinding import CorridorRouter
+from codex_engine.utils.room_graph import candidate_edges
+
+# Grid values match the rest of the engine: 0 = rock, 1 = room floor, 2 = corridor
+DEFAULT_CHUNK_CONFIG = {
+    "chunk_size": 64,
+    "rooms_per_chunk": 16,
+    "min_room_size": 4,
+    "max_room_size": 12,
+    "room_padding": 3,
+    "edge_margin": 3,     # Rooms stay this far from chunk borders so gates are never inside a room
+    "extra_edge_ratio": 0.25,
+}
+WORLD_FILE = "world.json" # In save_dir: the seed and config of the world its chunks belong to
+
+class ChunkedDungeonWorld:
+    """
+    An effectively unbounded megadungeon split into square chunks.
+
+    Every chunk is generated from (seed, chunk_x, chunk_y) alone, so chunks can be
+    created in any order and regenerated identically. Corridors cross chunk borders
+    through 'gates': one cell per shared border whose position is derived from the
+    border's own seed, so both neighbours agree without looking at each other.
+    Only max_resident chunks are kept in memory (LRU); visited chunks are written
+    to save_dir when evicted and read back instead of being regenerated.
+    """
+    def __init__(self, seed, save_dir=None, max_resident=36, config=None):
+        self.seed = seed
+        self.config = {**DEFAULT_CHUNK_CONFIG, **(config or {})}
+        self.chunk_size = self.config['chunk_size']
+        self.save_dir = save_dir
+        self.max_resident = max_resident
+        self.chunks = OrderedDict() # (cx, cy) -> chunk dict, most recently used last
+
+        if self.save_dir: os.makedirs(self.save_dir, exist_ok=True)
+
+    @classmethod
+    def resume(cls, save_dir, seed=None, max_resident=36, config=None):
+        """
+        Reopens the world last used in save_dir, so chunks visited in earlier sessions
+        are read back. Passing a seed (or an empty save_dir) starts that world instead;
+        either way the seed is recorded in save_dir for the next session.
+        """
+        path = os.path.join(save_dir, WORLD_FILE)
+        if seed is None and os.path.exists(path):
+            with open(path, 'r') as f: saved = json.load(f)
+            seed, config = saved['seed'], {**saved.get('config', {}), **(config or {})}
+        if seed is None: seed = random.randrange(2**31)
+        world = cls(seed, save_dir, max_resident, config)
+        with open(path, 'w') as f: json.dump({"seed": world.seed, "config": world.config}, f)
+        return world
+
+    def discard(self):
+        """Deletes this world's saved chunks (before regenerating a new world in the same save_dir)."""
+        self.chunks.clear()
+        if not self.save_dir: return
+        prefix = f"chunk_{self.seed}_"
+        for name in os.listdir(self.save_dir):
+            if name.startswith(prefix): os.remove(os.path.join(self.save_dir, name))
+
+    # --- Chunk access ---
+
+    def chunk_coords(self, x, y):
+        return x // self.chunk_size, y // self.chunk_size
+
+    def get_chunk(self, cx, cy):
+        key = (cx, cy)
+        chunk = self.chunks.get(key)
+        if chunk is not None:
+            self.chunks.move_to_end(key)
+            return chunk
+
+        chunk = self._load_chunk(cx, cy) or self._generate_chunk(cx, cy)
+        self.chunks[key] = chunk
+        while len(self.chunks) > self.max_resident:
+            _, evicted = self.chunks.popitem(last=False)
+            self._save_chunk(evicted)
+        return chunk
+
+    def ensure_region(self, x, y, w, h, margin=1):
+        """Loads every chunk overlapping the region (plus margin chunks) and marks the region's chunks visited."""
+        cx0, cy0 = self.chunk_coords(x, y)
+        cx1, cy1 = self.chunk_coords(x + w - 1, y + h - 1)
+        for cy in range(cy0 - margin, cy1 + margin + 1):
+            for cx in range(cx0 - margin, cx1 + margin + 1):
+                chunk = self.get_chunk(cx, cy)
+                if cx0 <= cx <= cx1 and cy0 <= cy <= cy1: chunk['visited'] = True
+
+    def window(self, x, y, w, h):
+        """
+        Returns (grid, rooms) for a world-space rectangle in window-local coordinates:
+        grid is a list of rows, rooms are [x, y, w, h, label] lists. Rooms that are
+        only partly inside the window are included unclipped.
+        """
+        size = self.chunk_size
+        out = np.zeros((h, w), dtype=np.uint8)
+        rooms = []
+        cx0, cy0 = self.chunk_coords(x, y)
+        cx1, cy1 = self.chunk_coords(x + w - 1, y + h - 1)
+
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                chunk = self.get_chunk(cx, cy)
+                ox, oy = cx * size, cy * size
+                # Overlap of this chunk with the window, in world coords
+                wx0, wy0 = max(x, ox), max(y, oy)
+                wx1, wy1 = min(x + w, ox + size), min(y + h, oy + size)
+                out[wy0 - y:wy1 - y, wx0 - x:wx1 - x] = chunk['grid'][wy0 - oy:wy1 - oy, wx0 - ox:wx1 - ox]
+
+                for rx, ry, rw, rh, label in chunk['rooms']:
+                    if rx < x + w and rx + rw > x and ry < y + h and ry + rh > y:
+                        rooms.append([rx - x, ry - y, rw, rh, label])
+        return out.tolist(), rooms
+
+    def flush(self):
+        """Persists every resident visited chunk (call on shutdown)."""
+        for chunk in self.chunks.values(): self._save_chunk(chunk)
+
+    # --- Persistence ---
+
+    def _chunk_path(self, cx, cy):
+        return os.path.join(self.save_dir, f"chunk_{self.seed}_{cx}_{cy}.json")
+
+    def _save_chunk(self, chunk):
+        if not self.save_dir or not chunk.get('visited'): return
+        data = {
+            "cx": chunk['cx'], "cy": chunk['cy'],
+            "grid": chunk['grid'].tolist(),
+            "rooms": chunk['rooms'],
+        }
+        with open(self._chunk_path(chunk['cx'], chunk['cy']), 'w') as f: json.dump(data, f)
+
+    def _load_chunk(self, cx, cy):
+        if not self.save_dir: return None
+        path = self._chunk_path(cx, cy)
+        if not os.path.exists(path): return None
+        with open(path, 'r') as f: data = json.load(f)
+        return {
+            "cx": cx, "cy": cy,
+            "grid": np.array(data['grid'], dtype=np.uint8),
+            "rooms": data['rooms'],
+            "visited": True,
+        }
+
+    # --- Generation ---
+
+    def _rng(self, *parts):
+        # String seeds hash deterministically across runs and platforms
+        return random.Random(":".join(str(p) for p in (self.seed, *parts)))
+
+    def _gate_offset(self, orientation, bx, by):
+        """Position along a border. 'v' borders sit left of chunk (bx, by), 'h' borders above it."""
+        margin = self.config['edge_margin']
+        return self._rng("gate", orientation, bx, by).randint(margin, self.chunk_size - margin - 1)
+
+    def _gates(self, cx, cy):
+        """Local cells on this chunk's four borders where corridors continue into the neighbours."""
+        last = self.chunk_size - 1
+        return [
+            (0, self._gate_offset('v', cx, cy)),         # West border
+            (last, self._gate_offset('v', cx + 1, cy)),  # East border
+            (self._gate_offset('h', cx, cy), 0),         # North border
+            (self._gate_offset('h', cx, cy + 1), last),  # South border
+        ]
+
+    def _generate_chunk(self, cx, cy):
+        cfg = self.config
+        size = self.chunk_size
+        rng = self._rng("chunk", cx, cy)
+        grid = np.zeros((size, size), dtype=np.uint8)
+
+        # 1. Rooms (local coords), kept off the borders
+        margin, pad = cfg['edge_margin'], cfg['room_padding']
+        local_rooms = []
+        for _ in range(cfg['rooms_per_chunk'] * 20):
+            if len(local_rooms) >= cfg['rooms_per_chunk']: break
+            w = rng.randint(cfg['min_room_size'], cfg['max_room_size'])
+            h = rng.randint(cfg['min_room_size'], cfg['max_room_size'])
+            if size - w - margin <= margin or size - h - margin <= margin: break
+            x = rng.randint(margin, size - w - margin)
+            y = rng.randint(margin, size - h - margin)
+            if any(x < ox + ow + pad and x + w + pad > ox and y < oy + oh + pad and y + h + pad > oy for ox, oy, ow, oh in local_rooms):
+                continue
+            local_rooms.append((x, y, w, h))
+        local_rooms.sort(key=lambda r: (r[1], r[0]))
+        for x, y, w, h in local_rooms: grid[y:y+h, x:x+w] = 1
+
+        # 2. Connect rooms and border gates: MST over Delaunay candidates plus a few loops
+        anchors = [(x + w // 2, y + h // 2) for x, y, w, h in local_rooms] + self._gates(cx, cy)
+        edges = candidate_edges(anchors)
+        parent = list(range(len(anchors)))
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]; i = parent[i]
+            return i
+        connections, extras = [], []
+        for _, a, b in edges:
+            ra, rb = find(a), find(b)
+            if ra != rb: parent[ra] = rb; connections.append((a, b))
+            else: extras.append((a, b))
+        rng.shuffle(extras)
+        connections.extend(extras[:int(len(local_rooms) * cfg['extra_edge_ratio'])])
+
+        rows = grid.tolist()
+        router = CorridorRouter(rows)
+        for a, b in connections:
+            path = router.find_path(anchors[a], anchors[b])
+            if not path: continue
+            for px, py in path:
+                if rows[py][px] == 0: rows[py][px] = 2
+            router.carve(path)
+        grid = np.array(rows, dtype=np.uint8)
+
+        # 3. Rooms in world coords, labelled "chunk_x,chunk_y:n" so labels stay unique and stable
+        ox, oy = cx * size, cy * size
+        rooms = [[ox + x, oy + y, w, h, f"{cx},{cy}:{i+1}"] for i, (x, y, w, h) in enumerate(local_rooms)]
+        return {"cx": cx, "cy": cy, "grid": grid, "rooms": rooms, "visited": False}
@@ -4,7 +4,17 @@ import math
 import heapq
 import json
 import os
+from concurrent.futures import ProcessPoolExecutor
 from codex_engine.config import DATA_DIR
+from codex_engine.utils.pathfinding import CorridorRouter
+
+# Complexes with at least this many levels are laid out in worker processes
+PARALLEL_LEVEL_THRESHOLD = 2
+
+def _generate_level_worker(job):
+    """Process-pool entry point: lays out one level from its own seed, no DB access."""
+    grid, rooms = DungeonGenerator(None)._generate_layout(job['config'], job['seed'])
+    return {"index": job['index'], "grid": grid, "rooms": rooms}
 
 class DungeonGenerator:
     def __init__(self, db_manager):
@@ -47,128 +57,125 @@ class DungeonGenerator:
 
         # PARENT IS THE LOCAL MAP DIRECTLY (No intermediate container)
         levels_parent_id = parent_node['id']
-        
-        previous_level_node_id = levels_parent_id
-        first_level_id = None
-        
-        for level_config in complex_bp['levels']:
-            depth = level_config['depth']
-            def_id = level_config['blueprint_id']
-            
-            level_def = self._load_definition(def_id)
-            if not level_def: continue
-
-            level_name = level_config.get('name_override', f"Level {depth}")
-            
-            new_props = {
-                "world_x": int(marker['world_x']),
-                "world_y": int(marker['world_y']),
-            }
-            # Create Node
-
-            node_id = self.db.create_node(
-                type="dungeon_level",
-                name=level_name,
-                parent_id=marker['id'],
-                properties=new_props
-            )
 
-            '''
-            node_id = self.db.create_node(
-                campaign_id, "dungeon_level", levels_parent_id,
-                int(marker['world_x']), int(marker['world_y']), level_name
-            )
-            ''' 
+        # 1. Resolve level definitions and give each level its own seed
+        base_seed = marker.get('seed', random.randrange(2**31))
+        jobs = []
+        for index, level_config in enumerate(complex_bp['levels']):
+            level_def = self._load_definition(level_config['blueprint_id'])
+            if not level_def: continue
+            jobs.append({
+                "index": index, # Blueprints may list several levels at one depth, so jobs are keyed by position
+                "depth": level_config['depth'],
+                "level_config": level_config,
+                "config": level_def.get('generator_config', {}),
+                "seed": (base_seed + level_config['depth'] * 7919 + index * 104729) % (2**31),
+            })
 
-            if depth == 1: first_level_id = node_id
+        # 2. Layouts are independent, so compute them in parallel
+        layouts = self._generate_layouts(jobs)
 
-            # Generate Geometry
-            gen_config = level_def.get('generator_config', {})
-            grid, rooms = self._generate_layout(gen_config)
-            
-            # --- METADATA & GEOMETRY STORAGE ---
+        # 3. Commit every level and its markers in one transaction
+        previous_level_node_id = levels_parent_id
+        first_level_id = None
 
-                        # Prepare properties
-            new_props = {
-                "render_style": level_config.get('theme_override', 'hand_drawn'),
-                "overview": complex_bp.get('description', 'A dark and dangerous place.'),
-                "source_marker_id": marker['id'], # CRITICAL: Links siblings together
-                "depth": depth,
-                "geometry": {
-                    "grid": grid, 
-                    "width": len(grid[0]), 
-                    "height": len(grid),
-                    "rooms": [list(r) for r in rooms]
-                }
-            }
-            
-            # Create Local Map Node
-            self.db.update_node(
-                node_id, properties=new_props
-            )
+        with self.db.transaction():
+            for job in jobs:
+                depth = job['depth']
+                level_config = job['level_config']
+                grid, rooms = layouts[job['index']]
+                level_name = level_config.get('name_override', f"Level {depth}")
 
-            '''
-            self.db.update_node_data(node_id, 
-                geometry={
-                    "grid": grid, 
-                    "width": len(grid[0]), 
-                    "height": len(grid),
-                    "rooms": [list(r) for r in rooms]
-                },
-                metadata={
+                new_props = {
+                    "world_x": int(marker['world_x']),
+                    "world_y": int(marker['world_y']),
                     "render_style": level_config.get('theme_override', 'hand_drawn'),
                     "overview": complex_bp.get('description', 'A dark and dangerous place.'),
                     "source_marker_id": marker['id'], # CRITICAL: Links siblings together
-                    "depth": depth
-                }
-            )
-            '''
-
-            # --- Markers (Room Numbers and Navigation) ---
-            if rooms:
-                # 1. Room Numbers
-                for i, r in enumerate(rooms):
-                    room_props = {
-                        "world_x": r[0] + 0.5,
-                        "world_y": r[1] + 0.5,
-                        "symbol": "room_number",
-                        "description": "An unexplored chamber."
+                    "depth": depth,
+                    "seed": job['seed'],
+                    "geometry": {
+                        "grid": grid,
+                        "width": len(grid[0]),
+                        "height": len(grid),
+                        "rooms": [list(r) for r in rooms]
                     }
-                    # Room name is the number for display in the tactical view
-                    self.db.create_node(type='poi', name=str(i+1), parent_id=node_id, properties=room_props)
-
-                # 2. Stairs Up (Exit to previous level or Map)
-                up_room = rooms[0]
-                cx, cy = up_room[0] + up_room[2]//2, up_room[1] + up_room[3]//2
-                up_props = {
-                    "world_x": float(cx),
-                    "world_y": float(cy),
-                    "symbol": "stairs_up",
-                    "portal_to": previous_level_node_id,
-                    "description": "Stirs leading up...",
-                }
-                self.db.create_node(type='poi', name="Stairs Up", parent_id=node_id, properties=up_props)
-
-            # 3. Stairs Down (If more levels exist)
-            if depth < len(complex_bp['levels']):
-                down_room = rooms[-1]
-                dx, dy = down_room[0] + down_room[2]//2, down_room[1] + down_room[3]//2
-                down_props = {
-                    "world_x": float(dx),
-                    "world_y": float(dy),
-                    "symbol": "stairs_down",
-                    "description": "Leads deeper...",
                 }
-                self.db.create_node(type='poi', name="Stairs Down", parent_id=node_id, properties=down_props)
 
-            # 4. Link the previous level's "Stairs Down" to this new level
-            if depth > 1:
-                self._link_down_stairs(previous_level_node_id, node_id)
+                node_id = self.db.create_node(
+                    type="dungeon_level",
+                    name=level_name,
+                    parent_id=marker['id'],
+                    properties=new_props
+                )
+
+                if depth == 1: first_level_id = node_id
+
+                # --- Markers (Room Numbers and Navigation) ---
+                if rooms:
+                    # 1. Room Numbers
+                    for i, r in enumerate(rooms):
+                        room_props = {
+                            "world_x": r[0] + 0.5,
+                            "world_y": r[1] + 0.5,
+                            "symbol": "room_number",
+                            "description": "An unexplored chamber."
+                        }
+                        # Room name is the number for display in the tactical view
+                        self.db.create_node(type='poi', name=str(i+1), parent_id=node_id, properties=room_props)
 
-            previous_level_node_id = node_id
+                    # 2. Stairs Up (Exit to previous level or Map)
+                    up_room = rooms[0]
+                    cx, cy = up_room[0] + up_room[2]//2, up_room[1] + up_room[3]//2
+                    up_props = {
+                        "world_x": float(cx),
+                        "world_y": float(cy),
+                        "symbol": "stairs_up",
+                        "portal_to": previous_level_node_id,
+                        "description": "Stirs leading up...",
+                    }
+                    self.db.create_node(type='poi', name="Stairs Up", parent_id=node_id, properties=up_props)
+
+                # 3. Stairs Down (If more levels exist)
+                if depth < len(complex_bp['levels']):
+                    down_room = rooms[-1]
+                    dx, dy = down_room[0] + down_room[2]//2, down_room[1] + down_room[3]//2
+                    down_props = {
+                        "world_x": float(dx),
+                        "world_y": float(dy),
+                        "symbol": "stairs_down",
+                        "description": "Leads deeper...",
+                    }
+                    self.db.create_node(type='poi', name="Stairs Down", parent_id=node_id, properties=down_props)
+
+                # 4. Link the previous level's "Stairs Down" to this new level
+                if depth > 1:
+                    self._link_down_stairs(previous_level_node_id, node_id)
+
+                previous_level_node_id = node_id
 
         return first_level_id
 
+    def _generate_layouts(self, jobs):
+        """Returns {job index: (grid, rooms)}, using a process pool for multi-level complexes."""
+        payload = [{"index": j['index'], "config": j['config'], "seed": j['seed']} for j in jobs]
+        results = None
+
+        if len(payload) >= PARALLEL_LEVEL_THRESHOLD:
+            workers = min(len(payload), os.cpu_count() or 1)
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    results = list(pool.map(_generate_level_worker, payload))
+                print(f"--- Generated {len(results)} levels on {workers} workers ---")
+            except Exception as e:
+                print(f"Worker pool unavailable ({e}). Generating levels in-process.")
+                results = None
+
+        if results is None:
+            results = [_generate_level_worker(job) for job in payload]
+
+        return {r['index']: (r['grid'], r['rooms']) for r in results}
+
     def _link_down_stairs(self, from_node_id, to_node_id):
         potential_markers = self.db.get_children(from_node_id, type_filter='poi')
         for m in potential_markers:
@@ -212,7 +219,8 @@ class DungeonGenerator:
         #self.db.add_marker(nid, 20, 20, "stairs_up", "Exit", "", metadata={"portal_to": parent_node['id']})
         return nid
 
-    def _generate_layout(self, config):
+    def _generate_layout(self, config, seed=None):
+        rng = random.Random(seed)
         width = config.get('width', 60); height = config.get('height', 60)
         min_size = config.get('min_room_size', 6); max_size = config.get('max_room_size', 12)
         room_count = config.get('room_count', 15)
@@ -220,23 +228,32 @@ class DungeonGenerator:
         rooms = []
         for _ in range(100):
             if len(rooms) >= room_count: break
-            w = random.randint(min_size, max_size); h = random.randint(min_size, max_size)
-            x = random.randint(2, width - w - 2); y = random.randint(2, height - h - 2)
+            w = rng.randint(min_size, max_size); h = rng.randint(min_size, max_size)
+            x = rng.randint(2, width - w - 2); y = rng.randint(2, height - h - 2)
             new_rect = pygame.Rect(x, y, w, h)
             if not any(new_rect.colliderect(pygame.Rect(r).inflate(2,2)) for r in rooms):
                 rooms.append([x, y, w, h])
                 for ry in range(y, y+h):
                     for rx in range(x, x+w): grid[ry][rx] = 1
         if len(rooms) > 1:
+            # Rooms are all placed, so one cost grid serves every corridor
+            router = CorridorRouter(grid, room_cost=100, adjacency_penalty=20, turn_penalty=5)
             for i in range(len(rooms)-1):
                 r1 = rooms[i]; r2 = rooms[i+1]
                 c1 = (r1[0] + r1[2]//2, r1[1] + r1[3]//2); c2 = (r2[0] + r2[2]//2, r2[1] + r2[3]//2)
-                self._carve_corridor(grid, c1, c2, width, height)
+                self._carve_corridor(grid, c1, c2, width, height, rng, router)
         return grid, rooms
 
-    def _carve_corridor(self, grid, start, end, max_w, max_h):
+    def _carve_corridor(self, grid, start, end, max_w, max_h, rng=random, router=None):
+        path = router.find_path(start, end) if router else None
+        if path:
+            for x, y in path:
+                if grid[y][x] == 0: grid[y][x] = 2
+            return
+
+        # Fallback: plain L-shaped corridor
         x1, y1 = start; x2, y2 = end
-        if random.random() > 0.5:
+        if rng.random() > 0.5:
             self._line(grid, x1, y1, x2, y1, max_w, max_h); self._line(grid, x2, y1, x2, y2, max_w, max_h)
         else:
             self._line(grid, x1, y1, x1, y2, max_w, max_h); self._line(grid, x1, y2, x2, y2, max_w, max_h)
@@ -68,7 +68,6 @@ class MapViewer:
                 "is_active": True,
                 "zoom": 1.5,
                 "radius": 15,
-                "explored_tiles": {},
                 "facing_degrees": 270,
                 "beam_degrees": 360
             }
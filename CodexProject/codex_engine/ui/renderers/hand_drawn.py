@@ -0,0 +1,76 @@
+import math
+import random
+import pygame
+
+def draw_hand_drawn_line(surface, start_pos, end_pos, color, thickness=1, wobble=2, rng=random):
+    """One-off wobbly line; re-randomised on every call unless a seeded rng is passed."""
+    for points in _stroke_offsets(start_pos, end_pos, thickness, wobble, rng):
+        pygame.draw.aalines(surface, color, False, points)
+
+def _stroke_offsets(start_pos, end_pos, thickness, wobble, rng):
+    distance = math.hypot(end_pos[0] - start_pos[0], end_pos[1] - start_pos[1])
+    if distance == 0: return []
+    segments = max(2, int(distance / 10))
+    angle = math.atan2(end_pos[1] - start_pos[1], end_pos[0] - start_pos[0]) + math.pi / 2
+    points = []
+    for i in range(segments + 1):
+        t = i / segments
+        x = start_pos[0] * (1 - t) + end_pos[0] * t
+        y = start_pos[1] * (1 - t) + end_pos[1] * t
+        if 0 < i < segments:
+            x += rng.uniform(-wobble, wobble) * math.cos(angle)
+            y += rng.uniform(-wobble, wobble) * math.sin(angle)
+        points.append((x, y))
+    return [
+        [(p[0] + rng.uniform(-wobble/2, wobble/2), p[1] + rng.uniform(-wobble/2, wobble/2)) for p in points]
+        for _ in range(thickness)
+    ]
+
+class HandDrawnLines:
+    """
+    Stable, cached hand-drawn strokes.
+
+    Each line is identified by a caller-supplied key that does not change when the
+    view moves (e.g. the wall's grid edge). The wobble for (key, seed) is generated
+    once, stored as pixel offsets from the straight line, and replayed on every
+    redraw, so walls no longer shimmer between renders and repeat draws skip the
+    random number generation entirely. Changing seed gives a differently "inked" map.
+    """
+    def __init__(self, seed=0, wobble=2, max_entries=200000):
+        self.seed = seed
+        self.wobble = wobble
+        self.max_entries = max_entries
+        self._offsets = {} # (key, segments, thickness) -> per-stroke lists of (dx, dy) offsets
+
+    def reset(self, seed):
+        self.seed = seed
+        self._offsets.clear()
+
+    def strokes(self, key, start_pos, end_pos, thickness):
+        """Returns `thickness` point lists for one line, in the pixel space of start_pos/end_pos."""
+        sx, sy = start_pos
+        dx, dy = end_pos[0] - sx, end_pos[1] - sy
+        distance = math.hypot(dx, dy)
+        if distance == 0: return []
+        segments = max(2, int(distance / 10))
+
+        cache_key = (key, segments, thickness)
+        offsets = self._offsets.get(cache_key)
+        if offsets is None:
+            # Generate around the origin, then keep only the deviation from the straight line
+            rng = random.Random(hash((cache_key, self.seed)))
+            raw = _stroke_offsets((0.0, 0.0), (dx, dy), thickness, self.wobble, rng)
+            offsets = [[(px - dx * i / segments, py - dy * i / segments) for i, (px, py) in enumerate(stroke)] for stroke in raw]
+            if len(self._offsets) >= self.max_entries: self._offsets.clear()
+            self._offsets[cache_key] = offsets
+
+        steps = [(sx + dx * i / segments, sy + dy * i / segments) for i in range(segments + 1)]
+        return [[(bx + ox, by + oy) for (bx, by), (ox, oy) in zip(steps, stroke)] for stroke in offsets]
+
+    def draw(self, surface, color, lines, thickness):
+        """Draws an iterable of (key, start_pos, end_pos) lines in one batch."""
+        strokes = self.strokes
+        batch = [points for key, start, end in lines for points in strokes(key, start, end, thickness)]
+        aalines = pygame.draw.aalines
+        for points in batch:
+            aalines(surface, color, False, points)
@@ -172,6 +172,42 @@ class ImageMapStrategy:
                     pygame.draw.circle(screen, pt_color, (sx, sy), 5)
                     pygame.draw.circle(screen, (0,0,0), (sx, sy), 5, 1)
 
+    def render_area(self, area, scale, sea_level_meters=0.0, contour_interval=0):
+        """
+        Shaded relief (no vectors) for the output pixels in area, at scale output pixels per
+        heightmap sample. Every output pixel is bilinearly sampled at its own centre from
+        colours shaded with a border of neighbours, so separately rendered tiles line up
+        exactly. Used by tiled export.
+        """
+        area = pygame.Rect(area)
+        sea_level_norm = (sea_level_meters - self.real_min) / (self.real_max - self.real_min)
+        u = np.clip((np.arange(area.left, area.right) + 0.5) / scale - 0.5, 0, self.width - 1)
+        v = np.clip((np.arange(area.top, area.bottom) + 0.5) / scale - 0.5, 0, self.height - 1)
+
+        # Covered samples plus one neighbour each side for gradients and contour edges
+        x0, x1 = max(0, int(u[0]) - 1), min(self.width, int(u[-1]) + 3)
+        y0, y1 = max(0, int(v[0]) - 1), min(self.height, int(v[-1]) + 3)
+        rgb = self._render_region(self.heightmap[y0:y1, x0:x1], sea_level_norm, contour_interval).astype(np.float32)
+
+        u, v = u - x0, v - y0
+        iu = np.minimum(u.astype(int), rgb.shape[1] - 2) if rgb.shape[1] > 1 else np.zeros(len(u), dtype=int)
+        iv = np.minimum(v.astype(int), rgb.shape[0] - 2) if rgb.shape[0] > 1 else np.zeros(len(v), dtype=int)
+        fu = np.clip(u - iu, 0, 1)[None, :, None]
+        fv = np.clip(v - iv, 0, 1)[:, None, None]
+        iu1 = np.minimum(iu + 1, rgb.shape[1] - 1)
+        iv1 = np.minimum(iv + 1, rgb.shape[0] - 1)
+        top = rgb[iv][:, iu] * (1 - fu) + rgb[iv][:, iu1] * fu
+        bottom = rgb[iv1][:, iu] * (1 - fu) + rgb[iv1][:, iu1] * fu
+        pixels = np.clip(top * (1 - fv) + bottom * fv + 0.5, 0, 255).astype(np.uint8)
+        return pygame.surfarray.make_surface(np.transpose(pixels, (1, 0, 2)))
+
+    def snapshot(self):
+        """Copy for render_area on another thread: later slider or heightmap changes here don't reach it."""
+        copy = object.__new__(ImageMapStrategy)
+        copy.__dict__.update(self.__dict__)
+        copy.heightmap = self.heightmap.copy()
+        return copy
+
     def set_light_direction(self, azimuth, altitude):
         self.light_azimuth = azimuth; self.light_altitude = altitude
     
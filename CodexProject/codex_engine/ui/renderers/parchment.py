@@ -0,0 +1,47 @@
+import numpy as np
+import pygame
+
+PARCHMENT_TILE_SIZE = 512 # Texture repeat in pixels; at a few specks per thousand pixels the seam is invisible
+
+_tiles = {} # (color, density, seed, size) -> Surface
+
+def parchment_pixels(width, height, color, density, seed=0):
+    """
+    Paper texture as a (width, height, 3) uint8 array in surfarray layout: the base
+    colour with a `density` fraction of pixels darkened by 10-20, like ink specks.
+    """
+    rng = np.random.default_rng(seed)
+    specks = rng.random((width, height)) < density
+    shade = rng.integers(10, 21, size=(width, height), dtype=np.int16) * specks
+    pixels = np.asarray(color[:3], dtype=np.int16) - shade[..., None]
+    return np.clip(pixels, 0, 255).astype(np.uint8)
+
+def parchment_tile(color, density, seed=0, size=PARCHMENT_TILE_SIZE):
+    """Cached square texture tile; generated once per (color, density, seed, size)."""
+    key = (tuple(color[:3]), density, seed, size)
+    tile = _tiles.get(key)
+    if tile is None:
+        tile = pygame.Surface((size, size))
+        pygame.surfarray.blit_array(tile, parchment_pixels(size, size, color, density, seed))
+        _tiles[key] = tile
+    return tile
+
+def fill_parchment(surface, color, rect=None, density=0.001, seed=0, origin=(0, 0)):
+    """
+    Covers rect (default: the whole surface) with the cached tile, repeated from origin
+    (the texture's top-left in surface pixels). Any region therefore gets exactly the
+    pixels a full-surface fill would, so map tiles can be repainted independently and
+    a scrolling view can move its origin with the camera.
+    """
+    rect = surface.get_rect() if rect is None else pygame.Rect(rect)
+    tile = parchment_tile(color, density, seed)
+    size = tile.get_width()
+
+    prev_clip = surface.get_clip()
+    surface.set_clip(rect.clip(prev_clip))
+    x0 = origin[0] + (rect.left - origin[0]) // size * size
+    y0 = origin[1] + (rect.top - origin[1]) // size * size
+    for y in range(y0, rect.bottom, size):
+        for x in range(x0, rect.right, size):
+            surface.blit(tile, (x, y))
+    surface.set_clip(prev_clip)
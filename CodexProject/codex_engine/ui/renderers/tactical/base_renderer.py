@@ -1,10 +1,11 @@
 import pygame
-import random
+from codex_engine.ui.renderers.parchment import fill_parchment
 
 # Common aesthetic constants
 COLOR_PARCHMENT = (245, 235, 215)
 COLOR_INK = (40, 30, 20)
 COLOR_GRID = (220, 210, 190)
+PARCHMENT_NOISE_DENSITY = 0.001 # Fraction of background pixels darkened as paper texture
 
 class BaseTacticalRenderer:
     def __init__(self, node_data, cell_size):
@@ -23,14 +24,13 @@ class BaseTacticalRenderer:
         
         # 1. Common Setup (Parchment background)
         surface = pygame.Surface((map_w, map_h))
-        surface.fill(COLOR_PARCHMENT)
-
-        # 2. Add texture noise
-        for _ in range(int(map_w * map_h * 0.001)): 
-            x, y = random.randint(0, map_w-1), random.randint(0, map_h-1)
-            c = random.randint(10, 20)
-            base = surface.get_at((x,y))
-            new_color = (max(0, base[0]-c), max(0, base[1]-c), max(0, base[2]-c))
-            surface.set_at((x, y), new_color)
-        
+        self._paint_background(surface, surface.get_rect())
         return surface
+
+    def _paint_background(self, surface, rect, origin=(0, 0)):
+        """
+        Textured parchment for the map pixels in rect, drawn at rect - origin on surface.
+        The texture is anchored at the map origin, so tiles repaint identically.
+        """
+        ox, oy = origin
+        fill_parchment(surface, COLOR_PARCHMENT, rect.move(-ox, -oy), density=PARCHMENT_NOISE_DENSITY, origin=(-ox, -oy))
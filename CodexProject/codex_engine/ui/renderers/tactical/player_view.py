@@ -0,0 +1,200 @@
+import math
+from collections import OrderedDict
+import numpy as np
+import pygame
+from .tactical_renderer import TacticalRenderer
+from codex_engine.utils.visibility import compute_fov, visibility_mask_surface, cell_mask_surface, blit_cells, screen_window, crop_window, encode_explored, decode_explored
+from codex_engine.utils.lighting import LightingEngine, light_tint_cells
+
+SCALED_MAP_CACHE_SIZE = 3 # Zoom levels kept pre-scaled (e.g. editor zoom + player view zoom)
+SCALED_MAP_CACHE_MAX_PIXELS = 4096 * 4096 # Larger scaled maps are drawn via the viewport-clipped path
+FOG_REMEMBERED_ALPHA = 170 # Darkness left over explored cells that are not currently lit (255 = unexplored)
+PLAYER_VIEW_SIZE = (1920, 1080) # Reference frame: a view marker's zoom frames this many pixels
+PLAYER_VIEW_CELL_SIZE = 32 # Level render resolution (pixels per cell), as in the GM editor
+
+# --- Static map drawing ---
+
+def draw_scaled_map(screen, static_map, cache, cell_size, cam_x, cam_y, zoom, screen_w, screen_h):
+    """
+    Blits the pre-rendered level centred on (cam_x, cam_y) at zoom. Whole-map scales are
+    kept in cache (an OrderedDict, zoom -> Surface, LRU); maps too large to cache are
+    scaled only where they land on screen.
+    """
+    zoom = round(zoom, 3) # Quantised so repeated frames at one zoom share a cache entry (<1px drift on screen)
+    center_x, center_y = screen_w // 2, screen_h // 2
+    map_w, map_h = static_map.get_size()
+    scaled_w, scaled_h = int(map_w * zoom), int(map_h * zoom)
+    draw_x = center_x - (cam_x * cell_size * zoom)
+    draw_y = center_y - (cam_y * cell_size * zoom)
+    if scaled_w <= 0 or scaled_h <= 0: return
+
+    if scaled_w * scaled_h <= SCALED_MAP_CACHE_MAX_PIXELS:
+        screen.blit(_scaled_map(static_map, cache, zoom, (scaled_w, scaled_h)), (draw_x, draw_y))
+        return
+
+    # Too large to cache: scale only the part of the map that lands on screen
+    src_x0, src_y0 = max(0, int(-draw_x / zoom)), max(0, int(-draw_y / zoom))
+    src_x1 = min(map_w, int(math.ceil((screen_w - draw_x) / zoom)) + 1)
+    src_y1 = min(map_h, int(math.ceil((screen_h - draw_y) / zoom)) + 1)
+    if src_x1 <= src_x0 or src_y1 <= src_y0: return
+
+    dest_x0, dest_y0 = round(draw_x + src_x0 * zoom), round(draw_y + src_y0 * zoom)
+    dest_x1, dest_y1 = round(draw_x + src_x1 * zoom), round(draw_y + src_y1 * zoom)
+    if dest_x1 <= dest_x0 or dest_y1 <= dest_y0: return
+    visible_part = static_map.subsurface((src_x0, src_y0, src_x1 - src_x0, src_y1 - src_y0))
+    screen.blit(pygame.transform.scale(visible_part, (dest_x1 - dest_x0, dest_y1 - dest_y0)), (dest_x0, dest_y0))
+
+def _scaled_map(static_map, cache, zoom, size):
+    scaled = cache.get(zoom)
+    if scaled is not None:
+        cache.move_to_end(zoom)
+        return scaled
+    scaled = pygame.transform.scale(static_map, size)
+    cache[zoom] = scaled
+    while len(cache) > SCALED_MAP_CACHE_SIZE:
+        cache.popitem(last=False)
+    return scaled
+
+# --- Player view ---
+
+def active_view(markers):
+    """Camera of the active view marker as a plain dict, or None if no view is active."""
+    marker = next((m for m in markers if m.get('properties', {}).get('is_view_marker') and m['properties'].get('is_active')), None)
+    if not marker: return None
+    p = marker['properties']
+    return {
+        "x": p.get('world_x', 0), "y": p.get('world_y', 0),
+        "radius": p.get('radius', 15), "zoom": p.get('zoom', 1.5),
+        "facing": p.get('facing_degrees', 0), "beam": p.get('beam_degrees', 360),
+    }
+
+def active_lights(markers):
+    """Switched-on light sources as (id, (x, y), radius, color) tuples for LightingEngine.composite()."""
+    return [
+        (m['id'], (lp['world_x'], lp['world_y']), lp.get('radius', 15), tuple(lp.get('color', [255, 200, 100])))
+        for m in markers
+        for lp in [m.get('properties', {})]
+        if lp.get('marker_type') == 'light_source' and lp.get('active', True)
+    ]
+
+def radial_gradient(radius):
+    r_val = max(1, int(radius))
+    surf = pygame.Surface((r_val * 2, r_val * 2), pygame.SRCALPHA)
+    steps = 50
+    for i in range(steps):
+        t = i / float(steps - 1)
+        current_r = int(r_val * (1 - t))
+        alpha = int(255 * (t**2))
+        if current_r > 0:
+            pygame.draw.circle(surf, (255, 255, 255, alpha), (r_val, r_val), current_r)
+    return surf
+
+def render_player_view(surface, draw_map, lighting, explored, lights, view, cell_size):
+    """
+    Draws what the party sees into surface: the map centred on the view, the view's
+    field of vision, light sources the party can see, and remembered (explored) cells
+    dimmed. draw_map(surface, cam_x, cam_y, zoom, w, h) paints the level; explored is
+    grown in place. Returns surface.
+    """
+    w, h = surface.get_size()
+    mx, my = view['x'], view['y']
+    radius, facing, beam = view['radius'], view['facing'], view['beam']
+    # The view's zoom frames PLAYER_VIEW_SIZE; larger or smaller screens scale with it
+    zoom = view['zoom'] * min(w / PLAYER_VIEW_SIZE[0], h / PLAYER_VIEW_SIZE[1])
+    center_x, center_y = w // 2, h // 2
+
+    draw_map(surface, mx, my, zoom, w, h)
+
+    sc = cell_size * zoom
+    px_radius = radius * sc
+
+    light_gradient = radial_gradient(px_radius)
+
+    opaque = lighting.opaque
+    visible, offset = compute_fov(opaque, (mx, my), radius, facing, beam)
+    light_shape = visibility_mask_surface(visible, offset, (mx, my), sc, (w, h))
+
+    # Remember what the party has seen (only the FOV window is touched)
+    vh, vw = visible.shape
+    explored[offset[1]:offset[1] + vh, offset[0]:offset[0] + vw] |= visible
+
+    grad_rect = light_gradient.get_rect(center=(center_x, center_y))
+    light_shape.blit(light_gradient, grad_rect, special_flags=pygame.BLEND_RGBA_MULT)
+
+    # Light sources: cached per light, added together, and only seen where the party has line of sight
+    window = screen_window(explored.shape, (mx, my), sc, (w, h))
+    x0, y0, x1, y1 = window
+    intensity, rgb = lighting.composite(lights, window)
+    if lights:
+        sight, sight_offset = compute_fov(opaque, (mx, my), math.hypot(w, h) / 2 / sc, facing, beam)
+        intensity *= crop_window(sight, sight_offset, window)
+        explored[y0:y1, x0:x1] |= (intensity > 0.01)
+        blit_cells(surface, light_tint_cells(intensity, rgb), (x0, y0), (mx, my), sc, pygame.BLEND_RGB_MULT)
+
+    darkness = pygame.Surface((w, h), pygame.SRCALPHA)
+    darkness.fill((0, 0, 0, 255))
+
+    # Per-cell light in one pass: dimmed "remembered" layer for explored cells plus the light sources
+    cell_light = np.minimum(explored[y0:y1, x0:x1] * (255 - FOG_REMEMBERED_ALPHA) + np.minimum(intensity, 1.0) * 255, 255)
+    blit_cells(darkness, cell_mask_surface(cell_light, alpha=1), (x0, y0), (mx, my), sc, pygame.BLEND_RGBA_SUB)
+
+    darkness.blit(light_shape, (0, 0), special_flags=pygame.BLEND_RGBA_SUB)
+
+    surface.blit(darkness, (0, 0))
+    return surface
+
+class PlayerScene:
+    """
+    Player-process copy of one tactical level, for rendering the player view from scene
+    state instead of receiving pixels. The GM side sends the live level (unsaved edits
+    included) once; after that only small deltas arrive (see
+    TacticalController.player_scene_state): the view, the active lights and newly edited cells.
+    """
+    def __init__(self, node, cell_size=PLAYER_VIEW_CELL_SIZE):
+        self.node = node
+        geo = self.node['properties']['geometry']
+        self.grid_data = geo.get('grid', [[]])
+        self.cell_size = cell_size
+        self.lighting = LightingEngine(self.grid_data)
+        self.explored = decode_explored(geo.get('explored'), len(self.grid_data[0]) if self.grid_data else 0, len(self.grid_data))
+        self.renderer = TacticalRenderer(self.node, cell_size, self.node['properties'].get('render_style', 'hand_drawn'))
+        self.static_map = self.renderer.render()
+        self.scaled_cache = OrderedDict()
+        self.view = None
+        self.lights = []
+        self.explored_reported = int(self.explored.sum())
+
+    def apply(self, delta):
+        """Applies a scene delta; edited cells re-render just their map tiles."""
+        if 'view' in delta:
+            view = delta['view']
+            # A view that stays active only sends the fields that moved
+            if view and self.view: self.view.update(view)
+            else: self.view = dict(view) if view else None
+        if 'lights' in delta: self.lights = delta['lights']
+        edited = []
+        for (x, y), value in delta.get('cells', {}).items():
+            if self.grid_data[y][x] == value: continue
+            self.grid_data[y][x] = value
+            self.lighting.update_cell(x, y, value)
+            self.renderer.mark_cell_dirty(x, y)
+            edited.append((x, y))
+        if edited:
+            self.renderer.update()
+            self.scaled_cache.clear()
+
+    def draw_map(self, screen, cam_x, cam_y, zoom, screen_w, screen_h):
+        draw_scaled_map(screen, self.static_map, self.scaled_cache, self.cell_size, cam_x, cam_y, zoom, screen_w, screen_h)
+
+    def render(self, surface):
+        """Draws the current view into surface at its own resolution; returns None if no view is active."""
+        if not self.view: return None
+        surface.fill((0, 0, 0))
+        return render_player_view(surface, self.draw_map, self.lighting, self.explored, self.lights, self.view, self.cell_size)
+
+    def take_explored(self):
+        """Encoded fog-of-war map if rendering revealed new cells since the last call, else None."""
+        count = int(self.explored.sum())
+        if count == self.explored_reported: return None
+        self.explored_reported = count
+        return encode_explored(self.explored)
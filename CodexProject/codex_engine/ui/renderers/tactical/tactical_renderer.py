@@ -1,101 +1,177 @@
 import pygame
 import math
-import random
 from .base_renderer import BaseTacticalRenderer, COLOR_INK, COLOR_GRID, COLOR_PARCHMENT
+import numpy as np
+from ..hand_drawn import HandDrawnLines, draw_hand_drawn_line
+from codex_engine.utils.wall_edges import extract_walls
 
 # --- CONSTANTS ---
 LINE_THICKNESS = 3
 HATCH_SPACING = 12
-
-def draw_hand_drawn_line(surface, start_pos, end_pos, color, thickness=1, wobble=2):
-    distance = math.hypot(end_pos[0] - start_pos[0], end_pos[1] - start_pos[1])
-    if distance == 0: return
-    segments = max(2, int(distance / 10))
-    points = []
-    for i in range(segments + 1):
-        t = i / segments
-        x = start_pos[0] * (1 - t) + end_pos[0] * t
-        y = start_pos[1] * (1 - t) + end_pos[1] * t
-        if 0 < i < segments:
-            angle = math.atan2(end_pos[1] - start_pos[1], end_pos[0] - start_pos[0]) + math.pi / 2
-            x += random.uniform(-wobble, wobble) * math.cos(angle)
-            y += random.uniform(-wobble, wobble) * math.sin(angle)
-        points.append((x, y))
-    for _ in range(thickness):
-        stroke_points = [(p[0] + random.uniform(-wobble/2, wobble/2), p[1] + random.uniform(-wobble/2, wobble/2)) for p in points]
-        pygame.draw.aalines(surface, color, False, stroke_points)
+TILE_CELLS = 16    # Tile edge in cells; edits re-render only the tiles they touch
+STROKE_MARGIN = 6  # Max pixels a wobbly stroke strays from its cell edge
 
 def draw_straight_line(surface, start_pos, end_pos, color, thickness=1):
     pygame.draw.line(surface, color, start_pos, end_pos, thickness)
 
 class TacticalRenderer(BaseTacticalRenderer):
+    """
+    Renders the level into one surface, TILE_CELLS x TILE_CELLS cells at a time.
+    Every tile is drawn only from deterministic inputs (seeded noise, cached wobble),
+    so after a grid edit mark_cell_dirty() + update() redraw just the 1-4 tiles
+    around the cell and the result matches a full render.
+    """
     def __init__(self, node_data, cell_size, style='hand_drawn'):
         super().__init__(node_data, cell_size)
         self.style = style
         self.rooms = [pygame.Rect(r) for r in self.geometry.get('rooms', [])]
         self.footprints = self.geometry.get('footprints', [])
+        self.surface = None
+        self.dirty_tiles = set()
+        self.strokes = HandDrawnLines(seed=node_data.get('id') or 0) # Wobble per wall edge, stable across re-renders
+        self.walls = []                       # Merged wall segments in cell-corner coords (x0, y0, x1, y1)
+        self._wall_array = np.zeros((0, 4), dtype=np.int64)
+        self._walls_stale = True
 
     def render(self):
-        # 1. Base Surface (Parchment)
-        surface = super().render()
+        """Full render of every tile; returns the level surface."""
+        sc = self.cell_size
+        self.surface = pygame.Surface((self.width * sc, self.height * sc))
+        self._refresh_walls()
+        tile_px = TILE_CELLS * sc
+        for ty in range(-(-self.surface.get_height() // tile_px)):
+            for tx in range(-(-self.surface.get_width() // tile_px)):
+                self._render_tile(tx, ty)
+        self.dirty_tiles.clear()
+        return self.surface
+
+    def mark_cell_dirty(self, x, y):
+        """Flags every tile that the walls around cell (x, y) can reach."""
+        sc = self.cell_size
+        self._mark_area(pygame.Rect(x * sc, y * sc, sc, sc))
+        self._walls_stale = True
+
+    def _mark_area(self, area):
+        tile_px = TILE_CELLS * self.cell_size
+        area = area.inflate(STROKE_MARGIN * 2, STROKE_MARGIN * 2)
+        for ty in range(max(0, area.top // tile_px), (area.bottom - 1) // tile_px + 1):
+            for tx in range(max(0, area.left // tile_px), (area.right - 1) // tile_px + 1):
+                self.dirty_tiles.add((tx, ty))
+
+    def _refresh_walls(self):
+        """Re-extracts merged walls; any segment that appeared or vanished dirties every tile it crosses."""
+        walls = extract_walls(self.grid_data, max_run=TILE_CELLS)
+        if self.surface is not None:
+            sc = self.cell_size
+            for x0, y0, x1, y1 in set(walls).symmetric_difference(self.walls):
+                self._mark_area(pygame.Rect(x0 * sc, y0 * sc, (x1 - x0) * sc + 1, (y1 - y0) * sc + 1))
+        self.walls = walls
+        self._wall_array = np.array(walls, dtype=np.int64).reshape(-1, 4)
+        self._walls_stale = False
+
+    def update(self):
+        """Re-renders only the dirty tiles in place; returns the pixel rects that changed."""
+        if self.surface is None:
+            self.render()
+            return [self.surface.get_rect()]
+        if self._walls_stale: self._refresh_walls()
+        rects = [rect for rect in (self._render_tile(tx, ty) for tx, ty in sorted(self.dirty_tiles)) if rect]
+        self.dirty_tiles.clear()
+        return rects
+
+    def render_area(self, area):
+        """
+        Renders the map pixels in area (a Rect at this renderer's cell_size) to a new
+        surface of area's size, without a full-level surface. Used by tiled export.
+        The area is drawn with a one-cell bleed that is cropped off, so strokes are never
+        clipped at the area's edge and adjacent areas join without seams.
+        """
+        if self._walls_stale: self._refresh_walls()
+        area = pygame.Rect(area)
+        bleed = max(self.cell_size, STROKE_MARGIN)
+        padded = area.inflate(bleed * 2, bleed * 2)
+        canvas = pygame.Surface(padded.size)
+        self._draw_area(canvas, padded, padded.topleft)
+        surface = pygame.Surface(area.size)
+        surface.blit(canvas, (0, 0), pygame.Rect(bleed, bleed, area.width, area.height))
+        return surface
+
+    def _render_tile(self, tx, ty):
+        surface = self.surface
+        tile_px = TILE_CELLS * self.cell_size
+        tile_rect = pygame.Rect(tx * tile_px, ty * tile_px, tile_px, tile_px).clip(surface.get_rect())
+        if tile_rect.width <= 0 or tile_rect.height <= 0: return None
+        surface.set_clip(tile_rect)
+        self._draw_area(surface, tile_rect)
+        surface.set_clip(None)
+        return tile_rect
+
+    def _draw_area(self, surface, tile_rect, origin=(0, 0)):
+        """Draws the map pixels in tile_rect onto surface, shifted by -origin."""
         sc = self.cell_size
+        ox, oy = origin
+
+        # 1. Base (Parchment)
+        self._paint_background(surface, tile_rect, origin)
         
         # 2. Config based on Style
         is_blueprint = (self.style == 'blueprint')
         line_color = (0, 0, 255) if is_blueprint else COLOR_INK
-        draw_line_func = draw_straight_line if is_blueprint else draw_hand_drawn_line
+
+        def draw_lines(lines, thickness):
+            if ox or oy: lines = [(key, (sx - ox, sy - oy), (ex - ox, ey - oy)) for key, (sx, sy), (ex, ey) in lines]
+            if is_blueprint:
+                for _, start, end in lines: draw_straight_line(surface, start, end, line_color, thickness)
+            else:
+                self.strokes.draw(surface, line_color, lines, thickness)
+
+        # Cells whose lines can reach this tile
+        cx0, cy0 = max(0, tile_rect.left // sc - 1), max(0, tile_rect.top // sc - 1)
+        cx1, cy1 = min(self.width, tile_rect.right // sc + 2), min(self.height, tile_rect.bottom // sc + 2)
         
         # 3. Draw Grid Lines
         grid_color = COLOR_GRID if not is_blueprint else (200, 200, 255)
-        for y in range(self.height):
-             draw_straight_line(surface, (0, y * sc), (self.width * sc, y * sc), grid_color, 1)
-        for x in range(self.width):
-             draw_straight_line(surface, (x * sc, 0), (x * sc, self.height * sc), grid_color, 1)
+        for y in range(cy0, cy1):
+             draw_straight_line(surface, (tile_rect.left - ox, y * sc - oy), (tile_rect.right - ox, y * sc - oy), grid_color, 1)
+        for x in range(cx0, cx1):
+             draw_straight_line(surface, (x * sc - ox, tile_rect.top - oy), (x * sc - ox, tile_rect.bottom - oy), grid_color, 1)
 
         # 4. Draw Geometry: GRIDS (Dungeons)
-        # We only draw walls if the grid has data
-        for y in range(self.height):
-            for x in range(self.width):
-                if self.grid_data[y][x] != 0:
-                    sx, sy = x * sc, y * sc
-                    # Draw walls based on neighbors
-                    if y == 0 or self.grid_data[y-1][x] == 0: 
-                        draw_line_func(surface, (sx, sy), (sx+sc, sy), line_color, LINE_THICKNESS)
-                    if y == self.height-1 or self.grid_data[y+1][x] == 0: 
-                        draw_line_func(surface, (sx, sy+sc), (sx+sc, sy+sc), line_color, LINE_THICKNESS)
-                    if x == 0 or self.grid_data[y][x-1] == 0: 
-                        draw_line_func(surface, (sx, sy), (sx, sy+sc), line_color, LINE_THICKNESS)
-                    if x == self.width-1 or self.grid_data[y][x+1] == 0: 
-                        draw_line_func(surface, (sx+sc, sy), (sx+sc, sy+sc), line_color, LINE_THICKNESS)
+        # Merged wall segments that reach this tile; each is keyed by its grid edge
+        wa = self._wall_array * sc
+        reach = tile_rect.inflate(STROKE_MARGIN * 2, STROKE_MARGIN * 2)
+        near = (wa[:, 0] <= reach.right) & (wa[:, 2] >= reach.left) & (wa[:, 1] <= reach.bottom) & (wa[:, 3] >= reach.top)
+        walls = [(self.walls[i], (int(wa[i, 0]), int(wa[i, 1])), (int(wa[i, 2]), int(wa[i, 3]))) for i in np.flatnonzero(near)]
+        draw_lines(walls, LINE_THICKNESS)
 
         # 5. Draw Geometry: FOOTPRINTS (Buildings)
+        outlines = []
         for fp in self.footprints:
             fx = fp['x'] * sc
             fy = fp['y'] * sc
             fw = fp['w'] * sc
             fh = fp['h'] * sc
+            if not pygame.Rect(fx, fy, fw, fh).inflate(STROKE_MARGIN * 2, STROKE_MARGIN * 2).colliderect(tile_rect): continue
             
             # Draw Outline
             if is_blueprint:
-                pygame.draw.rect(surface, (0, 0, 255), (fx, fy, fw, fh), 4)
+                pygame.draw.rect(surface, (0, 0, 255), (fx - ox, fy - oy, fw, fh), 4)
             else:
                 # Hand-drawn box
                 tl, tr = (fx, fy), (fx+fw, fy)
                 bl, br = (fx, fy+fh), (fx+fw, fy+fh)
-                draw_line_func(surface, tl, tr, line_color, 4)
-                draw_line_func(surface, tr, br, line_color, 4)
-                draw_line_func(surface, br, bl, line_color, 4)
-                draw_line_func(surface, bl, tl, line_color, 4)
+                outlines.extend(((start, end), start, end) for start, end in ((tl, tr), (tr, br), (br, bl), (bl, tl)))
+        if outlines: draw_lines(outlines, 4)
 
         # 6. Hatching (Optional: Only for hand-drawn dungeons)
         if not is_blueprint and self.rooms:
              for r in self.rooms:
                 screen_rect = pygame.Rect(r.x * sc, r.y * sc, r.width * sc, r.height * sc)
+                if not screen_rect.colliderect(tile_rect): continue
                 for i in range(screen_rect.left - screen_rect.height, screen_rect.right, HATCH_SPACING):
                     start_pos = (i, screen_rect.top)
                     end_pos = (i + screen_rect.height, screen_rect.bottom)
                     clipped = screen_rect.clipline(start_pos, end_pos)
                     if clipped:
-                        pygame.draw.aaline(surface, (225, 215, 195), clipped[0], clipped[1])
-
-        return surface
+                        (x0, y0), (x1, y1) = clipped
+                        pygame.draw.aaline(surface, (225, 215, 195), (x0 - ox, y0 - oy), (x1 - ox, y1 - oy))
@@ -0,0 +1,141 @@
+"""
+JSON encoding for node properties and API responses.
+
+Uses orjson or msgspec when installed and falls back to the stdlib json module.
+Set CODEX_JSON=orjson|msgspec|json to force one backend. Output is equivalent
+whichever backend is used: compact separators, UTF-8, and dict keys that are not
+strings are written as strings. Values a fast backend rejects (integers too large
+for 64 bits, NaN in older saves) go through the stdlib, so nothing that used to
+load or save starts failing; the fast backends write NaN/Infinity as null.
+
+    python -m codex_engine.utils.json_codec [path/to/codex.db]
+benchmarks every available backend on the DB's dungeon levels.
+"""
+import json
+import os
+import sys
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+def _available():
+    names = [name for name, module in (("orjson", orjson), ("msgspec", msgspec)) if module]
+    return names + ["json"]
+
+def _choose():
+    forced = os.environ.get("CODEX_JSON")
+    if forced in _available(): return forced
+    return _available()[0]
+
+# --- Backends: each is (dumps_bytes(obj, pretty), loads(str|bytes)) ---
+
+def _json_dumps(obj, pretty=False):
+    if pretty: return json.dumps(obj, indent=2, ensure_ascii=False).encode()
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode()
+
+def _orjson_dumps(obj, pretty=False):
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | (orjson.OPT_INDENT_2 if pretty else 0)
+    try:
+        return orjson.dumps(obj, option=option)
+    except TypeError:
+        return _json_dumps(obj, pretty)
+
+def _orjson_loads(data):
+    try:
+        return orjson.loads(data)
+    except ValueError:
+        return json.loads(data) # NaN/Infinity written by older stdlib saves
+
+if msgspec:
+    _msgspec_encoder = msgspec.json.Encoder()
+    _msgspec_decoder = msgspec.json.Decoder()
+
+def _msgspec_dumps(obj, pretty=False):
+    try:
+        data = _msgspec_encoder.encode(obj)
+    except (TypeError, OverflowError, msgspec.EncodeError):
+        return _json_dumps(obj, pretty)
+    return msgspec.json.format(data, indent=2) if pretty else data
+
+def _msgspec_loads(data):
+    try:
+        return _msgspec_decoder.decode(data)
+    except msgspec.DecodeError:
+        return json.loads(data)
+
+_BACKENDS = {
+    "orjson": (_orjson_dumps, _orjson_loads),
+    "msgspec": (_msgspec_dumps, _msgspec_loads),
+    "json": (_json_dumps, json.loads),
+}
+
+BACKEND = _choose()
+_dumps_bytes, _loads = _BACKENDS[BACKEND]
+
+def dumps_bytes(obj, pretty=False) -> bytes:
+    """UTF-8 JSON bytes, e.g. for an HTTP response body. pretty indents by 2 spaces."""
+    return _dumps_bytes(obj, pretty)
+
+def dumps(obj, pretty=False) -> str:
+    """JSON text, e.g. for a SQLite TEXT column."""
+    return _dumps_bytes(obj, pretty).decode()
+
+def loads(data):
+    """Parses JSON from str or bytes."""
+    return _loads(data)
+
+def dumps_members(obj: dict):
+    """
+    dumps() of a dict plus {key: [start, end]}: where each value's JSON sits in the text,
+    so single values can later be sliced out (or skipped) without parsing the rest.
+    """
+    parts, spans, pos = [], {}, 1
+    for k, v in obj.items():
+        key, value = dumps(str(k)), dumps(v)
+        start = pos + len(key) + 1
+        spans[str(k)] = [start, start + len(value)]
+        parts.append(key + ":" + value)
+        pos = start + len(value) + 1
+    return "{" + ",".join(parts) + "}", spans
+
+# --- Benchmark ---
+
+def benchmark(db_path, node_type="dungeon_level", repeat=20):
+    """Times decode/encode of every node of node_type's stored properties with each available backend."""
+    import sqlite3
+    conn = sqlite3.connect(db_path)
+    texts = [row[0] for row in conn.execute("SELECT properties FROM registry WHERE type = ?", (node_type,))]
+    conn.close()
+    if not texts:
+        print(f"No {node_type} nodes in {db_path}")
+        return
+    total_kb = sum(len(t) for t in texts) / 1024
+    print(f"{len(texts)} {node_type} nodes, {total_kb:.0f} KB of properties, best of {repeat} runs")
+
+    results = {}
+    for name in _available():
+        dumps_b, loads_ = _BACKENDS[name]
+        decode = min(_timed(lambda: [loads_(t) for t in texts]) for _ in range(repeat))
+        objs = [loads_(t) for t in texts]
+        encode = min(_timed(lambda: [dumps_b(o).decode() for o in objs]) for _ in range(repeat))
+        results[name] = (decode, encode)
+        print(f"  {name:8s} decode {decode * 1000:8.2f} ms   encode {encode * 1000:8.2f} ms")
+    base_decode, base_encode = results["json"]
+    for name, (decode, encode) in results.items():
+        if name != "json": print(f"  {name} vs json: decode x{base_decode / decode:.1f}, encode x{base_encode / encode:.1f}")
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+if __name__ == "__main__":
+    benchmark(sys.argv[1] if len(sys.argv) > 1 else os.path.join("data", "codex.db"))
@@ -0,0 +1,86 @@
+import numpy as np
+import pygame
+from codex_engine.utils.visibility import compute_fov
+
+TRANSPARENT_CELLS = (1, 2) # Floor and corridor; every other grid value (void, closed doors) blocks light
+
+def opacity_grid(grid):
+    return ~np.isin(np.asarray(grid), TRANSPARENT_CELLS)
+
+def radial_falloff(shape, offset, origin, radius):
+    """(1 - d/r)^2 brightness per cell centre, matching the party view's radial gradient."""
+    h, w = shape
+    dx = np.arange(offset[0], offset[0] + w) + 0.5 - origin[0]
+    dy = np.arange(offset[1], offset[1] + h)[:, None] + 0.5 - origin[1]
+    t = np.clip(1.0 - np.sqrt(dx * dx + dy * dy) / max(radius, 1e-6), 0.0, 1.0)
+    return (t * t).astype(np.float32)
+
+class LightingEngine:
+    """
+    Owns a level's opacity grid and caches one light window (FOV x falloff) per light source.
+    A light is only recomputed when it moves, changes radius, or a cell inside its
+    radius changes opacity (door toggled, tile painted); composite() then just adds
+    the cached windows together, so dozens of static torches cost a few array adds.
+    """
+    def __init__(self, grid):
+        self.opaque = opacity_grid(grid)
+        self._lights = {} # light id -> (origin, radius, intensity window, (x0, y0))
+
+    def update_cell(self, x, y, value):
+        """Call after editing grid[y][x]; drops cached lights that can see the cell."""
+        opaque = value not in TRANSPARENT_CELLS
+        if self.opaque[y, x] == opaque: return
+        self.opaque[y, x] = opaque
+        for light_id, (_, _, intensity, (x0, y0)) in list(self._lights.items()):
+            h, w = intensity.shape
+            if x0 <= x < x0 + w and y0 <= y < y0 + h:
+                del self._lights[light_id]
+
+    def light_window(self, light_id, origin, radius):
+        entry = self._lights.get(light_id)
+        if entry and entry[0] == origin and entry[1] == radius:
+            return entry[2], entry[3]
+        visible, offset = compute_fov(self.opaque, origin, radius)
+        intensity = radial_falloff(visible.shape, offset, origin, radius) * visible
+        self._lights[light_id] = (origin, radius, intensity, offset)
+        return intensity, offset
+
+    def composite(self, lights, window):
+        """
+        Adds every light's window into the grid rectangle window = (x0, y0, x1, y1).
+        lights is an iterable of (id, origin, radius, color). Returns (intensity, rgb):
+        summed brightness (unclipped) and brightness-weighted colour sums, as float32 arrays.
+        """
+        x0, y0, x1, y1 = window
+        intensity = np.zeros((y1 - y0, x1 - x0), dtype=np.float32)
+        rgb = np.zeros((y1 - y0, x1 - x0, 3), dtype=np.float32)
+
+        live = set()
+        for light_id, origin, radius, color in lights:
+            live.add(light_id)
+            light, (lx, ly) = self.light_window(light_id, origin, radius)
+            h, w = light.shape
+            # Overlap of the light window with the requested window
+            ox0, oy0 = max(x0, lx), max(y0, ly)
+            ox1, oy1 = min(x1, lx + w), min(y1, ly + h)
+            if ox0 >= ox1 or oy0 >= oy1: continue
+            part = light[oy0 - ly:oy1 - ly, ox0 - lx:ox1 - lx]
+            intensity[oy0 - y0:oy1 - y0, ox0 - x0:ox1 - x0] += part
+            rgb[oy0 - y0:oy1 - y0, ox0 - x0:ox1 - x0] += part[..., None] * np.asarray(color[:3], dtype=np.float32)
+
+        # Forget lights that were deleted or switched off
+        for light_id in set(self._lights) - live: del self._lights[light_id]
+        return intensity, rgb
+
+def light_tint_cells(intensity, rgb):
+    """
+    One pixel per cell, for BLEND_RGB_MULT: white where unlit, shifting towards
+    each cell's average light colour as its brightness approaches 1.
+    """
+    lit = np.minimum(intensity, 1.0)[..., None]
+    colour = rgb / np.maximum(intensity, 1e-6)[..., None]
+    tint = 255.0 - (255.0 - colour) * lit
+
+    cells = pygame.Surface((intensity.shape[1], intensity.shape[0]))
+    pygame.surfarray.blit_array(cells, np.clip(tint, 0, 255).astype(np.uint8).transpose(1, 0, 2))
+    return cells
@@ -0,0 +1,216 @@
+import heapq
+import numpy as np
+from scipy import ndimage
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+# Movement order matches the original corridor routers: up, down, left, right
+DIRECTIONS = ((0, -1), (0, 1), (-1, 0), (1, 0))
+NO_DIRECTION = len(DIRECTIONS) # Direction slot used by the start cell (no turn penalty yet)
+STATES_PER_CELL = len(DIRECTIONS) + 1
+
+def build_cost_grid(grid, room_cost=100, adjacency_penalty=20, room_value=1):
+    """
+    Precomputes the cost of stepping INTO each cell as a float array:
+    1 for open rock, +room_cost for room floor, +adjacency_penalty for any
+    cell that touches a room orthogonally (keeps corridors off room walls).
+    """
+    g = np.asarray(grid)
+    rooms = (g == room_value)
+
+    cost = np.ones(g.shape, dtype=np.float64)
+    cost[rooms] += room_cost
+
+    near_room = np.zeros_like(rooms)
+    near_room[1:, :] |= rooms[:-1, :]
+    near_room[:-1, :] |= rooms[1:, :]
+    near_room[:, 1:] |= rooms[:, :-1]
+    near_room[:, :-1] |= rooms[:, 1:]
+    cost[near_room] += adjacency_penalty
+    return cost
+
+class CorridorRouter:
+    """
+    Grid A* for carving corridors. The cost grid is built once per dungeon and
+    reused for every corridor; search state lives in flat arrays indexed by
+    (cell * STATES_PER_CELL + incoming direction) so the turn penalty is exact.
+    The rooms containing the start and end cells cost the same as open rock,
+    so only rooms the corridor would cut through are penalised.
+    carve() lowers carved cells to corridor_cost so later corridors can merge
+    into existing ones instead of running parallel to them.
+    """
+    def __init__(self, grid, room_cost=100, adjacency_penalty=20, turn_penalty=5, room_value=1, corridor_cost=1.0):
+        self.height = len(grid)
+        self.width = len(grid[0]) if self.height else 0
+        self.turn_penalty = turn_penalty
+        self.corridor_cost = corridor_cost
+        self._h_weight = min(1.0, corridor_cost) # Keeps the Manhattan heuristic admissible
+        self.cost_grid = build_cost_grid(grid, room_cost, adjacency_penalty, room_value)
+        self._cost = self.cost_grid.ravel().tolist() # Flat list: fastest per-element access in the hot loop
+        self.room_labels, _ = ndimage.label(np.asarray(grid) == room_value)
+        self._room_labels = self.room_labels.ravel().tolist()
+        self._neighbours = None # Built lazily by find_path
+        self._graph = None # Built lazily by find_paths
+
+    def _build_neighbour_table(self):
+        """For every flat cell index, the (direction, neighbour index) pairs that stay on the grid."""
+        w, h = self.width, self.height
+        table = []
+        for idx in range(w * h):
+            x, y = idx % w, idx // w
+            table.append(tuple(
+                (d, (y + dy) * w + (x + dx))
+                for d, (dx, dy) in enumerate(DIRECTIONS)
+                if 0 <= x + dx < w and 0 <= y + dy < h
+            ))
+        return table
+
+    def set_cost(self, x, y, value):
+        """Overrides the entry cost of one cell (e.g. after the grid was edited)."""
+        self.cost_grid[y, x] = value
+        self._cost[y * self.width + x] = float(value)
+
+    def carve(self, path):
+        """Marks a carved corridor in the cost grid (room cells keep their room cost)."""
+        for x, y in path:
+            idx = y * self.width + x
+            if self._room_labels[idx] == 0 and self._cost[idx] > self.corridor_cost:
+                self.set_cost(x, y, self.corridor_cost)
+
+    def find_path(self, start, end, max_expansions=None):
+        """
+        Returns the cheapest list of (x, y) cells from start to end inclusive,
+        or None if end is unreachable (or max_expansions is exceeded).
+        """
+        w, h = self.width, self.height
+        sx, sy = start; ex, ey = end
+        if not (0 <= sx < w and 0 <= sy < h and 0 <= ex < w and 0 <= ey < h): return None
+
+        start_idx, end_idx = sy * w + sx, ey * w + ex
+        if start_idx == end_idx: return [start]
+
+        if self._neighbours is None: self._neighbours = self._build_neighbour_table()
+        cost, neighbours, turn_penalty = self._cost, self._neighbours, self.turn_penalty
+        labels, hw = self._room_labels, self._h_weight
+        own_rooms = {labels[start_idx], labels[end_idx]} - {0}
+        inf = float('inf')
+        g_score = [inf] * (w * h * STATES_PER_CELL)
+        came_from = [-1] * (w * h * STATES_PER_CELL)
+
+        start_state = start_idx * STATES_PER_CELL + NO_DIRECTION
+        g_score[start_state] = 0.0
+        open_heap = [((abs(sx - ex) + abs(sy - ey)) * hw, 0.0, start_state)]
+        expansions = 0
+
+        while open_heap:
+            _, g, state = heapq.heappop(open_heap)
+            if g > g_score[state]: continue # Stale entry, a cheaper route was already expanded
+
+            cell, direction = divmod(state, STATES_PER_CELL)
+            if cell == end_idx:
+                return self._reconstruct(came_from, state)
+
+            expansions += 1
+            if max_expansions is not None and expansions > max_expansions: return None
+
+            for d, n_cell in neighbours[cell]:
+                step = 1.0 if labels[n_cell] in own_rooms else cost[n_cell]
+                if direction != NO_DIRECTION and d != direction: step += turn_penalty
+                new_g = g + step
+                n_state = n_cell * STATES_PER_CELL + d
+                if new_g < g_score[n_state]:
+                    g_score[n_state] = new_g
+                    came_from[n_state] = state
+                    nx, ny = n_cell % w, n_cell // w
+                    heapq.heappush(open_heap, (new_g + (abs(nx - ex) + abs(ny - ey)) * hw, new_g, n_state))
+        return None
+
+    def find_paths(self, start, targets):
+        """
+        Multi-target routing: computes one cost-weighted Dijkstra flow field from
+        start (scipy csgraph over the same (cell, direction) states as find_path)
+        and walks it back once per target. Returns {target: path or None}.
+        All target rooms count as 'own' rooms, like the start room.
+        """
+        w, h = self.width, self.height
+        sx, sy = start
+        results = {t: None for t in targets}
+        if not (0 <= sx < w and 0 <= sy < h): return results
+
+        start_idx = sy * w + sx
+        goal_cells = {}
+        for t in targets:
+            tx, ty = t
+            if 0 <= tx < w and 0 <= ty < h: goal_cells.setdefault(ty * w + tx, []).append(t)
+        if not goal_cells: return results
+
+        graph = self._state_graph(own_cells=[start_idx, *goal_cells])
+        start_state = start_idx * STATES_PER_CELL + NO_DIRECTION
+
+        # A generous distance limit keeps the field local; widen to the full map only if a target is missed
+        reach = max(abs(sx - c % w) + abs(sy - c // w) for c in goal_cells)
+        for limit in (2 * reach + 4 * self.turn_penalty + 50, np.inf):
+            dist, pred = dijkstra(graph, indices=start_state, return_predecessors=True, limit=limit)
+            dist = dist.reshape(-1, STATES_PER_CELL)
+            if all(np.isfinite(dist[c]).any() for c in goal_cells): break
+
+        for cell, cell_targets in goal_cells.items():
+            best = int(np.argmin(dist[cell]))
+            if not np.isfinite(dist[cell, best]): continue
+            state = cell * STATES_PER_CELL + best
+            states = []
+            while state >= 0:
+                states.append(state)
+                state = pred[state]
+            path = [((st // STATES_PER_CELL) % w, (st // STATES_PER_CELL) // w) for st in reversed(states)]
+            for t in cell_targets: results[t] = path
+        return results
+
+    def _state_graph(self, own_cells):
+        """
+        Sparse (cell, direction) transition graph with weights from the current
+        cost grid. The structure is built once; only the weights are refreshed,
+        so carve() updates are picked up by the next field.
+        """
+        if self._graph is None:
+            w, h = self.width, self.height
+            cells = np.arange(w * h)
+            xs, ys = cells % w, cells // w
+            rows, cols = [], []
+            for incoming in range(STATES_PER_CELL):
+                for d, (dx, dy) in enumerate(DIRECTIONS):
+                    nx, ny = xs + dx, ys + dy
+                    ok = (nx >= 0) & (nx < w) & (ny >= 0) & (ny < h)
+                    rows.append(cells[ok] * STATES_PER_CELL + incoming)
+                    cols.append((ny * w + nx)[ok] * STATES_PER_CELL + d)
+            rows, cols = np.concatenate(rows), np.concatenate(cols)
+            n_states = w * h * STATES_PER_CELL
+            self._graph = csr_matrix((np.ones(rows.size), (rows, cols)), shape=(n_states, n_states))
+
+            # Per-edge lookups in CSR order
+            edge_rows = np.repeat(np.arange(n_states), np.diff(self._graph.indptr))
+            incoming, outgoing = edge_rows % STATES_PER_CELL, self._graph.indices % STATES_PER_CELL
+            turns = (incoming != NO_DIRECTION) & (incoming != outgoing)
+            self._edge_turn = np.where(turns, float(self.turn_penalty), 0.0)
+            self._edge_dst = self._graph.indices // STATES_PER_CELL
+
+        labels = self.room_labels
+        own_rooms = [labels.flat[c] for c in own_cells if labels.flat[c] != 0]
+        cost = self.cost_grid.copy()
+        if own_rooms: cost[np.isin(labels, own_rooms)] = 1.0
+
+        self._graph.data = cost.ravel()[self._edge_dst] + self._edge_turn
+        return self._graph
+
+    def _reconstruct(self, came_from, state):
+        w = self.width
+        path = []
+        while state != -1:
+            cell = state // STATES_PER_CELL
+            path.append((cell % w, cell // w))
+            state = came_from[state]
+        return path[::-1]
+
+def find_path(grid, start, end, **router_kwargs):
+    """One-off convenience wrapper; build a CorridorRouter directly when routing many corridors."""
+    return CorridorRouter(grid, **router_kwargs).find_path(start, end)
@@ -0,0 +1,32 @@
+import numpy as np
+from scipy.spatial import Delaunay, QhullError
+
+def candidate_edges(points):
+    """
+    Returns a sparse list of (distance, i, j) edges between points, sorted by distance.
+
+    The Delaunay triangulation always contains the Euclidean minimum spanning tree,
+    so Kruskal over these ~3n edges gives the same MST as over all n^2 pairs, and the
+    leftover triangulation edges make natural short loop candidates. Tiny or
+    degenerate (collinear) inputs fall back to every pair.
+    """
+    n = len(points)
+    if n < 2: return []
+    pts = np.asarray(points, dtype=np.float64)
+
+    pairs = None
+    if n > 3:
+        try:
+            simplices = Delaunay(pts).simplices
+            tri_edges = np.concatenate([simplices[:, [0, 1]], simplices[:, [1, 2]], simplices[:, [0, 2]]])
+            pairs = np.unique(np.sort(tri_edges, axis=1), axis=0)
+        except QhullError:
+            pairs = None
+
+    if pairs is None:
+        i, j = np.triu_indices(n, k=1)
+        pairs = np.stack([i, j], axis=1)
+
+    dists = np.hypot(*(pts[pairs[:, 0]] - pts[pairs[:, 1]]).T)
+    order = np.argsort(dists, kind='stable')
+    return [(float(dists[k]), int(pairs[k, 0]), int(pairs[k, 1])) for k in order]
@@ -0,0 +1,172 @@
+import os
+import struct
+import threading
+import zlib
+import numpy as np
+import pygame
+
+EXPORT_TILE_PX = 1024   # Target tile edge; peak memory is about one band of tiles (width x EXPORT_TILE_PX x 3 bytes)
+EXPORT_DPI = 150        # Default print resolution written into the file's metadata
+EXPORT_COMPRESSION = 6  # zlib level for PNG IDAT and TIFF deflate strips
+
+# --- Streaming image writers ---
+# Both take RGB rows top to bottom in bands via write_rows() and never hold the full image.
+
+class PNGStreamWriter:
+    """Baseline 8-bit RGB PNG, written as one zlib stream split over IDAT chunks as bands arrive."""
+    def __init__(self, path, width, height, dpi=None):
+        self.width, self.height = width, height
+        self.rows_written = 0
+        self._file = open(path, 'wb')
+        self._zip = zlib.compressobj(EXPORT_COMPRESSION)
+        self._file.write(b'\x89PNG\r\n\x1a\n')
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+        if dpi:
+            ppm = int(round(dpi / 0.0254)) # pHYs is pixels per metre
+            self._chunk(b'pHYs', struct.pack('>IIB', ppm, ppm, 1))
+
+    def _chunk(self, kind, data):
+        self._file.write(struct.pack('>I', len(data)))
+        self._file.write(kind + data)
+        self._file.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(kind)) & 0xFFFFFFFF))
+
+    def write_rows(self, rows):
+        """rows: (h, width, 3) uint8 array."""
+        h = rows.shape[0]
+        scanlines = np.zeros((h, self.width * 3 + 1), dtype=np.uint8) # Leading 0 = filter type None
+        scanlines[:, 1:] = rows.reshape(h, -1)
+        data = self._zip.compress(scanlines.tobytes())
+        if data: self._chunk(b'IDAT', data)
+        self.rows_written += h
+
+    def close(self):
+        self._chunk(b'IDAT', self._zip.flush())
+        self._chunk(b'IEND', b'')
+        self._file.close()
+
+class TIFFStreamWriter:
+    """
+    Baseline little-endian RGB TIFF with one deflate-compressed strip per write_rows()
+    call. Every call but the last must pass the same number of rows (RowsPerStrip).
+    The IFD is written after the strips and the header patched to point at it.
+    """
+    def __init__(self, path, width, height, dpi=None):
+        self.width, self.height = width, height
+        self.dpi = dpi
+        self.rows_written = 0
+        self.rows_per_strip = None
+        self.strips = [] # (offset, byte count)
+        self._file = open(path, 'wb')
+        self._file.write(b'II' + struct.pack('<HI', 42, 0)) # IFD offset patched in close()
+
+    def write_rows(self, rows):
+        if self.rows_per_strip is None: self.rows_per_strip = rows.shape[0]
+        data = zlib.compress(np.ascontiguousarray(rows).tobytes(), EXPORT_COMPRESSION)
+        self.strips.append((self._file.tell(), len(data)))
+        self._file.write(data)
+        self.rows_written += rows.shape[0]
+
+    def _tell_even(self):
+        if self._file.tell() % 2: self._file.write(b'\0')
+        return self._file.tell()
+
+    def _write_array(self, fmt, values):
+        offset = self._tell_even()
+        self._file.write(struct.pack('<' + fmt * len(values), *values))
+        return offset
+
+    def close(self):
+        SHORT, LONG, RATIONAL = 3, 4, 5
+        offsets = [o for o, _ in self.strips]
+        counts = [c for _, c in self.strips]
+        dpi = int(round(self.dpi or 72))
+
+        def long_array(values):
+            return values[0] if len(values) == 1 else self._write_array('I', values)
+
+        entries = [
+            (256, LONG, 1, self.width),
+            (257, LONG, 1, self.height),
+            (258, SHORT, 3, self._write_array('H', (8, 8, 8))),
+            (259, SHORT, 1, 8),                 # Adobe deflate
+            (262, SHORT, 1, 2),                 # RGB
+            (273, LONG, len(offsets), long_array(offsets)),
+            (277, SHORT, 1, 3),
+            (278, LONG, 1, self.rows_per_strip or self.height),
+            (279, LONG, len(counts), long_array(counts)),
+            (282, RATIONAL, 1, self._write_array('I', (dpi, 1))),
+            (283, RATIONAL, 1, self._write_array('I', (dpi, 1))),
+            (284, SHORT, 1, 1),                 # Chunky RGB
+            (296, SHORT, 1, 2),                 # Inches
+        ]
+        ifd_offset = self._tell_even()
+        self._file.write(struct.pack('<H', len(entries)))
+        for tag, kind, count, value in entries:
+            if kind == SHORT and count == 1: value_bytes = struct.pack('<HH', value, 0)
+            else: value_bytes = struct.pack('<I', value)
+            self._file.write(struct.pack('<HHI', tag, kind, count) + value_bytes)
+        self._file.write(struct.pack('<I', 0)) # No further IFDs
+        self._file.seek(4)
+        self._file.write(struct.pack('<I', ifd_offset))
+        self._file.close()
+
+def open_image_writer(path, width, height, dpi=None):
+    ext = os.path.splitext(str(path))[1].lower()
+    if ext in ('.tif', '.tiff'): return TIFFStreamWriter(path, width, height, dpi)
+    if ext == '.png': return PNGStreamWriter(path, width, height, dpi)
+    raise ValueError(f"Unsupported export format: {ext or path}")
+
+# --- Tiled export ---
+
+def export_tiled(path, width, height, render_tile, tile_px=EXPORT_TILE_PX, dpi=EXPORT_DPI, progress=None):
+    """
+    Renders a width x height image tile by tile and streams it to path (.png or .tif).
+
+    render_tile(rect) must return a pygame.Surface of rect's size holding the map pixels
+    of that rect. Tiles are rendered one band (a row of tiles) at a time, so memory stays
+    at roughly width x tile_px x 3 bytes however large the export is.
+    progress(rows_done, height) is called after each band.
+    """
+    writer = open_image_writer(path, width, height, dpi)
+    try:
+        for y in range(0, height, tile_px):
+            band_h = min(tile_px, height - y)
+            band = np.empty((band_h, width, 3), dtype=np.uint8)
+            for x in range(0, width, tile_px):
+                rect = pygame.Rect(x, y, min(tile_px, width - x), band_h)
+                tile = render_tile(rect)
+                band[:, x:rect.right] = pygame.surfarray.pixels3d(tile).transpose(1, 0, 2)
+            writer.write_rows(band)
+            if progress: progress(y + band_h, height)
+    finally:
+        writer.close()
+    return path
+
+class ExportJob:
+    """
+    Runs export_tiled() on a worker thread so the editor keeps drawing and taking input.
+    Poll progress (0..1), done and error from the UI loop. render_tile must only read
+    data the UI thread no longer changes (pass it a snapshot).
+    """
+    def __init__(self, path, width, height, render_tile, **kwargs):
+        self.path = path
+        self.progress = 0.0
+        self.done = False
+        self.error = None
+        self.thread = threading.Thread(target=self._run, args=(path, width, height, render_tile), kwargs=kwargs, daemon=True)
+        self.thread.start()
+
+    def _run(self, path, width, height, render_tile, **kwargs):
+        try:
+            export_tiled(path, width, height, render_tile, progress=self._progress, **kwargs)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+
+    def _progress(self, rows_done, height):
+        self.progress = rows_done / height
+
+def aligned_tile_px(unit_px, target=EXPORT_TILE_PX):
+    """Largest multiple of unit_px (e.g. one cell) not above target, so tiles start on cell boundaries."""
+    return max(1, target // unit_px) * unit_px
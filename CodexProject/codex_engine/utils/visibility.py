@@ -0,0 +1,138 @@
+import base64
+import math
+import zlib
+import numpy as np
+import pygame
+
+# Quadrant transforms as (x per row, x per col, y per row, y per col): north, south, east, west
+QUADRANTS = ((0, 1, -1, 0), (0, 1, 1, 0), (1, 0, 0, 1), (-1, 0, 0, 1))
+
+def compute_fov(opaque, origin, radius, facing=None, beam=360):
+    """
+    Symmetric shadowcasting over a 2D boolean opacity array (True = blocks sight).
+    Opaque cells are visible themselves but hide what lies behind them.
+
+    Only the window of cells within radius of origin is touched, so the cost scales
+    with the lit area, not the map. Returns (visible, (x0, y0)): a bool array for
+    that window and the window's top-left cell in grid coordinates.
+    facing/beam (degrees, 0 = +x, clockwise on screen) restrict the result to a cone.
+    """
+    h, w = opaque.shape
+    ox, oy = int(origin[0]), int(origin[1])
+    r = max(0, int(math.ceil(radius)))
+    x0, y0 = max(0, ox - r), max(0, oy - r)
+    x1, y1 = min(w, ox + r + 1), min(h, oy + r + 1)
+    if not (0 <= ox < w and 0 <= oy < h):
+        return np.zeros((0, 0), dtype=bool), (x0, y0)
+
+    blocked = opaque[y0:y1, x0:x1].tolist()
+    wh, ww = y1 - y0, x1 - x0
+    seen = [[False] * ww for _ in range(wh)]
+    lx, ly = ox - x0, oy - y0
+    seen[ly][lx] = True
+
+    for xr, xc, yr, yc in QUADRANTS:
+        rows = [(1, -1.0, 1.0)] # (depth, start slope, end slope)
+        while rows:
+            depth, start, end = rows.pop()
+            if depth > r: continue
+            prev_wall = None
+            for col in range(math.floor(depth * start + 0.5), math.ceil(depth * end - 0.5) + 1):
+                x, y = lx + xr * depth + xc * col, ly + yr * depth + yc * col
+                inside = 0 <= x < ww and 0 <= y < wh
+                wall = blocked[y][x] if inside else True
+                # Floors are only revealed when symmetric (the origin is also visible from them)
+                if inside and (wall or depth * start <= col <= depth * end):
+                    seen[y][x] = True
+                if prev_wall and not wall:
+                    start = (2 * col - 1) / (2 * depth)
+                elif prev_wall is False and wall:
+                    rows.append((depth + 1, start, (2 * col - 1) / (2 * depth)))
+                prev_wall = wall
+            if prev_wall is False:
+                rows.append((depth + 1, start, end))
+
+    visible = np.array(seen, dtype=bool)
+
+    # Trim the square scan to a circle (and cone), measured between cell centres
+    dx = np.arange(x0, x1) + 0.5 - (ox + 0.5)
+    dy = np.arange(y0, y1)[:, None] + 0.5 - (oy + 0.5)
+    visible &= (dx * dx + dy * dy) <= radius * radius
+    if beam < 360 and facing is not None:
+        angles = np.degrees(np.arctan2(dy, dx))
+        visible &= ((angles - (facing - beam / 2)) % 360) <= beam
+    visible[ly, lx] = True
+    return visible, (x0, y0)
+
+def visibility_mask_surface(visible, offset, origin, cell_px, size, alpha=255):
+    """
+    Draws a compute_fov window as a transparent surface of the given pixel size that is
+    white with the given alpha over visible cells (fractional values give partial alpha).
+    origin (grid coords) lands at the surface centre.
+    """
+    surf = pygame.Surface(size, pygame.SRCALPHA)
+    surf.fill((0, 0, 0, 0))
+    if visible.size == 0: return surf
+    blit_cells(surf, cell_mask_surface(visible, alpha), offset, origin, cell_px)
+    return surf
+
+def cell_mask_surface(values, alpha=255):
+    """One pixel per cell: white, with alpha = values * alpha."""
+    wh, ww = values.shape
+    cells = pygame.Surface((ww, wh), pygame.SRCALPHA)
+    cells.fill((255, 255, 255, 0))
+    cell_alpha = pygame.surfarray.pixels_alpha(cells)
+    cell_alpha[:] = (values.T * alpha).astype(np.uint8)
+    del cell_alpha # Unlocks the surface
+    return cells
+
+def blit_cells(surf, cells, offset, origin, cell_px, special_flags=0):
+    """
+    Scales a one-pixel-per-cell surface to cell_px and blits it onto surf so that
+    origin (grid coords) sits at the centre of surf. Only the cells' footprint is touched.
+    """
+    ww, wh = cells.get_size()
+    if ww == 0 or wh == 0: return
+    scaled = pygame.transform.scale(cells, (max(1, round(ww * cell_px)), max(1, round(wh * cell_px))))
+    sx = surf.get_width() / 2 + (offset[0] - origin[0]) * cell_px
+    sy = surf.get_height() / 2 + (offset[1] - origin[1]) * cell_px
+    surf.blit(scaled, (round(sx), round(sy)), special_flags=special_flags)
+
+def crop_window(values, offset, window):
+    """Copies a grid window (values at offset) into a zero array covering window = (x0, y0, x1, y1)."""
+    x0, y0, x1, y1 = window
+    out = np.zeros((y1 - y0, x1 - x0), dtype=values.dtype)
+    h, w = values.shape
+    ox0, oy0 = max(x0, offset[0]), max(y0, offset[1])
+    ox1, oy1 = min(x1, offset[0] + w), min(y1, offset[1] + h)
+    if ox0 < ox1 and oy0 < oy1:
+        out[oy0 - y0:oy1 - y0, ox0 - x0:ox1 - x0] = values[oy0 - offset[1]:oy1 - offset[1], ox0 - offset[0]:ox1 - offset[0]]
+    return out
+
+def screen_window(shape, origin, cell_px, size):
+    """Returns (x0, y0, x1, y1): the grid cells covered by a screen of the given size centred on origin."""
+    h, w = shape
+    half_w, half_h = size[0] / 2 / cell_px, size[1] / 2 / cell_px
+    x0, y0 = max(0, int(origin[0] - half_w) - 1), max(0, int(origin[1] - half_h) - 1)
+    x1, y1 = min(w, int(origin[0] + half_w) + 2), min(h, int(origin[1] + half_h) + 2)
+    return x0, y0, max(x0, x1), max(y0, y1)
+
+# --- Fog of war memory ---
+# Explored cells are kept as a uint8 (0/1) array per level and stored in the level's
+# geometry as a bit-packed, zlib-compressed, base64 string (~1 KB for a 100x100 level).
+
+def encode_explored(explored):
+    packed = np.packbits(explored.astype(bool), axis=None)
+    return base64.b64encode(zlib.compress(packed.tobytes())).decode('ascii')
+
+def decode_explored(data, width, height):
+    """Inverse of encode_explored; missing or mismatched data yields a fresh, unexplored map."""
+    explored = np.zeros((height, width), dtype=np.uint8)
+    if not data: return explored
+    try:
+        bits = np.unpackbits(np.frombuffer(zlib.decompress(base64.b64decode(data)), dtype=np.uint8))
+    except (ValueError, zlib.error):
+        return explored
+    if bits.size < width * height: return explored
+    explored[:] = bits[:width * height].reshape(height, width)
+    return explored
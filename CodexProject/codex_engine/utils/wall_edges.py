@@ -0,0 +1,52 @@
+import numpy as np
+
+def _runs(mask):
+    """(row, start, end) for every horizontal run of True in a 2D bool array (end exclusive)."""
+    padded = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    steps = np.diff(padded, axis=1)
+    starts = np.argwhere(steps == 1)  # Row-major, so starts and ends pair up in order
+    ends = np.argwhere(steps == -1)
+    return starts[:, 0], starts[:, 1], ends[:, 1]
+
+def _split(rows, starts, ends, max_run, origin):
+    """Cuts runs at world multiples of max_run so pieces stay identical when the grid is a moving window."""
+    if not max_run: return list(zip(rows.tolist(), starts.tolist(), ends.tolist()))
+    pieces = []
+    for row, start, end in zip(rows.tolist(), starts.tolist(), ends.tolist()):
+        while start < end:
+            cut = min(end, ((start + origin) // max_run + 1) * max_run - origin)
+            pieces.append((row, start, cut))
+            start = cut
+    return pieces
+
+def extract_walls(grid, origin=(0, 0), max_run=None):
+    """
+    Wall segments of a dungeon grid (0 = solid rock, anything else open) as
+    (x0, y0, x1, y1) tuples on cell-corner coordinates offset by origin.
+
+    Edge detection is four NumPy shifts (an open cell next to rock or the grid
+    border gets a wall on that side); consecutive collinear wall edges are then
+    merged into single segments, optionally cut every max_run cells.
+    """
+    open_cells = np.asarray(grid) != 0
+    if open_cells.size == 0: return []
+    ox, oy = origin
+
+    solid = np.ones((open_cells.shape[0] + 2, open_cells.shape[1] + 2), dtype=bool)
+    solid[1:-1, 1:-1] = ~open_cells
+    top = open_cells & solid[:-2, 1:-1]
+    bottom = open_cells & solid[2:, 1:-1]
+    left = open_cells & solid[1:-1, :-2]
+    right = open_cells & solid[1:-1, 2:]
+
+    walls = []
+    # Horizontal walls run along x; top edges sit on the cell's row, bottom edges one below
+    for mask, dy in ((top, 0), (bottom, 1)):
+        for y, x0, x1 in _split(*_runs(mask), max_run, ox):
+            walls.append((x0 + ox, y + dy + oy, x1 + ox, y + dy + oy))
+    # Vertical walls: same run finding on the transposed masks
+    for mask, dx in ((left, 0), (right, 1)):
+        for x, y0, y1 in _split(*_runs(mask.T), max_run, oy):
+            walls.append((x + dx + ox, y0 + oy, x + dx + ox, y1 + oy))
+    return walls
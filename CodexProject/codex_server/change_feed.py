@@ -0,0 +1,48 @@
+import asyncio
+from fastapi.concurrency import run_in_threadpool
+
+CHANGE_POLL_INTERVAL = 0.5 # Seconds between revision checks while any client is long-polling
+LONG_POLL_TIMEOUT = 25.0   # Default wait for /api/changes; below common proxy idle timeouts
+
+def etag_matches(if_none_match, etag):
+    """True if an If-None-Match header value lists etag (weak comparison, '*' matches anything)."""
+    if not if_none_match or not etag: return False
+    tags = [t.strip() for t in if_none_match.split(',')]
+    return '*' in tags or any(t.removeprefix('W/') == etag for t in tags)
+
+class ChangeWatcher:
+    """
+    Wakes long-polling clients when the DB revision moves. The app process writes the
+    DB directly, so there is nothing to subscribe to: one task checks the newest
+    revision every CHANGE_POLL_INTERVAL, and only while someone is waiting, so the
+    DB load is the same for one connected device or fifty.
+    """
+    def __init__(self, db):
+        self.db = db
+        self.revision = 0
+        self.waiting = 0
+        self.updated = None # asyncio.Condition, created on the server's event loop in run()
+
+    async def run(self):
+        self.updated = asyncio.Condition()
+        self.revision = await run_in_threadpool(self.db.current_revision)
+        while True:
+            await asyncio.sleep(CHANGE_POLL_INTERVAL)
+            if not self.waiting: continue
+            revision = await run_in_threadpool(self.db.current_revision)
+            if revision != self.revision:
+                async with self.updated:
+                    self.revision = revision
+                    self.updated.notify_all()
+
+    async def wait_past(self, since, timeout):
+        """Waits up to timeout seconds for a revision newer than since; True if one arrived."""
+        self.waiting += 1
+        try:
+            async with self.updated:
+                await asyncio.wait_for(self.updated.wait_for(lambda: self.revision > since), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.waiting -= 1
@@ -1,14 +1,32 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Request, Response, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from typing import List
+from typing import List, Optional
+import asyncio
 import os
 
 from codex_engine.core.db_manager import DBManager
 from codex_engine.core.db_adapter import SQLTreeAdapter
-from .schemas import TreeNodeResponse, TreeNodeSummary, NodeUpdate
+from codex_engine.utils import json_codec
+from .schemas import TreeNodeResponse, TreeNodeSummary, NodeUpdate, NodeProperty, ChangeFeed, BatchRequest, BatchResult
+from .change_feed import ChangeWatcher, etag_matches, LONG_POLL_TIMEOUT
+from .player_stream import PlayerViewBroadcaster, MJPEG_BOUNDARY
 
-app = FastAPI()
+class CodexJSONResponse(JSONResponse):
+    """JSONResponse encoded with json_codec (orjson or msgspec when installed)."""
+    def render(self, content) -> bytes:
+        return json_codec.dumps_bytes(content)
+
+app = FastAPI(default_response_class=CodexJSONResponse)
+
+player_view = None # PlayerViewBroadcaster once the app process hands over the player stream
+
+def attach_player_stream(stream_handle):
+    """Called before uvicorn.run() with PlayerStream.handle() from the app process."""
+    global player_view
+    player_view = PlayerViewBroadcaster(stream_handle)
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,25 +35,94 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def get_adapter():
-    # FIX: Correctly instantiate with the database path
-    return SQLTreeAdapter(DBManager("data/codex.db"))
+DB_PATH = "data/codex.db"
+
+@app.on_event("startup")
+def open_database():
+    # One adapter for the app's lifetime: tables are checked once and each worker thread keeps its connection open
+    app.state.adapter = SQLTreeAdapter(DBManager(DB_PATH, verbosity=0, reuse_connections=True))
+    app.state.changes = ChangeWatcher(app.state.adapter.db)
+
+@app.on_event("startup")
+async def start_change_watcher():
+    app.state.change_watcher_task = asyncio.create_task(app.state.changes.run())
+
+@app.on_event("shutdown")
+def close_database():
+    app.state.adapter.db.close()
+
+def get_adapter(request: Request):
+    return request.app.state.adapter
+
+# SQLite calls block, so they run in the threadpool and never stall the event loop (or the player stream)
 
 @app.get("/api/tree", response_model=List[TreeNodeSummary])
 async def get_roots(adapter = Depends(get_adapter)):
-    return adapter.get_roots()
+    return await run_in_threadpool(adapter.get_roots)
 
 @app.get("/api/tree/{uid}", response_model=TreeNodeResponse)
-async def get_node(uid: str, adapter = Depends(get_adapter)):
-    node = adapter.get_node(uid)
+async def get_node(
+    request: Request,
+    uid: str,
+    fields: Optional[str] = None,       # Comma-separated property keys, e.g. fields=description,state
+    exclude_large: bool = False,        # Leave out big properties (dungeon grids); they come back as lazy fields
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    adapter = Depends(get_adapter),
+):
+    # Revalidation costs one indexed query; unchanged nodes answer 304 without being loaded
+    etag = await run_in_threadpool(adapter.get_view_etag, uid, request.url.query)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+    keys = {k.strip() for k in fields.split(',') if k.strip()} if fields is not None else None
+    node = await run_in_threadpool(adapter.get_node, uid, keys, exclude_large, limit, cursor)
     if not node: raise HTTPException(404, "Node not found")
-    return node
+    # Returned directly: the adapter already builds the TreeNodeResponse shape, and
+    # re-validating a large node through pydantic costs more than encoding it.
+    # no-cache: browsers keep the copy but always revalidate it
+    return CodexJSONResponse(node, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+@app.get("/api/tree/{uid}/property/{key}", response_model=NodeProperty)
+async def get_property(uid: str, key: str, adapter = Depends(get_adapter)):
+    found, value = await run_in_threadpool(adapter.get_property, uid, key)
+    if not found: raise HTTPException(404, "Property not found")
+    return CodexJSONResponse({"uid": uid, "key": key, "value": value})
 
 @app.patch("/api/tree/{uid}")
 async def update_node(uid: str, payload: NodeUpdate, adapter = Depends(get_adapter)):
-    adapter.update_node(uid, payload.data)
+    await run_in_threadpool(adapter.update_node, uid, payload.data)
     return {"status": "success"}
 
+@app.post("/api/batch", response_model=BatchResult)
+async def apply_batch(payload: BatchRequest, adapter = Depends(get_adapter)):
+    """Many updates/creates/deletes in one round trip and one transaction (all or nothing)."""
+    operations = [op.model_dump() for op in payload.operations]
+    try:
+        return await run_in_threadpool(adapter.apply_batch, operations)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+@app.get("/api/changes", response_model=ChangeFeed)
+async def get_changes(
+    since: int = Query(0, ge=-1), # -1: just return the current revision to start from
+    timeout: float = Query(LONG_POLL_TIMEOUT, ge=0, le=60), # Long-poll: wait this long for a change before answering empty
+    adapter = Depends(get_adapter),
+):
+    feed = await run_in_threadpool(adapter.get_changes, since)
+    if since >= 0 and not feed["changes"] and not feed["resync"] and timeout and await app.state.changes.wait_past(since, timeout):
+        feed = await run_in_threadpool(adapter.get_changes, since)
+    return feed
+
+@app.on_event("startup")
+async def start_player_stream():
+    if player_view: app.state.player_stream_task = asyncio.create_task(player_view.run())
+
+@app.get("/api/player/stream")
+async def stream_player_view():
+    if not player_view: raise HTTPException(503, "Player view streaming is not running")
+    return StreamingResponse(player_view.mjpeg(), media_type=f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY.decode()}")
+
 # Serve the static Web Client
 current_dir = os.path.dirname(os.path.abspath(__file__))
 static_path = os.path.join(current_dir, "static")
@@ -0,0 +1,64 @@
+import asyncio
+import io
+from contextlib import aclosing
+import pygame
+from fastapi.concurrency import run_in_threadpool
+from codex_engine.core.player_frames import PlayerStream, STREAM_FPS
+
+MJPEG_BOUNDARY = b"frame"
+
+class PlayerViewBroadcaster:
+    """
+    Fans the player view out to any number of browsers. One task polls the shared
+    PlayerStream and JPEG-encodes each new image once (in a worker thread); every
+    client then sends whatever frame is newest when it is ready for another, so a slow
+    client skips frames instead of queuing them or holding up anyone else.
+    """
+    def __init__(self, stream_handle):
+        self.stream = PlayerStream(stream_handle)
+        self.seq = 0
+        self.jpeg = None
+        self.clients = 0
+        self.updated = None # asyncio.Condition, created on the server's event loop in run()
+
+    async def run(self):
+        self.updated = asyncio.Condition()
+        while True:
+            if self.clients:
+                frame = await run_in_threadpool(self._encode_newer, self.seq)
+                if frame:
+                    async with self.updated:
+                        self.seq, self.jpeg = frame
+                        self.updated.notify_all()
+            await asyncio.sleep(1.0 / STREAM_FPS)
+
+    def _encode_newer(self, after_seq):
+        newer = self.stream.read(after_seq)
+        if not newer: return None
+        seq, surface = newer
+        out = io.BytesIO()
+        pygame.image.save(surface, out, "frame.jpg")
+        return seq, out.getvalue()
+
+    def _set_clients(self, delta):
+        self.clients += delta
+        self.stream.set_viewers(self.clients) # The player window only publishes while someone watches
+
+    async def frames(self):
+        """Encoded frames for one client: the current one at once, then each newer one it has time for."""
+        self._set_clients(1)
+        try:
+            sent = 0
+            while True:
+                async with self.updated:
+                    await self.updated.wait_for(lambda: self.seq > sent)
+                    sent, jpeg = self.seq, self.jpeg
+                yield jpeg
+        finally:
+            self._set_clients(-1)
+
+    async def mjpeg(self):
+        """multipart/x-mixed-replace body: plays in a plain <img> tag on any phone browser."""
+        async with aclosing(self.frames()) as frames: # Viewer count drops as soon as the client goes
+            async for jpeg in frames:
+                yield b"--" + MJPEG_BOUNDARY + b"\r\nContent-Type: image/jpeg\r\nContent-Length: " + str(len(jpeg)).encode() + b"\r\n\r\n" + jpeg + b"\r\n"
@@ -9,6 +9,8 @@ class FieldDefinition(BaseModel):
     type: str               # "text", "textarea", "number", "select", "list", "json"
     readonly: bool = False
     options: Optional[List[str]] = None # For select dropdowns
+    lazy: bool = False      # Value left out of 'data' (exclude_large); fetch it from /api/tree/{uid}/property/{key}
+    size: Optional[int] = None # Length of a lazy value's JSON, so the client can warn before loading it
 
 class TreeNodeResponse(BaseModel):
     uid: str
@@ -24,6 +26,7 @@ class TreeNodeResponse(BaseModel):
     
     # Navigation
     children: List['TreeNodeSummary'] = []
+    next_cursor: Optional[str] = None # Pass as ?cursor= for the next page of children
 
 class TreeNodeSummary(BaseModel):
     uid: str
@@ -31,5 +34,35 @@ class TreeNodeSummary(BaseModel):
     name: str
     icon: str = "📄"
 
+class NodeProperty(BaseModel):
+    uid: str
+    key: str
+    value: Any
+
 class NodeUpdate(BaseModel):
     data: Dict[str, Any]
+
+class BatchOperation(BaseModel):
+    op: str             # "update", "create", "delete"
+    uid: Optional[str] = None           # update/delete target; "$n" = the node created by operation n
+    parent_uid: Optional[str] = None    # create: parent node (or "$n"); None makes a root
+    type: Optional[str] = None          # create: node type
+    data: Dict[str, Any] = {}           # update/create: 'name' plus properties, as in NodeUpdate
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation]
+
+class BatchResult(BaseModel):
+    revision: int       # The single change-feed revision shared by the whole batch
+    uids: List[str]     # Node touched by each operation (the new uid for creates)
+
+class NodeChange(BaseModel):
+    rev: int
+    uid: str
+    parent_uid: Optional[str]
+    kind: str           # "create", "update", "delete"
+
+class ChangeFeed(BaseModel):
+    revision: int       # Pass as ?since= to continue
+    changes: List[NodeChange]
+    resync: bool = False # since is older than the kept history: reload what is shown, then continue from revision
@@ -29,6 +29,7 @@ from codex_engine.core.db_manager import DBManager
 from codex_engine.core.theme_manager import ThemeManager
 from codex_engine.core.config_manager import ConfigManager
 from codex_engine.core.ai_manager import AIManager
+from codex_engine.core.player_frames import FrameChannel, PlayerViewScheduler, PlayerStream
 from codex_engine.ui.campaign_menu import CampaignMenu
 from codex_engine.ui.map_viewer import MapViewer
 from codex_engine.generators.world_gen import WorldGenerator
@@ -37,7 +38,7 @@ from codex_engine.generators.tactical_gen import TacticalGenerator
 
 # --- HARDWARE SUB-PROCESSES ---
 
-def server_process(port, host):
+def server_process(port, host, stream_handle):
     log(LOG_INFO, f"ENTER: server_process (Port: {port})")
     import uvicorn
     # Force path for imports
@@ -45,15 +46,23 @@ def server_process(port, host):
     sys.path.insert(0, current_dir)
     
     try:
-        from codex_server.main import app
+        from codex_server.main import app, attach_player_stream
+        attach_player_stream(stream_handle)
         uvicorn.run(app, host=host, port=port, log_level="warning")
     except Exception as e:
         log(LOG_DEBUG, f"SERVER ERROR: {e}")
     log(LOG_INFO, "EXIT: server_process")
 
-def player_window_process(image_queue):
-    """Separate process for the player display window."""
+def player_window_process(frame_handle, stream_handle):
+    """
+    Separate process for the player display window. Frames arrive through shared memory
+    (FrameChannel); in scene mode the GM sends the live level once and the view is
+    rendered here from scene deltas at the window's own resolution. Whatever is on screen is
+    also published to the web server for browser viewers (PlayerStream).
+    """
     import pygame
+    from codex_engine.core.player_frames import FrameReceiver, PlayerStream, blit_frame
+    from codex_engine.ui.renderers.tactical.player_view import PlayerScene
     
     pygame.init()
     try:
@@ -69,11 +78,22 @@ def player_window_process(image_queue):
     screen.fill((0, 0, 0))
     pygame.display.flip()
     
+    receiver = FrameReceiver(frame_handle)
+    stream = PlayerStream(stream_handle)
+    stream_stale = True # Screen changed since it was last published
     clock = pygame.time.Clock()
     running = True
     
     initial_image = None
     current_image_surface = None
+    scene = None # PlayerScene while the GM sends scene deltas instead of frames
+
+    def show_scene():
+        if scene.render(screen) is None and initial_image:
+            screen.blit(pygame.transform.smoothscale(initial_image, screen.get_size()), (0, 0))
+        pygame.display.flip()
+        explored = scene.take_explored()
+        if explored: receiver.reply(("EXPLORED", scene.node['id'], explored))
 
     while running:
         for event in pygame.event.get():
@@ -81,38 +101,52 @@ def player_window_process(image_queue):
                 running = False
             elif event.type == pygame.VIDEORESIZE:
                 screen = pygame.display.set_mode(event.size, pygame.RESIZABLE)
-                if current_image_surface:
+                stream_stale = True
+                if scene: show_scene()
+                elif current_image_surface:
                     scaled_image = pygame.transform.smoothscale(current_image_surface, screen.get_size())
                     screen.blit(scaled_image, (0, 0))
                     pygame.display.flip()
 
-        if not image_queue.empty():
-            data = image_queue.get()
-            
-            if data == "QUIT":
-                running = False
-            elif data == "REVERT":
-                if initial_image:
-                    current_image_surface = initial_image
-                    scaled_image = pygame.transform.smoothscale(initial_image, screen.get_size())
-                    screen.blit(scaled_image, (0, 0))
-                    pygame.display.flip()
-            elif isinstance(data, tuple):
-                image_string, size = data
-                try:
-                    new_image = pygame.image.fromstring(image_string, size, 'RGB')
-                    if not initial_image:
-                        initial_image = new_image
-                    
-                    current_image_surface = new_image
-                    scaled_image = pygame.transform.smoothscale(new_image, screen.get_size())
-                    screen.blit(scaled_image, (0, 0))
-                    pygame.display.flip()
-                except Exception as e:
-                    print(f"Player Window Error: Failed to display surface: {e}")
+        # Only the newest frame or command is returned; superseded frames are skipped
+        data = receiver.poll()
+        if data == "QUIT":
+            running = False
+        elif data == "SCENE":
+            try:
+                delta = receiver.take_scene()
+                if delta.get('load') or scene is None:
+                    scene = PlayerScene(delta['level'])
+                scene.apply(delta)
+                show_scene()
+            except Exception as e:
+                print(f"Player Window Error: Failed to render scene: {e}")
+        elif data == "REVERT":
+            scene = None
+            if initial_image:
+                current_image_surface = initial_image
+                scaled_image = pygame.transform.smoothscale(initial_image, screen.get_size())
+                screen.blit(scaled_image, (0, 0))
+                pygame.display.flip()
+        elif data is not None:
+            scene = None
+            try:
+                if not initial_image:
+                    initial_image = data.copy() # The receiver patches its frame in place
+                
+                current_image_surface = data
+                # Only the regions the GM reported as changed are rescaled and presented
+                pygame.display.update(blit_frame(screen, data, receiver.dirty))
+            except Exception as e:
+                print(f"Player Window Error: Failed to display surface: {e}")
         
+        if data is not None: stream_stale = True
+        if stream_stale and stream.publish(screen): stream_stale = False
         clock.tick(30)
     
+    print(f"Player Window: shown {receiver.frames_shown} frames, skipped {receiver.frames_skipped} superseded frames")
+    receiver.close()
+    stream.close()
     pygame.quit()
 # --- MAIN APP ---
 
@@ -140,7 +174,9 @@ class CodexApp:
         # 4. START HARDWARE PROCESSES
         s_p = srv['properties']
         log(LOG_DEBUG, f"Starting server process on {s_p['host']}:{s_p['port']}")
-        self.server_proc = multiprocessing.Process(target=server_process, args=(s_p['port'], s_p['host']))
+        # Latest player-window image for browser viewers, written by the player window and read by the server
+        self.stream = PlayerStream()
+        self.server_proc = multiprocessing.Process(target=server_process, args=(s_p['port'], s_p['host'], self.stream.handle()))
         self.server_proc.start()
 
         pygame.init()
@@ -150,9 +186,13 @@ class CodexApp:
         pygame.display.set_caption(d_p.get('title', 'Codex'))
         self.clock = pygame.time.Clock()
 
-        self.image_queue = multiprocessing.Queue()
-        self.player_proc = multiprocessing.Process(target=player_window_process, args=(self.image_queue,))
+        self.frames = FrameChannel()
+        # "frames" (default): always ship pixels; "scene": maps that support it are rendered inside the player process from scene deltas
+        self.scene_mode = pvw['properties'].get('render_mode', 'frames') == 'scene'
+        self.player_proc = multiprocessing.Process(target=player_window_process, args=(self.frames.handle(), self.stream.handle()))
         self.player_proc.start()
+        # Render requests (one per drag event) are coalesced to one player frame per tick
+        self.player_view = PlayerViewScheduler(self.render_and_update_player_view)
 
         # 5. INITIALIZE MANAGERS
         log(LOG_DEBUG, "Loading core engine managers...")
@@ -313,7 +353,7 @@ class CodexApp:
             result = self.map_viewer.handle_input(event)
             if result:
                 if result.get("action") == "update_player_view":
-                    self.render_and_update_player_view()
+                    self.player_view.request()
                     return
 
                 if result.get("action") == "enter_marker":
@@ -330,7 +370,7 @@ class CodexApp:
                         if new_state: self.render_and_update_player_view()
                         else:
                             print (f" *** *** Reverting") 
-                            self.image_queue.put("REVERT")
+                            self.frames.send("REVERT")
                         return
                     '''
 
@@ -542,6 +582,13 @@ class CodexApp:
     def render_and_update_player_view(self):
         log(LOG_INFO, "ENTER: render_and_update_player_view")
         if self.map_viewer and self.map_viewer.controller:
+            controller = self.map_viewer.controller
+            if self.scene_mode and controller.renders_player_scene:
+                # The player window renders the view itself; only what changed is sent
+                delta = self.frames.send_scene(controller)
+                if delta: log(LOG_DEBUG, f"Shipping player scene delta: {sorted(delta)}")
+                return
+
             # The controller returns None if no active view marker is found
             player_surface = self.map_viewer.controller.render_player_view_surface()
             
@@ -551,7 +598,14 @@ class CodexApp:
             else:
                 # --- FIX: Explicitly revert if the view is disabled ---
                 log(LOG_DEBUG, "No active view found. Reverting player display to standby.")
-                self.image_queue.put("REVERT")
+                self.frames.send("REVERT")
+
+    def _apply_player_replies(self):
+        """Fog of war revealed by a player window that renders from scene state goes back to the controller that saves it."""
+        controller = self.map_viewer.controller if self.map_viewer else None
+        for kind, node_id, data in self.frames.poll_replies():
+            if kind == "EXPLORED" and controller and controller.node['id'] == node_id and hasattr(controller, 'merge_explored'):
+                controller.merge_explored(data)
 
     def display_loading_screen(self, msg="Processing..."):
         log(LOG_INFO, f"ENTER: display_loading_screen (Msg: {msg})")
@@ -570,7 +624,7 @@ class CodexApp:
             ip = s.getsockname()[0]
         except: ip = '127.0.0.1'
         finally: s.close()
-        url = f"http={ip}:{port}"
+        url = f"http://{ip}:{port}/player.html" # Live player view in the browser
         log(LOG_DEBUG, f"Lobby URL: {url}")
 
         # 2. Load Artwork
@@ -598,8 +652,7 @@ class CodexApp:
     def update_player_image(self, surface):
         if not self.player_proc.is_alive(): 
             return
-        img_str = pygame.image.tobytes(surface, 'RGB')
-        self.image_queue.put((img_str, surface.get_size()))
+        self.frames.send_surface(surface)
 
     def run(self):
         log(LOG_INFO, "ENTER: CodexApp.run (Starting Main Loop)")
@@ -618,6 +671,9 @@ class CodexApp:
                 if self.state == "MENU": self._handle_menu_input(event)
                 elif self.state == "GAME_WORLD": self._handle_game_input(event)
 
+            self.player_view.tick()
+            self._apply_player_replies()
+
             if self.state == "MENU": self.menu_screen.draw()
             elif self.state == "GAME_WORLD" and self.map_viewer: self.map_viewer.draw()
             
@@ -626,10 +682,14 @@ class CodexApp:
 
         # Cleanup Phase
         log(LOG_DEBUG, "App shutdown initiated. Saving state...")
-        if self.map_viewer: self.map_viewer.save_current_state()
-        self.image_queue.put("QUIT")
+        log(LOG_DEBUG, f"Player view frames: {self.player_view.stats()}")
+        self.frames.send("QUIT")
         self.player_proc.join(timeout=1)
+        self._apply_player_replies()
+        if self.map_viewer: self.map_viewer.save_current_state()
+        self.frames.close()
         self.server_proc.terminate()
+        self.stream.close()
         pygame.quit()
         log(LOG_INFO, "EXIT: CodexApp.run (Application Terminated)")
 
@@ -2,11 +2,18 @@ import pygame
 import random
 import math
 import time
-import heapq
 import os
 import re
+import sys
 import google.generativeai as genai
 
+# Shared engine utilities live in the CodexProject package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "CodexProject"))
+from codex_engine.utils.pathfinding import CorridorRouter
+from codex_engine.ui.renderers.hand_drawn import HandDrawnLines
+from codex_engine.utils.wall_edges import extract_walls
+from codex_engine.ui.renderers.parchment import fill_parchment
+
 # --- API CONFIGURATION ---
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
@@ -29,6 +36,7 @@ ADJACENCY_PENALTY = 10
 COLOR_PARCHMENT = (245, 235, 215)
 COLOR_INK = (40, 30, 20)
 COLOR_GRID = (220, 210, 190)
+PARCHMENT_NOISE_DENSITY = 0.0065 # Fraction of background pixels darkened as paper texture
 LINE_THICKNESS = 3
 HATCH_SPACING = 12
 
@@ -41,33 +49,7 @@ class Room:
     def intersects(self, other_room):
         return self.rect.colliderect(other_room.rect.inflate(ROOM_PADDING * 2, ROOM_PADDING * 2))
 
-class AStarNode:
-    def __init__(self, parent=None, position=None, direction=(0,0)):
-        self.parent, self.position, self.direction = parent, position, direction
-        self.g, self.h, self.f = 0, 0, 0
-    def __eq__(self, other): return self.position == other.position
-    def __lt__(self, other): return self.f < other.f
-    def __hash__(self): return hash(self.position)
-
 # --- Helper Functions ---
-def draw_hand_drawn_line(surface, start_pos, end_pos, color, thickness=1, wobble=2):
-    distance = math.hypot(end_pos[0] - start_pos[0], end_pos[1] - start_pos[1])
-    if distance == 0: return
-    segments = max(2, int(distance / 10))
-    points = []
-    for i in range(segments + 1):
-        t = i / segments
-        x = start_pos[0] * (1 - t) + end_pos[0] * t
-        y = start_pos[1] * (1 - t) + end_pos[1] * t
-        if 0 < i < segments:
-            angle = math.atan2(end_pos[1] - start_pos[1], end_pos[0] - start_pos[0]) + math.pi / 2
-            x += random.uniform(-wobble, wobble) * math.cos(angle)
-            y += random.uniform(-wobble, wobble) * math.sin(angle)
-        points.append((x, y))
-    for _ in range(thickness):
-        stroke_points = [(p[0] + random.uniform(-wobble/2, wobble/2), p[1] + random.uniform(-wobble/2, wobble/2)) for p in points]
-        pygame.draw.aalines(surface, color, False, stroke_points)
-
 def get_sanitized_filename(topic):
     clean = re.sub(r'[^\w\s-]', '', topic).strip().replace(' ', '_')
     timestamp = time.strftime('%Y%m%d_%H%M%S')
@@ -202,35 +184,6 @@ def generate_rooms():
         if not any(new_room.intersects(other) for other in rooms): rooms.append(new_room)
     return rooms
 
-def find_path_a_star(grid, start, end):
-    start_node = AStarNode(None, start)
-    open_list, closed_set = [start_node], set()
-    while open_list:
-        current_node = heapq.heappop(open_list)
-        if current_node.position in closed_set: continue
-        closed_set.add(current_node.position)
-        if current_node.position == end:
-            path = []
-            while current_node: path.append(current_node.position); current_node = current_node.parent
-            return path[::-1]
-        (x, y) = current_node.position
-        for dx, dy in [(0,-1), (0,1), (-1,0), (1,0)]:
-            node_pos = (x + dx, y + dy)
-            if not (0 <= node_pos[0] < GRID_WIDTH and 0 <= node_pos[1] < GRID_HEIGHT): continue
-            movement_cost, turn_cost, adjacency_cost = 1, 0, 0
-            if grid[node_pos[1]][node_pos[0]] == 1: movement_cost += 50
-            if current_node.parent and (dx, dy) != current_node.direction: turn_cost = TURN_PENALTY
-            for ax, ay in [(0,-1), (0,1), (-1,0), (1,0)]:
-                check_pos = (node_pos[0] + ax, node_pos[1] + ay)
-                if (0 <= check_pos[0] < GRID_WIDTH and 0 <= check_pos[1] < GRID_HEIGHT and grid[check_pos[1]][check_pos[0]] == 1):
-                    adjacency_cost = ADJACENCY_PENALTY; break
-            new_node = AStarNode(current_node, node_pos, (dx, dy))
-            new_node.g = current_node.g + movement_cost + turn_cost + adjacency_cost
-            new_node.h = abs(node_pos[0] - end[0]) + abs(node_pos[1] - end[1])
-            new_node.f = new_node.g + new_node.h
-            heapq.heappush(open_list, new_node)
-    return None
-
 def route_corridors(grid, rooms):
     if len(rooms) < 2: return
     room_map = {r.id: r for r in rooms}
@@ -251,6 +204,7 @@ def route_corridors(grid, rooms):
     potential_loops = [(room_map[r1_id], room_map[r2_id]) for _, r1_id, r2_id in edges if tuple(sorted((r1_id, r2_id))) not in mst_pairs]
     random.shuffle(potential_loops)
     connections.extend(potential_loops[:random.randint(1, min(3, len(potential_loops)))])
+    router = CorridorRouter(grid, room_cost=50, adjacency_penalty=ADJACENCY_PENALTY, turn_penalty=TURN_PENALTY)
     for room1, room2 in connections:
         c1_x, c1_y = room1.center; c2_x, c2_y = room2.center
         if abs(c1_x - c2_x) > abs(c1_y - c2_y):
@@ -259,18 +213,14 @@ def route_corridors(grid, rooms):
         else:
             r_top, r_bot = (room1, room2) if c1_y < c2_y else (room2, room1)
             start_pos, end_pos = (r_top.rect.centerx, r_top.rect.bottom), (r_bot.rect.centerx, r_bot.rect.top - 1)
-        path = find_path_a_star(grid, start_pos, end_pos)
+        path = router.find_path(start_pos, end_pos)
         if path:
             for pos in path:
                 if grid[pos[1]][pos[0]] == 0: grid[pos[1]][pos[0]] = 2
 
 def render_dungeon(grid, rooms, font):
     surface = pygame.Surface((MAP_WIDTH_PX, MAP_HEIGHT_PX))
-    surface.fill(COLOR_PARCHMENT)
-    for _ in range(7000):
-        x, y = random.randint(0, MAP_WIDTH_PX - 1), random.randint(0, MAP_HEIGHT_PX - 1)
-        c = random.randint(10, 20)
-        surface.set_at((x, y), tuple(max(0, val - c) for val in COLOR_PARCHMENT))
+    fill_parchment(surface, COLOR_PARCHMENT, density=PARCHMENT_NOISE_DENSITY)
     for room in rooms:
         pixel_rect = pygame.Rect(room.rect.x * CELL_SIZE, room.rect.y * CELL_SIZE, room.rect.width * CELL_SIZE, room.rect.height * CELL_SIZE)
         for i in range(pixel_rect.left - pixel_rect.height, pixel_rect.right, HATCH_SPACING):
@@ -282,13 +232,10 @@ def render_dungeon(grid, rooms, font):
             if grid[y][x] > 0:
                 rect = pygame.Rect(x * CELL_SIZE, y * CELL_SIZE, CELL_SIZE, CELL_SIZE)
                 pygame.draw.rect(surface, COLOR_GRID, rect, 1)
-    for y in range(GRID_HEIGHT):
-        for x in range(GRID_WIDTH):
-            if grid[y][x] == 0: continue
-            if y == 0 or grid[y - 1][x] == 0: draw_hand_drawn_line(surface, (x*CELL_SIZE, y*CELL_SIZE), ((x+1)*CELL_SIZE, y*CELL_SIZE), COLOR_INK, LINE_THICKNESS)
-            if y == GRID_HEIGHT - 1 or grid[y + 1][x] == 0: draw_hand_drawn_line(surface, (x*CELL_SIZE, (y+1)*CELL_SIZE), ((x+1)*CELL_SIZE, (y+1)*CELL_SIZE), COLOR_INK, LINE_THICKNESS)
-            if x == 0 or grid[y][x - 1] == 0: draw_hand_drawn_line(surface, (x*CELL_SIZE, y*CELL_SIZE), (x*CELL_SIZE, (y+1)*CELL_SIZE), COLOR_INK, LINE_THICKNESS)
-            if x == GRID_WIDTH - 1 or grid[y][x + 1] == 0: draw_hand_drawn_line(surface, ((x+1)*CELL_SIZE, y*CELL_SIZE), ((x+1)*CELL_SIZE, (y+1)*CELL_SIZE), COLOR_INK, LINE_THICKNESS)
+    # Merged walls keyed by grid edge and drawn in one batch; a fresh seed per render gives each dungeon its own ink
+    strokes = HandDrawnLines(seed=random.randrange(2**31))
+    walls = [(edge, (edge[0]*CELL_SIZE, edge[1]*CELL_SIZE), (edge[2]*CELL_SIZE, edge[3]*CELL_SIZE)) for edge in extract_walls(grid)]
+    strokes.draw(surface, COLOR_INK, walls, LINE_THICKNESS)
     
     for i, room in enumerate(rooms):
         number_text = str(i + 1)
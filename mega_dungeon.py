@@ -2,11 +2,23 @@ import pygame
 import random
 import math
 import time
-import heapq
 import os
 import re
+import sys
+from collections import OrderedDict
+import numpy as np
 import google.generativeai as genai
 
+# Shared engine utilities live in the CodexProject package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "CodexProject"))
+from codex_engine.utils.pathfinding import CorridorRouter
+from codex_engine.utils.room_graph import candidate_edges
+from codex_engine.generators.chunked_dungeon import ChunkedDungeonWorld
+from codex_engine.ui.renderers.hand_drawn import HandDrawnLines
+from codex_engine.utils.wall_edges import extract_walls
+from codex_engine.ui.renderers.parchment import fill_parchment
+from codex_engine.utils.tiled_export import export_tiled, aligned_tile_px
+
 # --- API CONFIGURATION ---
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
@@ -24,6 +36,16 @@ DEFAULT_CELL_SIZE = 15
 WORLD_WIDTH = 150
 WORLD_HEIGHT = 150
 
+# ZOOM LIMITS (cell size in pixels)
+MIN_CELL_SIZE = 5
+MAX_CELL_SIZE = 40
+
+# INFINITE MODE (run with --infinite [--seed N]): the world is streamed in chunks around the camera.
+# The world's seed is kept in CHUNK_SAVE_DIR, so later runs reopen it; R starts a new one.
+CHUNK_SIZE = 64
+CHUNK_SAVE_DIR = "megadungeon_chunks"
+MINIMAP_SPAN = 150 # Cells shown by the minimap around the camera
+
 # GENERATION SETTINGS
 MIN_ROOMS = 50
 MAX_ROOMS = 90
@@ -33,51 +55,47 @@ ROOM_PADDING = 3
 CORRIDOR_WIDTH = 1
 TURN_PENALTY = 5
 ADJACENCY_PENALTY = 20 
+CORRIDOR_REUSE_COST = 0.5
+ROUTING_MODE = "flow_field" # "flow_field" (one Dijkstra per source room) or "astar" (one search per edge)
 
 # AESTHETICS
 COLOR_PARCHMENT = (245, 235, 215)
 COLOR_INK = (40, 30, 20)
 COLOR_GRID = (220, 210, 190)
+PARCHMENT_NOISE_DENSITY = 0.005 # Fraction of background pixels darkened as paper texture
 LINE_THICKNESS = 3
 HATCH_SPACING = 12
 
+# Wall wobble is cached per grid edge so walls stay put while scrolling; reseeded per world
+WALL_STROKES = HandDrawnLines()
+WALL_RUN_ALIGN = 16 # Merged walls are cut at world multiples of this, so pieces match across streamed windows
+_wall_cache = (None, None, [], None) # (grid, world_offset, walls, walls as array) for the grid used last
+
+# VIEWPORT CACHE: the map is drawn as world-aligned tiles, cached per zoom level
+VIEW_TILE_PX = 256 # Target tile size; tiles are a whole number of wall runs wide
+VIEW_CACHE_MAX_PIXELS = 16 * WIN_WIDTH_PX * WIN_HEIGHT_PX # ~16 screens of tiles (~70 MB)
+COLOR_HATCH = (225, 215, 195)
+MINIMAP_SCALE = 2
+EXPORT_CELL_PX = 30 # Sketch map export resolution; 150 cells -> 4500 px
+EXPORT_DPI = 150    # Print resolution stored in the exported file (0.2" per cell)
+MINIMAP_PALETTE = np.array([(200, 190, 170), (100, 80, 60), (150, 140, 130)], dtype=np.uint8) # Rock, room, corridor
+
+_fonts = {} # size -> Font
+_minimap_cache = (None, None) # (grid, surface) for the grid drawn last
+_infinite_minimap = [None, None] # [(world id, x, y), grid] of the last minimap window
+
 # --- Data Structures ---
 class Room:
-    def __init__(self, x, y, width, height, id):
+    def __init__(self, x, y, width, height, id, label=None):
         self.id = id
+        self.label = label if label is not None else str(id + 1) # Infinite mode uses chunk-qualified labels
         self.rect = pygame.Rect(x, y, width, height)
         self.center = self.rect.center
 
     def intersects(self, other_room):
         return self.rect.colliderect(other_room.rect.inflate(ROOM_PADDING * 2, ROOM_PADDING * 2))
 
-class AStarNode:
-    def __init__(self, parent=None, position=None, direction=(0,0)):
-        self.parent, self.position, self.direction = parent, position, direction
-        self.g, self.h, self.f = 0, 0, 0
-    def __eq__(self, other): return self.position == other.position
-    def __lt__(self, other): return self.f < other.f
-    def __hash__(self): return hash(self.position)
-
 # --- Helper Functions ---
-def draw_hand_drawn_line(surface, start_pos, end_pos, color, thickness=1, wobble=2):
-    distance = math.hypot(end_pos[0] - start_pos[0], end_pos[1] - start_pos[1])
-    if distance == 0: return
-    segments = max(2, int(distance / 10))
-    points = []
-    for i in range(segments + 1):
-        t = i / segments
-        x = start_pos[0] * (1 - t) + end_pos[0] * t
-        y = start_pos[1] * (1 - t) + end_pos[1] * t
-        if 0 < i < segments:
-            angle = math.atan2(end_pos[1] - start_pos[1], end_pos[0] - start_pos[0]) + math.pi / 2
-            x += random.uniform(-wobble, wobble) * math.cos(angle)
-            y += random.uniform(-wobble, wobble) * math.sin(angle)
-        points.append((x, y))
-    for _ in range(thickness):
-        stroke_points = [(p[0] + random.uniform(-wobble/2, wobble/2), p[1] + random.uniform(-wobble/2, wobble/2)) for p in points]
-        pygame.draw.aalines(surface, color, False, stroke_points)
-
 def get_sanitized_filename(topic):
     clean = re.sub(r'[^\w\s-]', '', topic).strip().replace(' ', '_')
     timestamp = time.strftime('%Y%m%d_%H%M%S')
@@ -155,7 +173,7 @@ def create_adventure_with_gemini(visible_rooms, topic, surface, camera_pos):
         map_desc += f"Visible Rooms: {len(visible_rooms)}\n"
         for r in visible_rooms:
             width_ft, height_ft = r.rect.width * 5, r.rect.height * 5
-            map_desc += f"- Room ID {r.id+1}: {width_ft}x{height_ft}ft\n"
+            map_desc += f"- Room ID {r.label}: {width_ft}x{height_ft}ft\n"
 
         prompt = f"""
         Role: TTRPG Adventure Designer.
@@ -197,6 +215,8 @@ def generate_world_data():
     rooms = []
     attempts = 15000 
     
+    padded_rects = [] # Inflated copies of placed rooms, tested in one C-level collidelist call
+    
     for _ in range(attempts):
         if len(rooms) >= MAX_ROOMS: break
         w = random.randint(MIN_ROOM_SIZE, MAX_ROOM_SIZE)
@@ -204,11 +224,12 @@ def generate_world_data():
         x = random.randint(2, WORLD_WIDTH - w - 2)
         y = random.randint(2, WORLD_HEIGHT - h - 2)
         new_room = Room(x, y, w, h, len(rooms))
-        if not any(new_room.intersects(other) for other in rooms):
+        if new_room.rect.collidelist(padded_rects) == -1:
             rooms.append(new_room)
+            padded_rects.append(new_room.rect.inflate(ROOM_PADDING * 2, ROOM_PADDING * 2))
     
     rooms.sort(key=lambda r: (r.rect.y, r.rect.x))
-    for i, r in enumerate(rooms): r.id = i
+    for i, r in enumerate(rooms): r.id, r.label = i, str(i + 1)
     
     for r in rooms:
         for ry in range(r.rect.height):
@@ -222,19 +243,17 @@ def generate_world_data():
 
 def route_corridors(grid, rooms):
     room_map = {r.id: r for r in rooms}
-    edges = []
-    for i, r1 in enumerate(rooms):
-        for j in range(i + 1, len(rooms)):
-            r2 = rooms[j]
-            dist = math.hypot(r1.center[0] - r2.center[0], r1.center[1] - r2.center[1])
-            edges.append((dist, r1.id, r2.id))
-    
-    edges.sort()
+    # Sparse Delaunay candidates instead of all O(n^2) pairs; the MST is unchanged
+    index_edges = candidate_edges([r.center for r in rooms])
+    edges = [(dist, rooms[i].id, rooms[j].id) for dist, i, j in index_edges]
+
     connections, mst_pairs = [], set()
     parent = {r.id: r.id for r in rooms}
     def find(id):
-        if parent[id] == id: return id
-        parent[id] = find(parent[id]); return parent[id]
+        root = id
+        while parent[root] != root: root = parent[root]
+        while parent[id] != root: parent[id], id = root, parent[id]
+        return root
     def union(id1, id2):
         r1, r2 = find(id1), find(id2)
         if r1 != r2: parent[r1] = r2; return True
@@ -248,14 +267,40 @@ def route_corridors(grid, rooms):
     random.shuffle(extra_edges)
     connections.extend([(room_map[e[1]], room_map[e[2]]) for e in extra_edges[:len(rooms)//4]])
 
+    router = CorridorRouter(grid, room_cost=100, adjacency_penalty=ADJACENCY_PENALTY, turn_penalty=TURN_PENALTY, corridor_cost=CORRIDOR_REUSE_COST)
+    if ROUTING_MODE == "flow_field":
+        route_connections_flow_field(grid, router, connections)
+        return
+
     for r1, r2 in connections:
         start_pos, end_pos = r1.center, r2.center
-        path = find_path_a_star(grid, start_pos, end_pos)
-        if path:
-            for p in path:
-                if grid[p[1]][p[0]] == 0: grid[p[1]][p[0]] = 2
-        else:
-            force_corridor_l_shape(grid, start_pos, end_pos)
+        carve_path(grid, router, router.find_path(start_pos, end_pos), start_pos, end_pos)
+
+def route_connections_flow_field(grid, router, connections):
+    """Groups edges by a shared source room and routes each group from one Dijkstra flow field."""
+    degree = {}
+    for r1, r2 in connections:
+        degree[r1.id] = degree.get(r1.id, 0) + 1
+        degree[r2.id] = degree.get(r2.id, 0) + 1
+
+    # Hub rooms become sources so as many edges as possible share a field
+    groups = {}
+    for r1, r2 in connections:
+        src, dst = (r1, r2) if degree[r1.id] >= degree[r2.id] else (r2, r1)
+        groups.setdefault(src.id, (src, []))[1].append(dst)
+
+    for src, targets in groups.values():
+        paths = router.find_paths(src.center, [t.center for t in targets])
+        for t in targets:
+            carve_path(grid, router, paths[t.center], src.center, t.center)
+
+def carve_path(grid, router, path, start_pos, end_pos):
+    if path:
+        for p in path:
+            if grid[p[1]][p[0]] == 0: grid[p[1]][p[0]] = 2
+        router.carve(path)
+    else:
+        force_corridor_l_shape(grid, start_pos, end_pos)
 
 def force_corridor_l_shape(grid, start, end):
     x, y = start
@@ -269,167 +314,219 @@ def force_corridor_l_shape(grid, start, end):
         if 0 <= x < WORLD_WIDTH and 0 <= y < WORLD_HEIGHT and grid[y][x] == 0: grid[y][x] = 2
         y += step_y
 
-def find_path_a_star(grid, start, end):
-    start_node = AStarNode(None, start)
-    open_list, closed_set = [start_node], set()
-    iterations = 0
-    max_iter = 10000 
-    while open_list:
-        iterations += 1
-        if iterations > max_iter: return None 
-        current = heapq.heappop(open_list)
-        if current.position in closed_set: continue
-        closed_set.add(current.position)
-        if current.position == end:
-            path = []
-            while current: path.append(current.position); current = current.parent
-            return path[::-1]
-        (x, y) = current.position
-        for dx, dy in [(0,-1), (0,1), (-1,0), (1,0)]:
-            nx, ny = x + dx, y + dy
-            if not (0 <= nx < WORLD_WIDTH and 0 <= ny < WORLD_HEIGHT): continue
-            cost = 1
-            if grid[ny][nx] == 1: cost += 100 
-            if current.parent and (dx, dy) != current.direction: cost += TURN_PENALTY
-            adj = 0
-            for ax, ay in [(0,-1),(0,1),(-1,0),(1,0)]:
-                cx, cy = nx+ax, ny+ay
-                if 0 <= cx < WORLD_WIDTH and 0 <= cy < WORLD_HEIGHT and grid[cy][cx] == 1:
-                    adj = ADJACENCY_PENALTY; break
-            new_node = AStarNode(current, (nx, ny), (dx, dy))
-            new_node.g = current.g + cost + adj
-            new_node.h = abs(nx - end[0]) + abs(ny - end[1])
-            new_node.f = new_node.g + new_node.h
-            heapq.heappush(open_list, new_node)
-    return None
-
 # --- RENDERERS ---
 
-def render_viewport(grid, rooms, camera_x, camera_y, current_cell_size):
-    """Renders the screen view with dynamic cell size."""
-    surface = pygame.Surface((WIN_WIDTH_PX, WIN_HEIGHT_PX))
-    surface.fill(COLOR_PARCHMENT)
-    
-    # Calculate visible area in cells
-    view_width = WIN_WIDTH_PX // current_cell_size
-    view_height = WIN_HEIGHT_PX // current_cell_size
-    
-    # Dynamic font size
-    font_nums = pygame.font.Font(None, int(current_cell_size * 1.5))
-
-    for _ in range(5000):
-        x, y = random.randint(0, WIN_WIDTH_PX-1), random.randint(0, WIN_HEIGHT_PX-1)
-        c = random.randint(10, 20)
-        surface.set_at((x, y), tuple(max(0, val - c) for val in COLOR_PARCHMENT))
-
-    start_x = max(0, camera_x)
-    end_x = min(WORLD_WIDTH, camera_x + view_width + 1)
-    start_y = max(0, camera_y)
-    end_y = min(WORLD_HEIGHT, camera_y + view_height + 1)
-    
-    visible_rooms = []
-    
-    # Hatching
+def get_font(size):
+    font = _fonts.get(size)
+    if font is None:
+        font = _fonts[size] = pygame.font.Font(None, size)
+    return font
+
+def grid_walls(grid, world_offset=(0, 0)):
+    """Merged wall segments in world cell-corner coords; the last grid's result is reused while scrolling."""
+    global _wall_cache
+    if _wall_cache[0] is grid and _wall_cache[1] == world_offset: return _wall_cache[2]
+    walls = extract_walls(grid, origin=world_offset, max_run=WALL_RUN_ALIGN)
+    _wall_cache = (grid, world_offset, walls, np.array(walls, dtype=np.int64).reshape(-1, 4))
+    return walls
+
+def walls_near(grid, world_offset, x0, y0, x1, y1):
+    """Merged walls touching the world cell rectangle [x0, x1] x [y0, y1]."""
+    walls = grid_walls(grid, world_offset)
+    wa = _wall_cache[3]
+    near = (wa[:, 0] <= x1) & (wa[:, 2] >= x0) & (wa[:, 1] <= y1) & (wa[:, 3] >= y0)
+    return [walls[i] for i in np.flatnonzero(near)]
+
+def view_tile_cells(cell_size):
+    return WALL_RUN_ALIGN * max(1, VIEW_TILE_PX // (WALL_RUN_ALIGN * cell_size))
+
+def render_map_tile(grid, rooms, world_offset, x0, y0, cells, cell_size):
+    """
+    Renders world cells [x0, x0 + cells) x [y0, y0 + cells) to a new surface.
+    grid and rooms are in grid-local coords whose cell (0, 0) is world cell world_offset.
+    Everything is positioned in world coords and clipped to the tile, so neighbouring
+    tiles join up seamlessly.
+    """
+    cs = cell_size
+    ox, oy = world_offset
+    surface = pygame.Surface((cells * cs, cells * cs))
+    # Paper texture is pinned to world cell (0, 0)
+    fill_parchment(surface, COLOR_PARCHMENT, density=PARCHMENT_NOISE_DENSITY, origin=(-x0 * cs, -y0 * cs))
+    tile_rect = surface.get_rect()
+    px, py = (ox - x0) * cs, (oy - y0) * cs # Pixel position of grid cell (0, 0) on this tile
+
+    # Hatching, anchored to each room
+    font_nums = get_font(int(cs * 1.5))
+    labels = []
     for r in rooms:
-        if r.rect.right > start_x and r.rect.left < end_x and r.rect.bottom > start_y and r.rect.top < end_y:
-            visible_rooms.append(r)
-            screen_rect = pygame.Rect((r.rect.x - camera_x) * current_cell_size, (r.rect.y - camera_y) * current_cell_size, r.rect.width * current_cell_size, r.rect.height * current_cell_size)
-            screen_rect = screen_rect.clip(pygame.Rect(0, 0, WIN_WIDTH_PX, WIN_HEIGHT_PX))
-            if screen_rect.width > 0 and screen_rect.height > 0:
-                for i in range(screen_rect.left - screen_rect.height, screen_rect.right, HATCH_SPACING):
-                    start_pos = (i, screen_rect.top)
-                    end_pos = (i + screen_rect.height, screen_rect.bottom)
-                    clipped = screen_rect.clipline(start_pos, end_pos)
-                    if clipped: pygame.draw.aaline(surface, (225, 215, 195), clipped[0], clipped[1])
-
-    # Grid & Walls
-    for y in range(start_y, end_y):
-        for x in range(start_x, end_x):
-            if grid[y][x] > 0:
-                sx, sy = (x - camera_x) * current_cell_size, (y - camera_y) * current_cell_size
-                pygame.draw.rect(surface, COLOR_GRID, (sx, sy, current_cell_size, current_cell_size), 1)
-            
-            if grid[y][x] != 0:
-                sx, sy = (x - camera_x) * current_cell_size, (y - camera_y) * current_cell_size
-                if y == 0 or grid[y-1][x] == 0: draw_hand_drawn_line(surface, (sx, sy), (sx+current_cell_size, sy), COLOR_INK, LINE_THICKNESS)
-                if y == WORLD_HEIGHT-1 or grid[y+1][x] == 0: draw_hand_drawn_line(surface, (sx, sy+current_cell_size), (sx+current_cell_size, sy+current_cell_size), COLOR_INK, LINE_THICKNESS)
-                if x == 0 or grid[y][x-1] == 0: draw_hand_drawn_line(surface, (sx, sy), (sx, sy+current_cell_size), COLOR_INK, LINE_THICKNESS)
-                if x == WORLD_WIDTH-1 or grid[y][x+1] == 0: draw_hand_drawn_line(surface, (sx+current_cell_size, sy), (sx+current_cell_size, sy+current_cell_size), COLOR_INK, LINE_THICKNESS)
+        room_rect = pygame.Rect(px + r.rect.x * cs, py + r.rect.y * cs, r.rect.width * cs, r.rect.height * cs)
+        label_pos = (room_rect.x + cs // 3, room_rect.y + cs // 3)
+        if tile_rect.colliderect((label_pos, font_nums.size(r.label))): labels.append((r.label, label_pos))
+        if not tile_rect.colliderect(room_rect): continue
+        for i in range(room_rect.left - room_rect.height, room_rect.right, HATCH_SPACING):
+            if i + room_rect.height < 0 or i > tile_rect.right: continue
+            clipped = room_rect.clipline((i, room_rect.top), (i + room_rect.height, room_rect.bottom))
+            if clipped: pygame.draw.aaline(surface, COLOR_HATCH, clipped[0], clipped[1])
+
+    # Grid
+    grid_h, grid_w = len(grid), len(grid[0])
+    for y in range(max(0, y0 - oy), min(grid_h, y0 - oy + cells)):
+        row = grid[y]
+        for x in range(max(0, x0 - ox), min(grid_w, x0 - ox + cells)):
+            if row[x] > 0:
+                pygame.draw.rect(surface, COLOR_GRID, (px + x * cs, py + y * cs, cs, cs), 1)
+
+    # Walls: merged segments keyed by world grid edge, drawn in one batch
+    walls = [((wx0, wy0, wx1, wy1), ((wx0 - x0) * cs, (wy0 - y0) * cs), ((wx1 - x0) * cs, (wy1 - y0) * cs))
+             for wx0, wy0, wx1, wy1 in walls_near(grid, world_offset, x0 - 1, y0 - 1, x0 + cells + 1, y0 + cells + 1)]
+    WALL_STROKES.draw(surface, COLOR_INK, walls, LINE_THICKNESS)
 
     # Room Numbers
-    for r in visible_rooms:
-        number_text = str(r.id + 1)
-        text_surface = font_nums.render(number_text, True, COLOR_INK, COLOR_PARCHMENT)
-        sx = (r.rect.x - camera_x) * current_cell_size + (current_cell_size//3)
-        sy = (r.rect.y - camera_y) * current_cell_size + (current_cell_size//3)
-        if -50 < sx < WIN_WIDTH_PX and -50 < sy < WIN_HEIGHT_PX:
-            surface.blit(text_surface, (sx, sy))
-            
-    return surface, visible_rooms
-
-def render_full_map_high_res(grid, rooms):
-    """Renders the entire world at high resolution (fixed cell size for consistency), then scales down."""
-    cell_size = 15 # Fixed size for rendering high res map
-    full_w = WORLD_WIDTH * cell_size
-    full_h = WORLD_HEIGHT * cell_size
-    print(f"Creating High-Res Surface: {full_w}x{full_h}px...")
-    
-    surf = pygame.Surface((full_w, full_h))
-    surf.fill(COLOR_PARCHMENT)
-    
-    # 1. Hatching
-    for r in rooms:
-        pixel_rect = pygame.Rect(r.rect.x * cell_size, r.rect.y * cell_size, r.rect.width * cell_size, r.rect.height * cell_size)
-        for i in range(pixel_rect.left - pixel_rect.height, pixel_rect.right, HATCH_SPACING):
-            start_pos = (i, pixel_rect.top)
-            end_pos = (i + pixel_rect.height, pixel_rect.bottom)
-            clipped = pixel_rect.clipline(start_pos, end_pos)
-            if clipped: pygame.draw.aaline(surf, (225, 215, 195), clipped[0], clipped[1])
-
-    # 2. Grid & Walls
-    for y in range(WORLD_HEIGHT):
-        for x in range(WORLD_WIDTH):
-            if grid[y][x] > 0:
-                sx, sy = x * cell_size, y * cell_size
-                pygame.draw.rect(surf, COLOR_GRID, (sx, sy, cell_size, cell_size), 1)
-            
-            if grid[y][x] != 0:
-                sx, sy = x * cell_size, y * cell_size
-                if y == 0 or grid[y-1][x] == 0: draw_hand_drawn_line(surf, (sx, sy), (sx+cell_size, sy), COLOR_INK, LINE_THICKNESS)
-                if y == WORLD_HEIGHT-1 or grid[y+1][x] == 0: draw_hand_drawn_line(surf, (sx, sy+cell_size), (sx+cell_size, sy+cell_size), COLOR_INK, LINE_THICKNESS)
-                if x == 0 or grid[y][x-1] == 0: draw_hand_drawn_line(surf, (sx, sy), (sx, sy+cell_size), COLOR_INK, LINE_THICKNESS)
-                if x == WORLD_WIDTH-1 or grid[y][x+1] == 0: draw_hand_drawn_line(surf, (sx+cell_size, sy), (sx+cell_size, sy+cell_size), COLOR_INK, LINE_THICKNESS)
-    
-    # 3. MASSIVE NUMBERS
-    huge_font = pygame.font.Font(None, 45)
-    for r in rooms:
-        number_text = str(r.id + 1)
-        text_surface = huge_font.render(number_text, True, COLOR_INK, COLOR_PARCHMENT)
-        sx = r.rect.x * cell_size + 15
-        sy = r.rect.y * cell_size + 15
-        surf.blit(text_surface, (sx, sy))
+    for label, pos in labels:
+        surface.blit(font_nums.render(label, True, COLOR_INK, COLOR_PARCHMENT), pos)
+    return surface
+
+class ViewportCache:
+    """
+    LRU of rendered map tiles keyed by (cell_size, tile_x, tile_y). A frame is a handful
+    of tile blits at the camera offset; only tiles scrolling into view (or every visible
+    tile, once, after a zoom change) are rendered. Tiles of earlier zoom levels stay
+    cached until the pixel budget evicts them.
+    """
+    def __init__(self, max_pixels=VIEW_CACHE_MAX_PIXELS):
+        self.max_pixels = max_pixels
+        self.tiles = OrderedDict()
+        self.pixels = 0
+
+    def clear(self):
+        self.tiles.clear()
+        self.pixels = 0
+
+    def get_tile(self, tile_source, tx, ty, cell_size):
+        key = (cell_size, tx, ty)
+        tile = self.tiles.get(key)
+        if tile is not None:
+            self.tiles.move_to_end(key)
+            return tile
+        cells = view_tile_cells(cell_size)
+        grid, rooms, world_offset = tile_source(tx * cells, ty * cells, cells)
+        tile = self.tiles[key] = render_map_tile(grid, rooms, world_offset, tx * cells, ty * cells, cells, cell_size)
+        self.pixels += tile.get_width() * tile.get_height()
+        while self.pixels > self.max_pixels and len(self.tiles) > 1:
+            _, old = self.tiles.popitem(last=False)
+            self.pixels -= old.get_width() * old.get_height()
+        return tile
+
+    def draw(self, surface, tile_source, camera_x, camera_y, cell_size):
+        """Blits the tiles covering the surface, with world cell (camera_x, camera_y) at the top-left."""
+        cells = view_tile_cells(cell_size)
+        tile_px = cells * cell_size
+        w, h = surface.get_size()
+        for ty in range(camera_y // cells, (camera_y * cell_size + h - 1) // tile_px + 1):
+            for tx in range(camera_x // cells, (camera_x * cell_size + w - 1) // tile_px + 1):
+                tile = self.get_tile(tile_source, tx, ty, cell_size)
+                surface.blit(tile, (tx * tile_px - camera_x * cell_size, ty * tile_px - camera_y * cell_size))
+
+def render_viewport(surface, view_cache, tile_source, rooms, camera_x, camera_y, current_cell_size):
+    """
+    Composes the screen view onto surface from cached tiles. camera is in world cells and
+    tile_source(x0, y0, cells) returns (grid, rooms, world_offset) covering a tile.
+    Returns the rooms (world coords) that overlap the view.
+    """
+    view_cache.draw(surface, tile_source, camera_x, camera_y, current_cell_size)
+    view_w = -(-surface.get_width() // current_cell_size)
+    view_h = -(-surface.get_height() // current_cell_size)
+    view_rect = pygame.Rect(camera_x, camera_y, view_w, view_h)
+    return [r for r in rooms if view_rect.colliderect(r.rect)]
+
+def export_full_map(grid, rooms, path):
+    """
+    Writes the whole world at EXPORT_CELL_PX per cell to path (.png or .tif), rendered
+    tile by tile with the viewport's tile renderer and streamed to disk, so memory stays
+    bounded however large the export is.
+    """
+    cs = EXPORT_CELL_PX
+    grid_h, grid_w = len(grid), len(grid[0])
+    tile_px = aligned_tile_px(cs)
+    print(f"Exporting sketch map: {grid_w * cs}x{grid_h * cs}px...")
+
+    def render_tile(rect):
+        tile = render_map_tile(grid, rooms, (0, 0), rect.x // cs, rect.y // cs, tile_px // cs, cs)
+        return tile.subsurface((0, 0), rect.size)
+    return export_tiled(path, grid_w * cs, grid_h * cs, render_tile, tile_px=tile_px, dpi=EXPORT_DPI)
+
+def minimap_base(grid):
+    """Pixel map of a grid without the viewport box, built once per grid with NumPy."""
+    global _minimap_cache
+    if _minimap_cache[0] is grid: return _minimap_cache[1]
+    cells = np.asarray(grid)
+    pixels = MINIMAP_PALETTE[np.where(cells <= 2, cells, 0)]
+    surf = pygame.Surface((cells.shape[1], cells.shape[0]))
+    pygame.surfarray.blit_array(surf, pixels.transpose(1, 0, 2))
+    surf = pygame.transform.scale(surf, (cells.shape[1] * MINIMAP_SCALE, cells.shape[0] * MINIMAP_SCALE))
+    _minimap_cache = (grid, surf)
+    return surf
 
-    print("Scaling down to 1200x1200...")
-    scaled_surf = pygame.transform.smoothscale(surf, (1200, 1200))
-    return scaled_surf
+def minimap_viewport_rect(camera_x, camera_y, view_w, view_h):
+    return pygame.Rect(camera_x * MINIMAP_SCALE, camera_y * MINIMAP_SCALE, view_w * MINIMAP_SCALE, view_h * MINIMAP_SCALE)
 
 def render_minimap(grid, camera_x, camera_y, view_w, view_h, draw_viewport=True):
-    scale = 2 
-    w, h = WORLD_WIDTH * scale, WORLD_HEIGHT * scale
-    surf = pygame.Surface((w, h))
-    surf.fill((200, 190, 170))
-    for y in range(WORLD_HEIGHT):
-        for x in range(WORLD_WIDTH):
-            if grid[y][x] == 1: pygame.draw.rect(surf, (100, 80, 60), (x*scale, y*scale, scale, scale))
-            elif grid[y][x] == 2: pygame.draw.rect(surf, (150, 140, 130), (x*scale, y*scale, scale, scale))
-    
+    surf = minimap_base(grid).copy()
     if draw_viewport:
-        rect = pygame.Rect(camera_x*scale, camera_y*scale, view_w*scale, view_h*scale)
-        pygame.draw.rect(surf, (255, 0, 0), rect, 2)
+        pygame.draw.rect(surf, (255, 0, 0), minimap_viewport_rect(camera_x, camera_y, view_w, view_h), 2)
     return surf
 
+def load_infinite_tile(world, x0, y0, cells):
+    """
+    Tile source for infinite mode: the tile plus one wall run on every side, so every
+    merged wall touching the tile is whole and keeps its key.
+    """
+    a = WALL_RUN_ALIGN
+    grid, room_data = world.window(x0 - a, y0 - a, cells + 2 * a, cells + 2 * a)
+    rooms = [Room(x, y, w, h, i, label) for i, (x, y, w, h, label) in enumerate(room_data)]
+    return grid, rooms, (x0 - a, y0 - a)
+
+def resident_chunks_needed(chunk_size=CHUNK_SIZE):
+    """
+    Most chunks in use at once: the view plus ensure_region's one-chunk margin, together
+    with the minimap window, at the worst zoom and camera alignment. The world's LRU must
+    hold this many or it evicts and reloads chunks every frame.
+    """
+    def axis_chunks(camera, view):
+        lo, hi = camera // chunk_size - 1, (camera + view - 1) // chunk_size + 1
+        mm = (camera + view // 2 - MINIMAP_SPAN // 2) // chunk_size * chunk_size
+        return max(hi, (mm + MINIMAP_SPAN + chunk_size - 1) // chunk_size) - min(lo, mm // chunk_size) + 1
+
+    worst = 0
+    for cell_size in range(MIN_CELL_SIZE, MAX_CELL_SIZE + 1):
+        w = max(axis_chunks(c, WIN_WIDTH_PX // cell_size) for c in range(chunk_size))
+        h = max(axis_chunks(c, WIN_HEIGHT_PX // cell_size) for c in range(chunk_size))
+        worst = max(worst, w * h)
+    return worst
+
+MAX_RESIDENT_CHUNKS = resident_chunks_needed() # 42 for a 1200x900 view at 5px cells
+
+def load_infinite_view(world, camera_x, camera_y, view_w, view_h):
+    """Streams the chunks around the camera and returns the rooms overlapping the view, in world coords."""
+    world.ensure_region(camera_x, camera_y, view_w, view_h)
+    _, room_data = world.window(camera_x, camera_y, view_w + 1, view_h + 1)
+    return [Room(x + camera_x, y + camera_y, w, h, i, label) for i, (x, y, w, h, label) in enumerate(room_data)]
+
+def load_infinite_minimap(world, camera_x, camera_y, view_w, view_h):
+    """
+    Returns (grid, camera_x, camera_y) for a window of at least MINIMAP_SPAN cells around
+    the viewport. The window moves in whole chunks, so the minimap is only rebuilt when it shifts.
+    """
+    size = world.chunk_size
+    mm_x = (camera_x + view_w // 2 - MINIMAP_SPAN // 2) // size * size
+    mm_y = (camera_y + view_h // 2 - MINIMAP_SPAN // 2) // size * size
+    key = (id(world), mm_x, mm_y)
+    if _infinite_minimap[0] != key:
+        _infinite_minimap[:] = [key, world.window(mm_x, mm_y, MINIMAP_SPAN + size, MINIMAP_SPAN + size)[0]]
+    return _infinite_minimap[1], camera_x - mm_x, camera_y - mm_y
+
 # --- Main ---
-def main():
+def main(infinite=False, seed=None):
     pygame.init()
     screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
     pygame.display.set_caption("Megadungeon Generator")
@@ -442,12 +539,22 @@ def main():
 
     camera_x, camera_y = 0, 0
     show_minimap = True
-    view_surface = None
+    view_surface = pygame.Surface((WIN_WIDTH_PX, WIN_HEIGHT_PX))
+    view_cache = ViewportCache()
     visible_rooms = []
     view_dirty = True 
 
-    print("Generating Megadungeon...")
-    world_grid, world_rooms = generate_world_data()
+    world = None
+    minimap_grid, mm_cam_x, mm_cam_y = None, 0, 0
+
+    if infinite:
+        print("Opening Infinite Megadungeon...")
+        world = ChunkedDungeonWorld.resume(CHUNK_SAVE_DIR, seed, max_resident=MAX_RESIDENT_CHUNKS, config={"chunk_size": CHUNK_SIZE})
+        print(f"World seed {world.seed} (saved in {CHUNK_SAVE_DIR}/)")
+        world_grid, world_rooms = None, []
+    else:
+        print("Generating Megadungeon...")
+        world_grid, world_rooms = generate_world_data()
     
     # Initial View Calcs for Camera positioning
     init_view_w = WIN_WIDTH_PX // current_cell_size
@@ -463,7 +570,13 @@ def main():
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_r:
                     print("Regenerating World...")
-                    world_grid, world_rooms = generate_world_data()
+                    WALL_STROKES.reset(random.randrange(2**31))
+                    if infinite:
+                        world.discard() # The old world's chunks would never be read again
+                        world = ChunkedDungeonWorld.resume(CHUNK_SAVE_DIR, random.randrange(2**31), max_resident=MAX_RESIDENT_CHUNKS, config={"chunk_size": CHUNK_SIZE})
+                    else:
+                        world_grid, world_rooms = generate_world_data()
+                    view_cache.clear()
                     camera_x, camera_y = 0, 0
                     view_dirty = True
                 
@@ -472,10 +585,10 @@ def main():
                 
                 # ZOOM CONTROLS
                 if event.key == pygame.K_LEFTBRACKET: # Zoom Out
-                    current_cell_size = max(5, current_cell_size - 2)
+                    current_cell_size = max(MIN_CELL_SIZE, current_cell_size - 2)
                     view_dirty = True
                 if event.key == pygame.K_RIGHTBRACKET: # Zoom In
-                    current_cell_size = min(40, current_cell_size + 2)
+                    current_cell_size = min(MAX_CELL_SIZE, current_cell_size + 2)
                     view_dirty = True
                     
                 if event.key == pygame.K_s:
@@ -488,16 +601,20 @@ def main():
                         # Need to calc current view dims for func arg even if drawing off
                         curr_vw = WIN_WIDTH_PX // current_cell_size
                         curr_vh = WIN_HEIGHT_PX // current_cell_size
-                        mm_surf = render_minimap(world_grid, camera_x, camera_y, curr_vw, curr_vh, draw_viewport=False)
+                        if infinite:
+                            mm_surf = render_minimap(minimap_grid, mm_cam_x, mm_cam_y, curr_vw, curr_vh, draw_viewport=False)
+                        else:
+                            mm_surf = render_minimap(world_grid, camera_x, camera_y, curr_vw, curr_vh, draw_viewport=False)
                         fname_mm = f"megadungeon_pixel_map_{time.strftime('%Y%m%d_%H%M%S')}.png"
                         pygame.image.save(mm_surf, fname_mm)
 
-                        # 3. Save High-Res Scaled Map (WITH NUMBERS)
-                        high_res_surf = render_full_map_high_res(world_grid, world_rooms)
-                        fname_hr = f"megadungeon_sketch_map_{time.strftime('%Y%m%d_%H%M%S')}.png"
-                        pygame.image.save(high_res_surf, fname_hr)
-
-                        print("Saved: View, Pixel Map, and High-Res Sketch (with numbers).")
+                        # 3. Save Full Sketch Map at print resolution (WITH NUMBERS) - an infinite world has no "full" map
+                        if not infinite:
+                            fname_hr = f"megadungeon_sketch_map_{time.strftime('%Y%m%d_%H%M%S')}.png"
+                            export_full_map(world_grid, world_rooms, fname_hr)
+                            print("Saved: View, Pixel Map, and High-Res Sketch (with numbers).")
+                        else:
+                            print("Saved: View and Pixel Map.")
 
                 if event.key == pygame.K_c and visible_rooms:
                     topic = pygame_input_popup(screen, "Sector Theme:")
@@ -517,15 +634,22 @@ def main():
         if keys[pygame.K_LSHIFT]: speed = 3
         
         old_cx, old_cy = camera_x, camera_y
-        if keys[pygame.K_LEFT]: camera_x = max(0, camera_x - speed)
-        # Fix camera clamping using dynamic view width
-        if keys[pygame.K_RIGHT]: camera_x = min(WORLD_WIDTH - view_w_cells, camera_x + speed)
-        if keys[pygame.K_UP]: camera_y = max(0, camera_y - speed)
-        if keys[pygame.K_DOWN]: camera_y = min(WORLD_HEIGHT - view_h_cells, camera_y + speed)
-        
-        # Ensure camera stays in bounds if zoom changed
-        camera_x = max(0, min(camera_x, WORLD_WIDTH - view_w_cells))
-        camera_y = max(0, min(camera_y, WORLD_HEIGHT - view_h_cells))
+        if infinite:
+            # No edges to clamp against
+            if keys[pygame.K_LEFT]: camera_x -= speed
+            if keys[pygame.K_RIGHT]: camera_x += speed
+            if keys[pygame.K_UP]: camera_y -= speed
+            if keys[pygame.K_DOWN]: camera_y += speed
+        else:
+            if keys[pygame.K_LEFT]: camera_x = max(0, camera_x - speed)
+            # Fix camera clamping using dynamic view width
+            if keys[pygame.K_RIGHT]: camera_x = min(WORLD_WIDTH - view_w_cells, camera_x + speed)
+            if keys[pygame.K_UP]: camera_y = max(0, camera_y - speed)
+            if keys[pygame.K_DOWN]: camera_y = min(WORLD_HEIGHT - view_h_cells, camera_y + speed)
+            
+            # Ensure camera stays in bounds if zoom changed
+            camera_x = max(0, min(camera_x, WORLD_WIDTH - view_w_cells))
+            camera_y = max(0, min(camera_y, WORLD_HEIGHT - view_h_cells))
 
         if camera_x != old_cx or camera_y != old_cy:
             view_dirty = True
@@ -533,7 +657,14 @@ def main():
         screen.fill(COLOR_INK)
         
         if view_dirty:
-            view_surface, visible_rooms = render_viewport(world_grid, world_rooms, camera_x, camera_y, current_cell_size)
+            if infinite:
+                view_rooms = load_infinite_view(world, camera_x, camera_y, view_w_cells, view_h_cells)
+                tile_source = lambda x0, y0, cells: load_infinite_tile(world, x0, y0, cells)
+                minimap_grid, mm_cam_x, mm_cam_y = load_infinite_minimap(world, camera_x, camera_y, view_w_cells, view_h_cells)
+            else:
+                view_rooms = world_rooms
+                tile_source = lambda x0, y0, cells: (world_grid, world_rooms, (0, 0))
+            visible_rooms = render_viewport(view_surface, view_cache, tile_source, view_rooms, camera_x, camera_y, current_cell_size)
             view_dirty = False
             
         screen.blit(view_surface, (0, 0))
@@ -543,9 +674,18 @@ def main():
         pygame.draw.line(screen, COLOR_PARCHMENT, (WIN_WIDTH_PX, 0), (WIN_WIDTH_PX, SCREEN_HEIGHT), 2)
         
         if show_minimap:
-            minimap = render_minimap(world_grid, camera_x, camera_y, view_w_cells, view_h_cells, draw_viewport=True)
+            # The pixel map is built once per grid; only the viewport box is drawn each frame
+            if infinite:
+                minimap = minimap_base(minimap_grid)
+                mm_rect = minimap_viewport_rect(mm_cam_x, mm_cam_y, view_w_cells, view_h_cells)
+            else:
+                minimap = minimap_base(world_grid)
+                mm_rect = minimap_viewport_rect(camera_x, camera_y, view_w_cells, view_h_cells)
             mm_x = WIN_WIDTH_PX + (UI_WIDTH - minimap.get_width()) // 2
             screen.blit(minimap, (mm_x, 20))
+            screen.set_clip((mm_x, 20), minimap.get_size())
+            pygame.draw.rect(screen, (255, 0, 0), mm_rect.move(mm_x, 20), 2)
+            screen.set_clip(None)
             coord_text = font_small.render(f"Pos: {camera_x}, {camera_y}", True, COLOR_PARCHMENT)
             screen.blit(coord_text, (WIN_WIDTH_PX + 20, minimap.get_height() + 30))
 
@@ -564,7 +704,9 @@ def main():
         pygame.display.flip()
         clock.tick(60)
     
+    if world: world.flush()
     pygame.quit()
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    seed = int(sys.argv[sys.argv.index("--seed") + 1]) if "--seed" in sys.argv else None
+    main(infinite="--infinite" in sys.argv, seed=seed)
\ No newline at end of file
@@ -4,8 +4,12 @@ import math
 import time
 import os
 import re
+import sys
 import google.generativeai as genai
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "CodexProject"))
+from codex_engine.ui.renderers.parchment import fill_parchment
+
 # --- API CONFIGURATION ---
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
@@ -26,6 +30,7 @@ COLOR_WATER = (120, 160, 200)
 COLOR_GRASS = (200, 220, 180)
 COLOR_ROAD = (180, 160, 140)
 COLOR_FOREST = (100, 140, 100)
+PARCHMENT_NOISE_DENSITY = 0.005 # Fraction of background pixels darkened as paper texture
 LINE_THICKNESS = 2
 
 # BUILDING TYPES
@@ -389,13 +394,7 @@ def generate_village(biome, water_feature):
 # --- Rendering ---
 def generate_parchment_bg(width, height):
     surface = pygame.Surface((width, height))
-    surface.fill(COLOR_PARCHMENT)
-    for _ in range(int(width * height / 200)): # Density scaling
-        x, y = random.randint(0, width-1), random.randint(0, height-1)
-        c = random.randint(10, 20)
-        orig = surface.get_at((x,y))
-        new_color = (max(0, orig.r - c), max(0, orig.g - c), max(0, orig.b - c))
-        surface.set_at((x, y), new_color)
+    fill_parchment(surface, COLOR_PARCHMENT, density=PARCHMENT_NOISE_DENSITY)
     return surface
 
 def render_village(hexes, buildings, camera_x, camera_y, hex_size, target_surface):
@@ -556,7 +555,7 @@ def main():
                     # 1. Create massive surface
                     super_size = 4500
                     super_surf = pygame.Surface((super_size, super_size))
-                    super_surf.fill(COLOR_PARCHMENT) # Flat fill to save noise gen time
+                    fill_parchment(super_surf, COLOR_PARCHMENT, density=PARCHMENT_NOISE_DENSITY)
                     
                     # 2. Render with large hexes to fill space
                     # Radius 25 * 2 = 50 hex width. 4500 / 50 = 90px per hex max. 